@@ -0,0 +1,89 @@
+'''
+Catalog diff benchmark on a synthetic catalog with 1,000,000 rows
+
+    python benchmarks/catalog_diff.py [rows_count]
+
+Builds a snapshot of the catalog, diffs it with new rows where 1% of rows are changed, 0.5% are deleted
+and 0.5% are added, checks the diff and reports the time, the memory of the snapshot, the peak memory
+of the process and the size of the update request against a full sync request.
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from pyrus import serialization  # noqa: E402
+from pyrus.catalog_diff import CatalogSnapshot, diff_catalog  # noqa: E402
+from pyrus.models import requests as req  # noqa: E402
+
+
+def create_row(key, version=0):
+    return ['key{:07d}'.format(key), 'Товар номер {} {}'.format(key, version), 'Склад {}'.format(key % 50),
+            '{:.2f}'.format(key * 1.25)]
+
+
+def current_rows(rows_count):
+    for key in range(rows_count):
+        yield create_row(key)
+
+
+def new_rows(rows_count):
+    for key in range(rows_count + rows_count // 200):
+        if key % 200 == 1 and key < rows_count:
+            continue  # deleted
+        yield create_row(key, 1 if key % 100 == 7 else 0)
+
+
+def measure(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def get_snapshot_size(snapshot):
+    return sys.getsizeof(snapshot.hashes) + sum(sys.getsizeof(key) + sys.getsizeof(row_hash)
+                                                for key, row_hash in snapshot.hashes.items())
+
+
+def get_peak_memory():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # kilobytes on linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def main(rows_count=1000000):
+    snapshot, elapsed = measure(lambda: CatalogSnapshot.from_rows(current_rows(rows_count)))
+    size = get_snapshot_size(snapshot)
+    print('snapshot of {} rows: {:.1f} s, {:.1f} MB ({:.0f} B/row)'.format(
+        rows_count, elapsed, size / 1024 / 1024, size / rows_count))
+    diff, elapsed = measure(lambda: diff_catalog(snapshot, new_rows(rows_count)))
+    print('diff: {:.1f} s, {} added, {} updated, {} deleted'.format(
+        elapsed, diff.added_count, diff.updated_count, len(diff.delete)))
+    peak = get_peak_memory()
+    if peak is not None:
+        print('peak memory of the process: {:.1f} MB'.format(peak / 1024 / 1024))
+
+    changed = sum(1 for key in range(rows_count) if key % 100 == 7 and key % 200 != 1)
+    if (diff.added_count, diff.updated_count, len(diff.delete)) != \
+            (rows_count // 200, changed, len(range(1, rows_count, 200))):
+        raise AssertionError('unexpected diff')
+    snapshot.update(diff)
+    if diff_catalog(snapshot, new_rows(rows_count)):
+        raise AssertionError('updated snapshot differs from the new rows')
+
+    encoder = serialization.RequestEncoder()
+    update_size = len(encoder.encode(diff.to_request()))
+    sync_size = len(encoder.encode(req.SyncCatalogRequest(catalog_headers=['Key', 'Name', 'Stock', 'Price'],
+                                                          items=list(new_rows(rows_count)))))
+    print('update request {:.1f} MB, full sync request {:.1f} MB'.format(
+        update_size / 1024 / 1024, sync_size / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
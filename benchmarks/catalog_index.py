@@ -0,0 +1,114 @@
+'''
+Catalog index benchmark on a synthetic catalog with 200,000 items
+
+    python benchmarks/catalog_index.py [items_count]
+
+Builds a CatalogResponse and a CatalogIndex of the same catalog, checks that lookups by a key,
+by two columns and by wildcard patterns find the same items as a scan of response items
+and reports the memory each of them keeps and the time of the lookups and of a local CatalogItemFilters evaluation.
+'''
+
+import fnmatch
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from pyrus.catalog_index import CatalogIndex  # noqa: E402
+from pyrus.models import responses as resp  # noqa: E402
+from pyrus.models.catalog_item_filters import CatalogItemFilter, CatalogItemFilters  # noqa: E402
+
+
+def create_catalog(items_count):
+    return {
+        'catalog_id': 1,
+        'catalog_headers': [{'name': name, 'type': 'text'} for name in ('Code', 'Name', 'City', 'Status')],
+        'items': [{'item_id': 1000 + key,
+                   'values': ['C{:07d}'.format(key), 'Item {}'.format(key),
+                              'City {}'.format(key % 300) if key % 7 else None,  # empty cells
+                              ('active', 'archived', 'draft')[key % 3]]}
+                  for key in range(items_count)]
+    }
+
+
+def measure_memory(func):
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def measure(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def scan(response, criteria, use_wildcard=False):
+    numbers = {header.name: number for number, header in enumerate(response.catalog_headers)}
+    if use_wildcard:
+        def match(value, pattern):
+            return value is not None and fnmatch.fnmatchcase(value.casefold(), pattern.casefold())
+    else:
+        def match(value, pattern):
+            return value == pattern
+    return [item.item_id for item in response.items
+            if all(match(item.values[numbers[header]], value) for header, value in criteria.items())]
+
+
+def main(items_count=200000):
+    # decoded json is dropped once the models are built, the response or the index keep the values
+    response, response_size = measure_memory(lambda: resp.CatalogResponse(**create_catalog(items_count)))
+    index, index_size = measure_memory(
+        lambda: CatalogIndex.from_response(resp.CatalogResponse(**create_catalog(items_count))))
+    print('{} items: CatalogResponse {:.1f} MB, CatalogIndex {:.1f} MB'.format(
+        items_count, response_size / 1024 / 1024, index_size / 1024 / 1024))
+
+    lookups = [
+        ('key', {'Code': 'C{:07d}'.format(items_count // 2)}, False),
+        ('two columns', {'City': 'City 7', 'Status': 'archived'}, False),
+        ('prefix', {'Name': 'item 1999*'}, True),
+        ('wildcard', {'City': '*ty 15', 'Name': 'Item *5'}, True),
+    ]
+    for name, criteria, use_wildcard in lookups:
+        index.find(criteria, use_wildcard)  # builds the indexes of the columns
+        found, index_time = measure(lambda: index.find(criteria, use_wildcard), 100)
+        expected, scan_time = measure(lambda: scan(response, criteria, use_wildcard), 3)
+        if found != expected:
+            raise AssertionError('{}: index found {} items, scan found {}'.format(name, len(found), len(expected)))
+        print('{:12} {:6} items: index {:9.1f} us, scan {:9.1f} us'.format(
+            name, len(found), index_time * 1e6, scan_time * 1e6))
+
+    # several filters, the empty cells of City are checked after the most selective filter
+    checks = [
+        ([('Code', 'C0000007'), ('City', 'City 7')], False),
+        ([('Code', 'C0000014'), ('Status', 'draft'), ('City', 'City 14')], False),
+        ([('Status', 'archived'), ('City', 'City 1')], False),
+        ([('Code', 'C00000*'), ('City', 'city 1*')], True),
+        ([('Code', 'C0000*'), ('City', '*'), ('Status', 'ACT*')], True),
+    ]
+    for criteria, use_wildcard in checks:
+        filters = CatalogItemFilters([CatalogItemFilter(column, value) for column, value in criteria], use_wildcard)
+        found = [item.item_id for item in index.filter(filters).items]
+        expected = scan(response, dict(criteria), use_wildcard)
+        if found != expected:
+            raise AssertionError('{}: filter found {} items, scan found {}'.format(filters, len(found), len(expected)))
+
+    # only the index is kept by a service that answers filters locally
+    del response
+    gc.collect()
+    filters = CatalogItemFilters([CatalogItemFilter('Code', 'C00012*'), CatalogItemFilter('Status', 'active')],
+                                 use_wildcard=True)
+    index.filter(filters)
+    filtered, filter_time = measure(lambda: index.filter(filters), 100)
+    print('filters      {:6} items: CatalogResponse in {:.1f} us'.format(len(filtered.items), filter_time * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,64 @@
+'''
+Connection pool benchmark against a local stand-in server
+
+    python benchmarks/connection_pool.py [requests_count]
+
+Compares sequential and threaded get_task calls of PyrusAPI, which keeps pooled keep-alive connections,
+with the previous per-call setup where every request opened a new connection (requests.get).
+The server is plain HTTP on localhost, so the gain only covers TCP setup: over TLS to the real API
+every new connection also pays the handshake.
+'''
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import requests  # noqa: E402
+from pyrus.client import PyrusAPI  # noqa: E402
+from mock_server import MockServer  # noqa: E402
+
+
+class PerCallPyrusAPI(PyrusAPI):
+    """
+        Client with the previous request setup: a new connection for every request
+    """
+
+    def _get_request(self, url, headers=None):
+        request_headers = self._create_default_headers()
+        if headers:
+            request_headers.update(headers)
+        return requests.get(url, headers=request_headers, proxies=self.proxy)
+
+
+def run(pyrus_client, task_ids, workers):
+    start = time.perf_counter()
+    if workers == 1:
+        responses = [pyrus_client.get_task(task_id) for task_id in task_ids]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            responses = list(executor.map(pyrus_client.get_task, task_ids))
+    elapsed = time.perf_counter() - start
+    if [response.task.id for response in responses] != task_ids:
+        raise AssertionError('unexpected responses')
+    return len(task_ids) / elapsed
+
+
+def main(requests_count=1000):
+    server = MockServer()
+    task_ids = list(range(1, requests_count + 1))
+    print('{:8} {:>14} {:>14}'.format('threads', 'per call', 'pooled'))
+    for workers in (1, 8):
+        results = []
+        for cls in (PerCallPyrusAPI, PyrusAPI):
+            with server.configure(cls(access_token='token', pool_maxsize=workers)) as pyrus_client:
+                run(pyrus_client, task_ids[:20], workers)  # warm up
+                results.append(run(pyrus_client, task_ids, workers))
+        print('{:8} {:>10.0f} r/s {:>10.0f} r/s'.format(workers, *results))
+    server.close()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,102 @@
+'''
+Response decoding benchmark on a form register response with 20,000 tasks
+
+    python benchmarks/decoding.py [tasks_count]
+
+Compares requests' Response.json() used before with pyrus.serialization.ResponseDecoder backends
+and reports the time of building FormRegisterResponse from the decoded payload for scale,
+eagerly, lazily (pyrus.models.lazy) and projected without the table (pyrus.models.projection)
+with three fields of every task read.
+'''
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import requests  # noqa: E402
+from pyrus import serialization  # noqa: E402
+from pyrus.models import lazy, responses as resp  # noqa: E402
+from pyrus.models.projection import Projection  # noqa: E402
+
+
+def create_task(task_id):
+    return {
+        'id': task_id, 'form_id': 321, 'create_date': '2024-01-02T03:04:05Z',
+        'last_modified_date': '2024-02-03T04:05:06Z', 'due_date': '2024-03-04',
+        'author': {'id': 5, 'first_name': 'Иван', 'last_name': 'Петров', 'email': 'ivan@example.com'},
+        'responsible': {'id': 6, 'first_name': 'John', 'last_name': 'Smith', 'email': 'john@example.com'},
+        'current_step': 2,
+        'fields': [
+            {'id': 1, 'type': 'text', 'name': 'Описание', 'value': 'Заявка номер {}'.format(task_id)},
+            {'id': 2, 'type': 'number', 'name': 'Amount', 'value': task_id * 1.5},
+            {'id': 3, 'type': 'date', 'name': 'Date', 'value': '2024-03-04'},
+            {'id': 4, 'type': 'catalog', 'name': 'Client', 'value': {
+                'item_id': task_id % 100, 'values': ['Client {}'.format(task_id % 100), 'Moscow'],
+                'headers': ['Name', 'City']}},
+            {'id': 5, 'type': 'table', 'name': 'Items', 'value': [
+                {'row_id': row, 'cells': [{'id': 6, 'type': 'text', 'name': 'Item', 'value': 'Item {}'.format(row)},
+                                          {'id': 7, 'type': 'money', 'name': 'Price', 'value': row * 10.5}]}
+                for row in range(3)]},
+        ]
+    }
+
+
+def create_payload(tasks_count):
+    return json.dumps({'tasks': [create_task(i) for i in range(1, tasks_count + 1)]}).encode('utf-8')
+
+
+def measure(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def requests_json(payload):
+    response = requests.models.Response()
+    response._content = payload  # pylint: disable=protected-access
+    response.encoding = 'utf-8'
+    return response.json()
+
+
+def main(tasks_count=20000):
+    payload = create_payload(tasks_count)
+    print('payload: {} tasks, {:.1f} MB'.format(tasks_count, len(payload) / 1024 / 1024))
+    decoders = [('requests Response.json()', lambda: requests_json(payload)),
+                ('ResponseDecoder json', lambda: serialization.ResponseDecoder('json').decode(payload))]
+    if serialization.orjson is not None:
+        decoders.append(('ResponseDecoder orjson', lambda: serialization.ResponseDecoder('orjson').decode(payload)))
+    baseline = None
+    data = None
+    for name, decode in decoders:
+        elapsed, result = measure(decode)
+        if data is not None and result != data:
+            raise AssertionError('{}: decoded payload differs'.format(name))
+        data = result
+        baseline = baseline or elapsed
+        print('{:<28}{:>10.1f} ms{:>8.2f}x'.format(name, elapsed * 1000, baseline / elapsed))
+    eager, _ = measure(lambda: read_fields(resp.FormRegisterResponse(**data)), repeat=1)
+    print('{:<28}{:>10.1f} ms'.format('FormRegisterResponse', eager * 1000))
+    elapsed, _ = measure(lambda: read_fields(lazy.LazyFormRegisterResponse(**data)), repeat=1)
+    print('{:<28}{:>10.1f} ms{:>8.2f}x'.format('LazyFormRegisterResponse', elapsed * 1000, eager / elapsed))
+    projection = Projection(fields=[1, 2, 3, 4])
+    elapsed, _ = measure(lambda: read_fields(resp.FormRegisterResponse(**projection.project_response(data))),
+                         repeat=1)
+    print('{:<28}{:>10.1f} ms{:>8.2f}x'.format('Projection', elapsed * 1000, eager / elapsed))
+
+
+def read_fields(response):
+    for task in response.tasks:
+        fields = task.fields
+        _ = fields[0].value, fields[1].value, fields[3].value
+    return response
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,79 @@
+'''
+Concurrent get_tasks benchmark against a local stand-in server with 20 ms latency
+
+    python benchmarks/get_tasks.py [tasks_count]
+
+Fetches the same tasks with get_task one by one and with get_tasks of PyrusAPI and AsyncPyrusAPI
+(if aiohttp is installed) with a growing number of workers, checks the responses and reports
+the time and the speedup against sequential calls.
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from pyrus.client import PyrusAPI  # noqa: E402
+from mock_server import MockServer  # noqa: E402
+
+try:
+    import asyncio
+    from pyrus.async_client import AsyncPyrusAPI
+except ImportError:
+    AsyncPyrusAPI = None
+
+LATENCY = 0.02
+WORKERS = (1, 2, 4, 8, 16, 32)
+
+
+def check(responses, task_ids):
+    if [response.task.id for response in responses] != task_ids:
+        raise AssertionError('unexpected responses')
+
+
+def measure(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run_sync(server, task_ids):
+    results = {}
+    with server.configure(PyrusAPI(access_token='token', pool_maxsize=max(WORKERS))) as pyrus_client:
+        results['sequential'] = measure(lambda: check([pyrus_client.get_task(task_id) for task_id in task_ids],
+                                                      task_ids))
+        for workers in WORKERS:
+            results[workers] = measure(lambda: check(pyrus_client.get_tasks(task_ids, max_workers=workers),
+                                                     task_ids))
+    return results
+
+
+async def run_async(server, task_ids):
+    results = {}
+    async with server.configure(AsyncPyrusAPI(access_token='token')) as pyrus_client:
+        for workers in WORKERS:
+            start = time.perf_counter()
+            check(await pyrus_client.get_tasks(task_ids, max_workers=workers), task_ids)
+            results[workers] = time.perf_counter() - start
+    return results
+
+
+def main(tasks_count=200):
+    server = MockServer(latency=LATENCY)
+    task_ids = list(range(1, tasks_count + 1))
+    sync_results = run_sync(server, task_ids)
+    async_results = asyncio.run(run_async(server, task_ids)) if AsyncPyrusAPI is not None else {}
+    sequential = sync_results['sequential']
+    print('{} tasks, {:.0f} ms latency, sequential get_task: {:.2f} s'.format(
+        tasks_count, LATENCY * 1000, sequential))
+    print('{:8} {:>18} {:>18}'.format('workers', 'PyrusAPI', 'AsyncPyrusAPI'))
+    for workers in WORKERS:
+        columns = ['{:6.2f} s {:5.1f}x'.format(results[workers], sequential / results[workers])
+                   if workers in results else '-' for results in (sync_results, async_results)]
+        print('{:8} {:>18} {:>18}'.format(workers, *columns))
+    server.close()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
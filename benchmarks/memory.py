@@ -0,0 +1,98 @@
+'''
+Memory benchmark: bytes per Task of a form register with N fields
+
+    python benchmarks/memory.py [tasks_count]
+
+Decodes a register payload, builds the tasks and reports the memory they keep after the payload is released,
+with the repeated strings (field names, types, codes, person names, catalog headers) shared as the models do
+and with every string kept as decoded, as the models did before.
+Below Python 3.11 it also reports the memory of the instance dicts of the models: models have no __slots__,
+so this is the most that a slotted layout could save there. From 3.11 the attributes are stored inline.
+'''
+
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from pyrus.models import entities  # noqa: E402
+
+
+def create_field(task_id, field_id):
+    field = {'id': field_id, 'name': 'Поле {}'.format(field_id), 'code': 'field{}'.format(field_id)}
+    kind = field_id % 4
+    if kind == 0:
+        field.update(type='text', value='Значение {} {}'.format(task_id, field_id))
+    elif kind == 1:
+        field.update(type='number', value=task_id * 1.5)
+    elif kind == 2:
+        field.update(type='date', value='2024-03-04')
+    else:
+        field.update(type='catalog', value={'item_id': task_id % 100, 'values': ['Client {}'.format(task_id % 100)],
+                                            'headers': ['Name']})
+    return field
+
+
+def create_task(task_id, fields_count):
+    return {
+        'id': task_id, 'form_id': 321, 'create_date': '2024-01-02T03:04:05Z',
+        'last_modified_date': '2024-02-03T04:05:06Z', 'current_step': 2,
+        'author': {'id': 5, 'first_name': 'Иван', 'last_name': 'Петров', 'email': 'ivan@example.com'},
+        'fields': [create_field(task_id, field_id) for field_id in range(1, fields_count + 1)]
+    }
+
+
+def measure(payload, tasks_count):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tasks = [entities.Task(**task) for task in json.loads(payload)['tasks']]
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del tasks
+    return size / tasks_count
+
+
+def measure_instance_dicts(payload, tasks_count):
+    tasks = [entities.Task(**task) for task in json.loads(payload)['tasks']]
+    instances = 0
+    size = 0
+    stack = list(tasks)
+    while stack:
+        value = stack.pop()
+        if isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif type(value).__module__.startswith('pyrus.models'):
+            instances += 1
+            size += sys.getsizeof(value.__dict__)
+            stack.extend(vars(value).values())
+    return instances / tasks_count, size / tasks_count
+
+
+def main(tasks_count=1000):
+    intern = entities._intern  # pylint: disable=protected-access
+    inline = sys.version_info >= (3, 11)
+    print('Python {}.{}'.format(*sys.version_info[:2]))
+    print('{:<10}{:>16}{:>16}{:>10}{:>10}{:>20}'.format('fields', 'not shared', 'shared', 'saved', 'models',
+                                                        'instance dicts'))
+    for fields_count in (5, 20, 50):
+        payload = json.dumps({'tasks': [create_task(i, fields_count) for i in range(tasks_count)]})
+        entities._intern = lambda value: value  # pylint: disable=protected-access
+        before = measure(payload, tasks_count)
+        entities._intern = intern  # pylint: disable=protected-access
+        after = measure(payload, tasks_count)
+        instances, dicts_size = measure_instance_dicts(payload, tasks_count)
+        dicts = 'inline' if inline else '{:.0f} B/task {:3.0f}%'.format(dicts_size, dicts_size / after * 100)
+        print('{:<10}{:>11.0f} B/task{:>11.0f} B/task{:>9.0f}%{:>10.0f}{:>20}'.format(
+            fields_count, before, after, (1 - after / before) * 100, instances, dicts))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,90 @@
+'''
+Local stand-in for the Pyrus API used by the client benchmarks
+
+Serves /auth and /tasks/<id> over plain HTTP with keep-alive connections and an optional latency per request.
+'''
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def create_task(task_id):
+    return {
+        'id': task_id, 'form_id': 1, 'create_date': '2024-01-02T03:04:05Z',
+        'last_modified_date': '2024-01-03T03:04:05Z', 'author': {'id': 5, 'first_name': 'Author'},
+        'fields': [{'id': 1, 'type': 'text', 'name': 'Text', 'value': 'value {}'.format(task_id)},
+                   {'id': 2, 'type': 'number', 'name': 'Number', 'value': task_id}],
+        'comments': [{'id': task_id * 10, 'text': 'comment', 'create_date': '2024-01-02T03:04:05Z'}]
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        # headers and body are written separately, without it keep-alive responses wait for delayed ACKs
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.path.endswith('/auth'):
+            body = {'access_token': 'token'}
+        elif '/tasks/' in self.path:
+            body = {'task': create_task(int(self.path.rsplit('/', 1)[1]))}
+        else:
+            body = {}
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockServer:
+    """
+        Mock server running in a background thread
+
+        Args:
+            latency (:obj:`float`, optional): Seconds every request waits before the response
+    """
+
+    def __init__(self, latency=0):
+        handler = type('Handler', (_Handler,), {'latency': latency})
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.host = '127.0.0.1:{}'.format(self._server.server_port)
+
+    def configure(self, pyrus_client):
+        """
+        Point a client to the server
+        """
+        pyrus_client._protocol = 'http'
+        pyrus_client._host = self.host
+        pyrus_client._auth_host = self.host
+        pyrus_client._files_host = self.host + '/v4'
+        return pyrus_client
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
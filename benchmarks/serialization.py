@@ -0,0 +1,88 @@
+'''
+Request serialization benchmark: pyrus.serialization against jsonpickle
+
+    python benchmarks/serialization.py [repeat]
+
+Checks that the output of the default encoder is byte-identical to jsonpickle
+and reports the time per request of every encoder.
+'''
+
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import jsonpickle  # noqa: E402
+from pyrus import serialization  # noqa: E402
+from pyrus.models import entities, requests as req  # noqa: E402
+
+
+def create_comment_request(fields_count):
+    fields = []
+    for i in range(fields_count):
+        fields.extend([
+            entities.FormField(id=i * 10 + 1, type='text', value='Текст "{}"'.format(i)),
+            entities.FormField(id=i * 10 + 2, type='number', value=i * 1.5),
+            entities.FormField(id=i * 10 + 3, type='date', value='2024-03-04'),
+            entities.FormField(id=i * 10 + 4, type='due_date_time', value='2024-03-04T10:00:00Z'),
+            entities.FormField(id=i * 10 + 5, type='time', value='10:30'),
+            entities.FormField(id=i * 10 + 6, type='catalog', value={'item_id': i}),
+            entities.FormField(id=i * 10 + 7, type='person', value={'id': i, 'email': 'user@example.com'}),
+            entities.FormField(id=i * 10 + 8, type='table', value=[
+                {'row_id': row, 'cells': [{'id': 100 + row, 'type': 'text', 'value': 'cell'},
+                                          {'id': 200 + row, 'type': 'money', 'value': row}]}
+                for row in range(3)]),
+            entities.FormField(id=i * 10 + 9, type='title', value={'checkmark': 'checked', 'fields': [
+                {'id': 300, 'type': 'checkmark', 'value': 'checked'}]}),
+            entities.FormField(code='code{}'.format(i), value=[1, 2, None]),
+        ])
+    return req.TaskCommentRequest(
+        text='Comment with <b>html</b> and юникод', approval_choice='approved',
+        attachments=['BEFCE22E-AEFF-4771-83D4-2A4B78FB05C6', entities.NewFile(guid='guid', name='file.txt')],
+        field_updates=fields, approvals_added=[[1, 'user@example.com'], [entities.Person(id=3)]],
+        due=datetime(2024, 5, 6, 7, 8, 9), duration=60, added_list_ids=[1, 2],
+        channel=entities.Channel(type='email', to={'email': 'to@example.com'},
+                                 sender=entities.ChannelUser(email='from@example.com', name='Sender')))
+
+
+def create_catalog_request(items_count):
+    return req.UpdateCatalogItemsRequest(
+        upsert=[entities.CatalogItem(values=['key{}'.format(i), 'Значение {}'.format(i), str(i)])
+                for i in range(items_count)],
+        delete=['key-deleted'])
+
+
+def create_requests():
+    return {
+        'comment with 10 fields': create_comment_request(1),
+        'comment with 200 fields': create_comment_request(20),
+        'create task': req.CreateTaskRequest(text='Task', subject='Subject', participants=[1, 'a@b.c'],
+                                             due_date=datetime(2024, 1, 2), form_id=5,
+                                             fields=create_comment_request(1).field_updates),
+        'catalog with 1000 items': create_catalog_request(1000),
+        'register': req.FormRegisterRequest(steps=[1, 2], include_archived=True, item_count=100,
+                                            filters=[entities.EqualsFilter(1, 'x'), entities.RangeFilter(2, [1, 5])],
+                                            modified_after=datetime(2024, 1, 1)),
+    }
+
+
+def main(repeat=200):
+    encoders = [('jsonpickle', lambda body: jsonpickle.encode(body, unpicklable=False).encode('utf-8')),
+                ('json', serialization.RequestEncoder('json').encode)]
+    if serialization.orjson is not None:
+        encoders.append(('orjson', serialization.RequestEncoder('orjson').encode))
+    print('{:<26}'.format('request') + ''.join('{:>14}'.format(name) for name, _ in encoders))
+    for name, body in create_requests().items():
+        expected = encoders[0][1](body)
+        if encoders[1][1](body) != expected:
+            raise AssertionError('{}: output differs from jsonpickle'.format(name))
+        number = max(1, repeat // (1 + len(expected) // 20000))
+        timings = [min(timeit.repeat(lambda: encode(body), number=number, repeat=3)) / number
+                   for _, encode in encoders]
+        print('{:<26}'.format(name) + ''.join('{:>12.1f}us'.format(timing * 1e6) for timing in timings))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,99 @@
+'''
+Timestamp parsing benchmark: pyrus.models.timestamps against strptime
+
+    python benchmarks/timestamps.py [count]
+
+Checks that every parser returns the same value, time zone and error as the strptime expression it replaces
+and reports the time per value of strptime, of the parser for distinct values and for repeated values.
+'''
+
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from pyrus.models import constants, timestamps  # noqa: E402
+
+
+def set_utc_timezone(value):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+# the expressions the models used before
+REFERENCES = {
+    'parse_date_time': lambda value: set_utc_timezone(datetime.strptime(value, constants.DATE_TIME_FORMAT)),
+    'parse_naive_date_time': lambda value: datetime.strptime(value, constants.DATE_TIME_FORMAT),
+    'parse_date': lambda value: datetime.strptime(value, constants.DATE_FORMAT),
+    'parse_utc_date': lambda value: set_utc_timezone(datetime.strptime(value, constants.DATE_FORMAT)),
+    'parse_time': lambda value: set_utc_timezone(datetime.strptime(value, constants.TIME_FORMAT).time()),
+}
+
+EDGE_CASES = [
+    '2024-02-29T23:59:59Z', '2023-02-29T00:00:00Z', '2024-13-01T00:00:00Z', '2024-01-02T24:00:00Z',
+    '2024-01-02T03:04:60Z', '2024-1-2T3:04:05Z', '2024-01-02T03:04:05', '2024-01-02T03:04:05+00:00',
+    '2024-01-02 03:04:05Z', ' 2024-01-02T03:04:05Z', '2024-01-02T03:04:05Z ', '２０２４-01-02T03:04:05Z',
+    '0001-01-01T00:00:00Z', '9999-12-31T23:59:59Z', '2024-02-29', '2023-02-29', '2024-1-2', '2024-01-02T',
+    '0000-01-01', '10:30', '00:00', '23:59', '24:00', '9:05', '10:30:00', '10:3', '', 'Z', 5, None,
+]
+
+
+def create_values(count):
+    start = datetime(2024, 1, 1)
+    values = []
+    for i in range(count):
+        value = start + timedelta(seconds=i * 7919)
+        values.extend([value.strftime(constants.DATE_TIME_FORMAT), value.strftime(constants.DATE_FORMAT),
+                       value.strftime(constants.TIME_FORMAT)])
+    return values
+
+
+def parse(function, value):
+    try:
+        result = function(value)
+    except (TypeError, ValueError) as e:
+        return type(e), str(e)
+    return type(result), result, repr(result), result.tzinfo
+
+
+def check(values):
+    for name, reference in REFERENCES.items():
+        parser = getattr(timestamps, name)
+        timestamps.clear_cache()
+        for value in values:
+            # the second call returns the memoized value
+            for _ in range(2):
+                if parse(parser, value) != parse(reference, value):
+                    raise AssertionError('{}({!r}): {!r} != {!r}'.format(
+                        name, value, parse(parser, value), parse(reference, value)))
+
+
+def main(count=20000):
+    values = create_values(count)
+    check(values + EDGE_CASES)
+    print('{:<24}{:>14}{:>14}{:>14}'.format('parser', 'strptime', 'distinct', 'repeated'))
+    for name, index in (('parse_date_time', 0), ('parse_date', 1), ('parse_time', 2)):
+        parser = getattr(timestamps, name)
+        reference = REFERENCES[name]
+        distinct = list(dict.fromkeys(values[index::3]))[:timestamps.CACHE_SIZE]
+        repeated = distinct[:100] * (len(distinct) // 100)
+
+        def run_distinct():
+            timestamps.clear_cache()
+            for value in distinct:
+                parser(value)
+
+        timings = [
+            min(timeit.repeat(lambda: [reference(value) for value in distinct], number=1, repeat=3)),
+            min(timeit.repeat(run_distinct, number=1, repeat=3)),
+            min(timeit.repeat(lambda: [parser(value) for value in repeated], number=1, repeat=3)),
+        ]
+        print('{:<24}'.format(name) + ''.join('{:>12.2f}us'.format(timing / len(distinct) * 1e6)
+                                              for timing in timings))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
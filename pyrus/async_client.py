@@ -0,0 +1,615 @@
+'''
+Asynchronous PyrusAPI client
+
+This module allows you to call Pyrus API methods from asyncio code.
+It requires aiohttp (pip install pyrus-api[async]).
+usage:
+
+    >>> import asyncio
+    >>> from pyrus.async_client import AsyncPyrusAPI
+    >>> async def main():
+           async with AsyncPyrusAPI(login="login", security_key="security_key") as pyrus_client:
+               responses = await asyncio.gather(*[pyrus_client.get_task(task_id) for task_id in task_ids])
+
+Full documentation for PyrusAPI is at https://pyrus.com/en/help/api
+'''
+
+import asyncio
+import collections
+import functools
+import json
+import aiohttp
+from .client import BasePyrusAPI, _FileDownload, _UploadBatch, _get_file_destination, _get_file_id, \
+    _get_md5_hash, _get_new_file, _get_unique_files, _get_upload_source
+from .models import requests as req, responses as resp
+
+
+class AsyncPyrusAPI(BasePyrusAPI):
+    """
+    Asynchronous PyrusApi client.
+    Has the same methods as :class:`pyrus.client.PyrusAPI`, every API method returns an awaitable
+    that resolves to the same response object.
+
+    Args:
+        login (:obj:`str`): User's login (email)
+        security_key (:obj:`str`): User's secret key
+        access_token (:obj:`str`, optional): User's access token. You can specify it if you already have one. (optional)
+        proxy (:obj:`str`, optional): Proxy server url
+        person_id (:obj:`int`,optional): User's person id
+        retry_policy (:obj:`pyrus.retry.RetryPolicy`, optional): Retry policy for throttled and failed requests.
+            By default requests are retried up to 3 times with exponential backoff
+        max_concurrency (:obj:`int`, optional): Maximum number of requests performed at the same time
+        pool_maxsize (:obj:`int`, optional): Maximum number of keep-alive connections
+        rate_limiter (:obj:`pyrus.ratelimit.RateLimiter`, optional): Limits the request rate before requests are sent
+        request_encoder (:obj:`pyrus.serialization.RequestEncoder`, optional): Serializes request bodies.
+            By default produces the same JSON as jsonpickle
+        response_decoder (:obj:`pyrus.serialization.ResponseDecoder`, optional): Decodes response bodies.
+            By default uses the standard json module
+        lazy (:obj:`bool`, optional): Build tasks of responses on first attribute access
+        keep_original_response (:obj:`bool`, optional): Keep the decoded JSON in ``original_response`` of responses
+        response_cache (:obj:`pyrus.cache.ResponseCache`, optional): Caches responses of get_forms, get_form
+            and get_catalog
+
+    The client must be closed with :meth:`close` or used as an async context manager.
+    """
+
+    def __init__(self, login=None, security_key=None, access_token=None, proxy=None, person_id=None,
+                 max_concurrency=100, pool_maxsize=100, retry_policy=None, rate_limiter=None,
+                 request_encoder=None, response_decoder=None, lazy=False, keep_original_response=True,
+                 response_cache=None):
+        super(AsyncPyrusAPI, self).__init__(login, security_key, access_token, proxy, person_id, retry_policy,
+                                            rate_limiter, request_encoder, response_decoder, lazy,
+                                            keep_original_response, response_cache)
+        if not isinstance(max_concurrency, int) or max_concurrency < 1:
+            raise ValueError('max_concurrency should be a positive int')
+        self.max_concurrency = max_concurrency
+        self.pool_maxsize = pool_maxsize
+        # copies made by with_* methods share the state, it is created on first use inside the event loop
+        self._shared = _SharedState(max_concurrency, pool_maxsize)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """
+        Close all pooled connections.
+        """
+        await self._shared.close()
+
+    def get_tasks(self, task_ids, max_workers=None, as_completed=False):
+        """
+        Get several tasks concurrently. A failed request does not stop the others: its response has
+        error_code and error set.
+
+            >>> responses = await pyrus_client.get_tasks(task_ids)
+            >>> async for task_id, response in pyrus_client.get_tasks(task_ids, as_completed=True):
+
+        Args:
+            task_ids (:obj:`list` of :obj:`int`): Task ids
+            max_workers (:obj:`int`, optional): Maximum number of requests performed at the same time.
+                Limited by max_concurrency of the client
+            as_completed (:obj:`bool`, optional): Yield responses as soon as they are received instead of
+                returning them in the order of task_ids
+
+        Returns:
+            An awaitable that resolves to the :obj:`list` of class:`models.responses.TaskResponse` objects
+            in the order of task_ids, or an async generator of (task_id, class:`models.responses.TaskResponse`)
+            tuples if as_completed is set
+        """
+        if max_workers is None:
+            max_workers = self.max_concurrency
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError('max_workers should be a positive int')
+        results = self._map_concurrently(self._get_task_safe, task_ids, max_workers, not as_completed)
+        if as_completed:
+            return results
+        return self._collect_responses(results)
+
+    async def _collect_responses(self, results):
+        return [response async for _, response in results]
+
+    def iter_registry(self, form_id, form_register_request=None, page_size=20000, prefetch=False):
+        """
+        Iterate over all tasks based on the form template. Tasks are requested by pages of page_size tasks
+        sorted by id, every next page starts after the last task id of the previous one,
+        so only one page is kept in memory.
+
+            >>> async for task in pyrus_client.iter_registry(form_id, request, prefetch=True):
+
+        Args:
+            form_id (:obj:`int`): Form id
+            form_register_request (:obj:`models.requests.FormRegisterRequest`, optional): Request filters.
+                item_count and sort are ignored, task id filters other than greater than, less than and range are not supported
+            page_size (:obj:`int`, optional): Number of tasks in a page (page_size > 0 & page_size <= 20000)
+            prefetch (:obj:`bool`, optional): Request the next page in background while the current one is processed
+
+        Returns:
+            async generator of :obj:`models.entities.Task` objects
+        """
+        pagination = self._create_registry_pagination(form_register_request, page_size)
+        return self._iter_registry(form_id, pagination, prefetch)
+
+    def export_registry(self, form_id, form_register_request=None, partitions=8, max_workers=None, page_size=20000):
+        """
+        Get all tasks based on the form template requesting disjoint task id ranges concurrently.
+        The id space of the form is probed first and split into partitions, ranges that have more
+        than page_size tasks are split again while they are requested. Tasks are yielded in no particular order.
+
+            >>> async for task in pyrus_client.export_registry(form_id, partitions=16):
+
+        Args:
+            form_id (:obj:`int`): Form id
+            form_register_request (:obj:`models.requests.FormRegisterRequest`, optional): Request filters.
+                item_count and sort are ignored, task id filters other than greater than, less than and range are not supported
+            partitions (:obj:`int`, optional): Number of task id ranges to start with
+            max_workers (:obj:`int`, optional): Maximum number of requests performed at the same time.
+                Limited by max_concurrency of the client
+            page_size (:obj:`int`, optional): Maximum number of tasks in a response (page_size > 0 & page_size <= 20000)
+
+        Returns:
+            async generator of :obj:`models.entities.Task` objects
+        """
+        if max_workers is None:
+            max_workers = self.max_concurrency
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError('max_workers should be a positive int')
+        export = self._create_registry_export(form_register_request, partitions, page_size)
+        return self._export_registry(form_id, export, max_workers)
+
+    async def _export_registry(self, form_id, export, max_workers):
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def get_registry(request):
+            async with semaphore:
+                return await self.get_registry(form_id, request)
+
+        probe = export.probe()
+        try:
+            probe_requests = next(probe)
+            while True:
+                probe_requests = probe.send(await asyncio.gather(*[get_registry(request) for request in probe_requests]))
+        except StopIteration as e:
+            ranges = e.value
+        running = {}
+
+        def start(lower, upper):
+            running[asyncio.ensure_future(get_registry(export.create_request(lower, upper)))] = (lower, upper)
+
+        try:
+            for lower, upper in ranges:
+                start(lower, upper)
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    lower, upper = running.pop(future)
+                    tasks, rest = export.process_partition(future.result(), lower, upper)
+                    for rest_lower, rest_upper in rest:
+                        start(rest_lower, rest_upper)
+                    for task in tasks:
+                        yield task
+        finally:
+            for future in running:
+                future.cancel()
+
+    async def _iter_registry(self, form_id, pagination, prefetch):
+        next_page = None
+        try:
+            while not pagination.done:
+                if next_page is None:
+                    response = await self.get_registry(form_id, pagination.next_request())
+                else:
+                    response = await next_page
+                    next_page = None
+                tasks = pagination.process_response(response)
+                if prefetch and not pagination.done:
+                    next_page = asyncio.ensure_future(self.get_registry(form_id, pagination.next_request()))
+                for task in tasks:
+                    yield task
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def open_file(self, file_id, chunk_size=1024 * 1024):
+        """
+        Download the file by chunks without keeping it in memory.
+        The connection stays open until the file is read to the end or the stream is closed
+
+            >>> async with await pyrus_client.open_file(file_id) as stream:
+                   async for chunk in stream:
+                       output.write(chunk)
+
+        Args:
+            file_id (:obj:`int`): File id
+            chunk_size (:obj:`int`, optional): Size of chunks
+
+        Returns:
+            class:`models.responses.AsyncDownloadStreamResponse` object
+        """
+        if not isinstance(file_id, int):
+            raise TypeError('file_id must be an instance of int')
+        path = '/services/attachment?Id=' + str(file_id)
+        download = _FileDownload(chunk_size=chunk_size, stream=True)
+        return await self._perform_get_file_request(path, resp.BaseResponse, download)
+
+    async def download_files(self, files, directory, max_workers=4, chunk_size=1024 * 1024):
+        """
+        Download several files concurrently to the directory. Files are written by chunks,
+        so at most max_workers * chunk_size bytes are kept in memory.
+        Every file is saved as <file id>_<file name>
+
+        Args:
+            files (:obj:`list` of :obj:`int` or :obj:`models.entities.File`): File ids or files.
+                MD5 hash of :obj:`models.entities.File` is verified
+            directory (:obj:`str`): Directory to save files to
+            max_workers (:obj:`int`, optional): Maximum number of files downloaded at the same time
+            chunk_size (:obj:`int`, optional): Size of chunks written to files
+
+        Returns:
+            :obj:`list` of class:`models.responses.DownloadResponse` objects in the order of files.
+            A failed download has error_code set. A file listed several times is downloaded once
+            and gets the same response object
+        """
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError('max_workers should be a positive int')
+        download = functools.partial(self._download_file_safe, directory=directory, chunk_size=chunk_size)
+        unique_files = _get_unique_files(files)
+        results = self._map_concurrently(download, list(unique_files.values()), max_workers, True)
+        responses = dict(zip(unique_files, await self._collect_responses(results)))
+        return [responses[_get_file_id(file)] for file in files]
+
+    async def _download_file_safe(self, file, directory, chunk_size):
+        try:
+            file_id, expected_md5, destination = _get_file_destination(file, directory)
+            return await self.download_file(file_id, destination, chunk_size, expected_md5)
+        except Exception as e:  # pylint: disable=broad-except
+            return resp.BaseResponse(error_code=type(e).__name__, error=str(e))
+
+    async def upload_files(self, files, max_workers=4, chunk_size=1024 * 1024, known_guids=None):
+        """
+        Upload several files concurrently. Files with the same content are uploaded once.
+
+        Args:
+            files (:obj:`list`): Paths, binary file objects or bytes, or tuples of one of them and a file name
+            max_workers (:obj:`int`, optional): Maximum number of files uploaded at the same time
+            chunk_size (:obj:`int`, optional): Size of chunks read from files
+            known_guids (:obj:`dict`, optional): MD5 hashes as keys and guids of uploaded files as values.
+                Files with known hashes are not uploaded, guids of uploaded files are added to the dict.
+                Pass the same dict to several calls to upload every content once
+
+        Returns:
+            :obj:`list` of :obj:`models.entities.NewFile` objects in the order of files
+        """
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError('max_workers should be a positive int')
+        batch = _UploadBatch(known_guids)
+        upload = functools.partial(self._upload_batch_file, batch=batch, chunk_size=chunk_size)
+        responses = await self._collect_responses(self._map_concurrently(upload, files, max_workers, True))
+        return [_get_new_file(response) for response in responses]
+
+    async def _upload_batch_file(self, file, batch, chunk_size):
+        source, filename = _get_upload_source(file)
+        loop = asyncio.get_running_loop()
+        md5_hash = await loop.run_in_executor(None, _get_md5_hash, source, chunk_size)
+        if md5_hash is None:
+            return await self.upload_file(source, filename, chunk_size=chunk_size)
+        future, owner = batch.claim(md5_hash, loop.create_future)
+        if not owner:
+            return await asyncio.shield(future)
+        try:
+            response = await self.upload_file(source, filename, chunk_size=chunk_size)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        batch.complete(md5_hash, response)
+        future.set_result(response)
+        return response
+
+    async def update_catalog_items_in_chunks(self, catalog_id, update_catalog_items_request, max_items=1000,
+                                             max_bytes=1024 * 1024, max_workers=4, checkpoint=None, progress=None):
+        """
+        Update catalog items by chunks sent concurrently. Chunks are bounded by the number of items
+        and the body size, so big changes do not time out or exceed the request size limit.
+        A failed chunk does not stop the others. Chunks are retried like idempotent requests:
+        upserting or deleting the same items again does not change the catalog.
+
+        Args:
+            catalog_id (:obj:`int`): Catalog id
+            update_catalog_items_request (:obj:`models.requests.UpdateCatalogItemsRequest`): Catalog data
+            max_items (:obj:`int`, optional): Maximum number of upserted and deleted items in a chunk
+            max_bytes (:obj:`int`, optional): Maximum size of a chunk request body
+            max_workers (:obj:`int`, optional): Maximum number of chunks sent at the same time.
+                Limited by max_concurrency of the client
+            checkpoint (:obj:`pyrus.catalog_update.UpdateCheckpoint`, optional): Records completed chunks.
+                A rerun with the same request and checkpoint sends only the chunks that were not completed
+            progress (:obj:`callable`, optional): Called with the number of completed chunks and the number
+                of chunks after every chunk
+
+        Returns:
+            class:`models.responses.SyncCatalogResponse` object with added, updated and deleted items
+            of the chunks sent by this call. error_code and error are set if a chunk failed
+        """
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError('max_workers should be a positive int')
+        update = self._create_catalog_update(catalog_id, update_catalog_items_request, max_items, max_bytes,
+                                             checkpoint, progress)
+        send = functools.partial(self._update_catalog_chunk_safe, catalog_id)
+        async for chunk, response in self._map_concurrently(send, update.pending, max_workers, False):
+            update.complete(chunk, response)
+        return update.result()
+
+    async def _update_catalog_chunk_safe(self, catalog_id, chunk):
+        try:
+            return await self._perform_post_request('/catalogs/{}/diff'.format(catalog_id), chunk.request,
+                                                    resp.SyncCatalogResponse, idempotent=True)
+        except Exception as e:  # pylint: disable=broad-except
+            return resp.SyncCatalogResponse(error_code=type(e).__name__, error=str(e))
+
+    async def _get_task_safe(self, task_id):
+        try:
+            return await self.get_task(task_id)
+        except Exception as e:  # pylint: disable=broad-except
+            return resp.TaskResponse(error_code=type(e).__name__, error=str(e))
+
+    async def _map_concurrently(self, func, items, max_workers, ordered):
+        # authenticate once instead of in every coroutine
+        if not self.access_token:
+            await self._refresh_token(None)
+        # keep a bounded window of started calls so large inputs do not pile up in memory
+        window = max_workers * 2
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def call(item):
+            async with semaphore:
+                return await func(item)
+
+        pending = collections.deque()
+        items = iter(items)
+        try:
+            while True:
+                for item in items:
+                    pending.append((item, asyncio.ensure_future(call(item))))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    return
+                if ordered:
+                    item, future = pending.popleft()
+                    yield item, await future
+                    continue
+                done, _ = await asyncio.wait([future for _, future in pending],
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for entry in [entry for entry in pending if entry[1] in done]:
+                    pending.remove(entry)
+                    yield entry[0], entry[1].result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    async def _perform_auth_request(self, response_type):
+        async with self._get_auth_lock():
+            response = await self._auth()
+        return self._create_response(response, response_type)
+
+    async def _perform_request_with_retry(self, path, method, body=None, upload=None, get_file=False,
+                                          response_type=None, idempotent=None, cached=False):
+        if not isinstance(method, self.HTTPMethod):
+            raise TypeError('method must be an instance of HTTPMethod Enum.')
+        if idempotent is None:
+            idempotent = self.retry_policy.is_idempotent(method.value)
+
+        cache_lookup = self._lookup_cache(path) if cached else None
+        if cache_lookup is not None and cache_lookup.fresh:
+            return self._create_response(self._get_cached_response(cache_lookup), response_type)
+        headers = self._get_cache_headers(cache_lookup)
+
+        # try auth if no access token
+        if not self.access_token:
+            response = await self._refresh_token(None)
+            if not self.access_token:
+                return self._create_response(response, response_type)
+
+        access_token = self.access_token
+        url = self._create_request_url(path, get_file)
+        # try to call api method
+        response = await self._perform_request(url, method, body, upload, get_file, idempotent, headers)
+        # if 401 try auth and call method again
+        if response.status_code == 401:
+            response = await self._refresh_token(access_token)
+            # if failed return auth response
+            if not self.access_token:
+                return self._create_response(response, response_type)
+            if upload is not None and not upload.can_restart:
+                return self._create_response(self._get_upload_restart_error(), response_type)
+
+            url = self._create_request_url(path, get_file)
+            response = await self._perform_request(url, method, body, upload, get_file, idempotent, headers)
+
+        self._invalidate_cache(path, method)
+        return self._create_response(self._get_response(response, get_file, body, cache_lookup), response_type)
+
+    async def _create_local_response(self, response, response_type):
+        return self._create_response(response, response_type)
+
+    async def _refresh_token(self, expired_token):
+        async with self._get_auth_lock():
+            # another coroutine could have already got a new token while we were waiting
+            if self.access_token and self.access_token != expired_token:
+                return None
+            return await self._auth()
+
+    async def _auth(self):
+        url = self._create_auth_url('/auth')
+        headers = {
+            'User-Agent': '{}'.format(self._user_agent),
+            'Content-Type': 'application/json'
+        }
+        auth_request = req.AuthRequest(login=self.login, security_key=self.security_key, person_id=self.person_id)
+
+        data = self.serialize_request(auth_request)
+
+        auth_response = await self._send('POST', url, headers, data)
+        response = self.response_decoder.decode(auth_response.content)
+        if auth_response.status_code == 200:
+            self._set_origins(response.get('api_url'), response.get('files_url'))
+            self.access_token = response['access_token']
+        else:
+            self.access_token = None
+
+        return response
+
+    async def _perform_request(self, url, method, body, upload, get_file, idempotent, headers=None):
+        policy = self.retry_policy
+        attempt = 1
+        while True:
+            rate_limit_delay = self._get_rate_limit_delay(url)
+            if rate_limit_delay > 0:
+                await asyncio.sleep(rate_limit_delay)
+            try:
+                response = await self._send_request(url, method, body, upload, get_file, headers)
+            except aiohttp.ClientConnectionError:
+                if not policy.should_retry_error(attempt, idempotent):
+                    policy.statistics.record_exhausted()
+                    raise
+                delay = policy.get_delay(attempt)
+                policy.statistics.record_retry(delay)
+            else:
+                if not policy.should_retry(attempt, response.status_code, idempotent):
+                    if response.status_code in policy.status_codes:
+                        policy.statistics.record_exhausted()
+                    return response
+                delay = policy.get_delay(attempt, response.headers.get('Retry-After'))
+                policy.statistics.record_retry(delay, response.status_code)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send_request(self, url, method, body, upload, get_file=False, headers=None):
+        request_headers = self._create_default_headers()
+        if headers:
+            request_headers.update(headers)
+        if upload:
+            request_headers['Content-Type'] = upload.content_type
+            with upload.open() as body:
+                if upload.size is not None:
+                    request_headers['Content-Length'] = str(len(body))
+                return await self._send(method.value, url, request_headers, _iterate_async(body))
+        data = self.serialize_request(body) if body else None
+        return await self._send(method.value, url, request_headers, data, get_file)
+
+    async def _send(self, method, url, headers, data, get_file=False):
+        async with self._get_semaphore():
+            response = await self._get_session().request(method, url, headers=headers, data=data,
+                                                         proxy=self._get_proxy())
+            if isinstance(get_file, _FileDownload) and get_file.stream and response.status == 200:
+                # the connection is released by the stream, it does not hold a slot of max_concurrency
+                return _Response(response.status, response.headers, None, None, response)
+            async with response:
+                if isinstance(get_file, _FileDownload) and response.status == 200:
+                    # write the file while the connection is open instead of reading it to memory
+                    get_file.open(self._get_filename(response.headers))
+                    try:
+                        async for chunk in response.content.iter_chunked(get_file.chunk_size):
+                            get_file.write(chunk)
+                    except BaseException:
+                        get_file.close()
+                        get_file.discard()
+                        raise
+                    get_file.close()
+                    return _Response(response.status, response.headers, None, None)
+                content = await response.read()
+                return _Response(response.status, response.headers, content, response.get_encoding())
+
+    def _create_file_download_response(self, response, download):
+        if download.stream:
+            stream = response.stream
+            return resp.AsyncDownloadStreamResponse(self._get_filename(response.headers),
+                                                    stream.content.iter_chunked(download.chunk_size), stream.release)
+        return super(AsyncPyrusAPI, self)._create_file_download_response(response, download)
+
+    def _write_download(self, response, download, filename):
+        # the file is already written by _send
+        pass
+
+    def _get_session(self):
+        return self._shared.get_session()
+
+    def _get_semaphore(self):
+        return self._shared.get_semaphore()
+
+    def _get_auth_lock(self):
+        return self._shared.get_auth_lock()
+
+    def _get_proxy(self):
+        if self.proxy:
+            return self.proxy['https']
+        return None
+
+
+class _SharedState:
+    """
+        Session, concurrency limit and auth lock of a client and its copies, created on first use
+        so that a client can be created and copied outside of a running event loop
+    """
+
+    def __init__(self, max_concurrency, pool_maxsize):
+        self.max_concurrency = max_concurrency
+        self.pool_maxsize = pool_maxsize
+        self._session = None
+        self._semaphore = None
+        self._auth_lock = None
+
+    def get_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def get_semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def get_auth_lock(self):
+        if self._auth_lock is None:
+            self._auth_lock = asyncio.Lock()
+        return self._auth_lock
+
+    async def close(self):
+        session = self._session
+        self._session = None
+        if session is not None:
+            await session.close()
+
+
+class _Response:
+    """
+        Fully read aiohttp response with the subset of requests.Response interface used by the client,
+        or the open aiohttp response of a streamed file in stream
+    """
+
+    def __init__(self, status_code, headers, content, encoding, stream=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        self.stream = stream
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+async def _iterate_async(chunks):
+    loop = asyncio.get_running_loop()
+    iterator = iter(chunks)
+    while True:
+        # file reads block, run them in the default executor
+        chunk = await loop.run_in_executor(None, next, iterator, None)
+        if chunk is None:
+            break
+        yield chunk
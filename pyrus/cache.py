@@ -0,0 +1,362 @@
+'''
+Response cache for rarely changing resources: forms (get_forms, get_form) and catalogs (get_catalog)
+
+Response bodies are kept for a time to live per endpoint in a size-bounded LRU and, optionally, in a directory
+shared by all processes that use it. When an entry expires and the server sent ETag or Last-Modified
+with it, the entry is revalidated with a conditional request instead of being downloaded again.
+Catalog entries are dropped after sync_catalog, update_catalog_items and other catalog changes made by the client.
+usage:
+
+    >>> from pyrus.cache import ResponseCache
+    >>> cache = ResponseCache(ttl={'catalog': 60}, directory='/var/cache/pyrus')
+    >>> pyrus_client = client.PyrusAPI(login, security_key, response_cache=cache)
+    >>> forms = pyrus_client.get_forms()  # the next call within ttl does not send a request
+    >>> pyrus_client.with_response_cache(None).get_catalog(catalog_id)  # bypass the cache
+'''
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheEntry:
+    """
+        Cached response body
+
+        Attributes:
+            tag (:obj:`str`): Resource of the entry, e.g. 'catalog-15'
+            content (:obj:`bytes`): Response body
+            etag (:obj:`str`): ETag header of the response
+            last_modified (:obj:`str`): Last-Modified header of the response
+            stored (:obj:`float`): Time the body was received or revalidated, seconds since the epoch
+    """
+
+    def __init__(self, tag, content, etag=None, last_modified=None, stored=None, file_id=None):
+        self.tag = tag
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored = stored if stored is not None else time.time()
+        self.file_id = file_id
+        self._derived = None
+        self._lock = threading.Lock()
+
+    def get_derived(self, create):
+        """
+        Get an object built from the content once per entry, e.g. the index of a cached catalog.
+        It lives as long as the entry and is not counted in the cache size
+
+        Args:
+            create (:obj:`callable`): Builds the object from the content
+        """
+        if self._derived is None:
+            with self._lock:
+                if self._derived is None:
+                    self._derived = create(self.content)
+        return self._derived
+
+    def get_validators(self):
+        """
+        Returns:
+            :obj:`dict` of conditional request headers, empty if the server sent no validators
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class CacheLookup:
+    """
+        Result of a cache lookup, passed back to the cache with the response of the request
+
+        Attributes:
+            key (:obj:`str`): Cache key
+            endpoint (:obj:`str`): 'forms', 'form' or 'catalog'
+            tag (:obj:`str`): Resource of the entry
+            entry (:class:`CacheEntry`): Cached entry or None
+            fresh (:obj:`bool`): The entry can be used without a request
+    """
+
+    def __init__(self, key, endpoint, tag, entry, fresh):
+        self.key = key
+        self.endpoint = endpoint
+        self.tag = tag
+        self.entry = entry
+        self.fresh = fresh
+
+
+class ResponseCache:
+    """
+        Cache of get_forms, get_form and get_catalog responses. One instance can be shared by several
+        clients and threads, entries are kept per login (or access token if there is no login).
+        With a directory the entries are stored in files and shared by all processes using the same directory
+
+        Args:
+            ttl (:obj:`float` or :obj:`dict`, optional): Time to live of entries in seconds, for all endpoints
+                or by endpoint ('forms', 'form' or 'catalog') as key. Expired entries are revalidated when
+                the server sent ETag or Last-Modified, 0 revalidates on every call
+            max_size (:obj:`int`, optional): Maximum total size of cached bodies in bytes, in memory and
+                in the directory. Least recently used entries are evicted first, bigger bodies are not cached
+            directory (:obj:`str`, optional): Directory for entry files to share the cache between processes
+
+        Attributes:
+            hits (:obj:`int`): Number of responses returned from the cache without a request
+            revalidations (:obj:`int`): Number of expired entries confirmed by the server (304 Not Modified)
+            misses (:obj:`int`): Number of responses downloaded
+    """
+
+    ENDPOINTS = ('forms', 'form', 'catalog')
+    DEFAULT_TTL = {'forms': 600, 'form': 600, 'catalog': 300}
+
+    def __init__(self, ttl=None, max_size=64 * 1024 * 1024, directory=None):
+        self.ttl = dict(self.DEFAULT_TTL)
+        if isinstance(ttl, dict):
+            for endpoint, seconds in ttl.items():
+                if endpoint not in self.ENDPOINTS:
+                    raise ValueError('endpoint should be one of {}'.format(', '.join(self.ENDPOINTS)))
+                self.ttl[endpoint] = seconds
+        elif ttl is not None:
+            self.ttl = {endpoint: ttl for endpoint in self.ENDPOINTS}
+        for seconds in self.ttl.values():
+            if not isinstance(seconds, (int, float)) or seconds < 0:
+                raise ValueError('ttl should be a non-negative number')
+        if not isinstance(max_size, int) or max_size < 1:
+            raise ValueError('max_size should be a positive int')
+        self.max_size = max_size
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, identity, path):
+        """
+        Find the entry of a request
+
+        Args:
+            identity (:obj:`str`): Login or access token the request is made with
+            path (:obj:`str`): Request path, e.g. '/catalogs/15'
+
+        Returns:
+            :class:`CacheLookup` object or None if responses of the path are not cached
+        """
+        endpoint, tag = get_tag(path)
+        if endpoint is None:
+            return None
+        key = hashlib.sha1('{}\n{}'.format(identity, path).encode('utf-8')).hexdigest()
+        entry = self._get(key, tag)
+        fresh = entry is not None and time.time() - entry.stored < self.ttl[endpoint]
+        if fresh:
+            with self._lock:
+                self.hits += 1
+        return CacheLookup(key, endpoint, tag, entry, fresh)
+
+    def store(self, lookup, content, headers):
+        """
+        Keep the body of a successful response
+
+        Args:
+            lookup (:class:`CacheLookup`): Lookup of the request
+            content (:obj:`bytes`): Response body
+            headers (:obj:`dict`): Response headers
+        """
+        with self._lock:
+            self.misses += 1
+        if len(content) > self.max_size:
+            return
+        entry = CacheEntry(lookup.tag, content, headers.get('ETag'), headers.get('Last-Modified'))
+        if self.directory is not None:
+            entry.file_id = self._write(lookup.key, entry)
+        self._put(lookup.key, entry)
+
+    def refresh(self, lookup):
+        """
+        Restart the time to live of an entry confirmed by the server
+
+        Returns:
+            :class:`CacheEntry` object
+        """
+        entry = lookup.entry
+        entry.stored = time.time()
+        if self.directory is not None:
+            try:
+                # the modification time of the file is the time the entry was stored
+                os.utime(self._get_path(lookup.key, entry.tag), (entry.stored, entry.stored))
+            except FileNotFoundError:
+                # invalidated by another process while the entry was revalidated
+                entry.file_id = self._write(lookup.key, entry)
+        self._put(lookup.key, entry)
+        with self._lock:
+            self.revalidations += 1
+        return entry
+
+    def invalidate_catalog(self, catalog_id):
+        """
+        Drop all cached responses of a catalog
+        """
+        self._invalidate(lambda tag: tag == 'catalog-{}'.format(catalog_id))
+
+    def invalidate_forms(self):
+        """
+        Drop all cached forms
+        """
+        self._invalidate(lambda tag: tag == 'forms' or tag.startswith('form-'))
+
+    def invalidate_path(self, path):
+        """
+        Drop the cached responses of the resource a request changes
+        """
+        endpoint, tag = get_tag(path)
+        if endpoint == 'catalog':
+            self._invalidate(lambda entry_tag: entry_tag == tag)
+
+    def clear(self):
+        """
+        Drop all cached responses
+        """
+        self._invalidate(lambda tag: True)
+
+    def _get(self, key, tag):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if self.directory is None:
+            return entry
+        try:
+            stat = os.stat(self._get_path(key, tag))
+        except FileNotFoundError:
+            # invalidated or evicted by another process
+            if entry is not None:
+                self._remove(key)
+            return None
+        if entry is None or entry.file_id != stat.st_ino:
+            # a file is replaced as a whole, a new inode means new content
+            entry = self._read(key, tag)
+            if entry is None:
+                return None
+            self._put(key, entry)
+        entry.stored = stat.st_mtime
+        return entry
+
+    def _put(self, key, entry):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.content)
+            self._entries[key] = entry
+            self._size += len(entry.content)
+            while self._size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.content)
+
+    def _remove(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= len(entry.content)
+
+    def _invalidate(self, match):
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if match(entry.tag)]:
+                self._size -= len(self._entries.pop(key).content)
+        if self.directory is None:
+            return
+        for name in os.listdir(self.directory):
+            tag = _get_file_tag(name)
+            if tag is not None and match(tag):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def _get_path(self, key, tag):
+        return os.path.join(self.directory, '{}.{}{}'.format(tag, key, _ENTRY_SUFFIX))
+
+    def _read(self, key, tag):
+        try:
+            with open(self._get_path(key, tag), 'rb') as file:
+                header = json.loads(file.readline().decode('utf-8'))
+                content = file.read()
+                stat = os.fstat(file.fileno())
+        except (FileNotFoundError, ValueError):
+            return None
+        return CacheEntry(tag, content, header.get('etag'), header.get('last_modified'), stat.st_mtime, stat.st_ino)
+
+    def _write(self, key, entry):
+        header = json.dumps({'etag': entry.etag, 'last_modified': entry.last_modified}).encode('utf-8')
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.entry')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(header)
+                file.write(b'\n')
+                file.write(entry.content)
+            os.utime(temp_path, (entry.stored, entry.stored))
+            os.replace(temp_path, self._get_path(key, entry.tag))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self._evict_files()
+        return os.stat(self._get_path(key, entry.tag)).st_ino
+
+    def _evict_files(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if _get_file_tag(name) is None:
+                continue
+            try:
+                files.append((os.stat(os.path.join(self.directory, name)), name))
+            except FileNotFoundError:
+                pass
+        size = sum(stat.st_size for stat, _ in files)
+        # the oldest stored entries go first
+        for stat, name in sorted(files, key=lambda file: file[0].st_mtime):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            size -= stat.st_size
+
+
+def get_tag(path):
+    """
+    Get the endpoint ('forms', 'form' or 'catalog') and the resource tag of a request path
+
+    Returns:
+        (endpoint, tag) tuple, (None, None) for paths that are not cached
+    """
+    if path == '/forms':
+        return 'forms', 'forms'
+    match = _FORM_PATH.match(path)
+    if match:
+        return 'form', 'form-{}'.format(match.group(1))
+    match = _CATALOG_PATH.match(path)
+    if match:
+        return 'catalog', 'catalog-{}'.format(match.group(1))
+    return None, None
+
+
+_FORM_PATH = re.compile(r'^/forms/(\d+)$')
+_CATALOG_PATH = re.compile(r'^/catalogs/(\d+)(?:[/?]|$)')
+_ENTRY_SUFFIX = '.entry'
+
+
+def _get_file_tag(name):
+    # tag.key.entry, temporary files start with a dot
+    if name.startswith('.') or not name.endswith(_ENTRY_SUFFIX):
+        return None
+    return name.split('.', 1)[0]
@@ -0,0 +1,191 @@
+'''
+Local catalog diff
+
+Compares a catalog with its new rows and builds the minimal UpdateCatalogItemsRequest: new and changed rows
+to upsert and keys of the missing rows to delete. Rows are matched by the key, the first column of a catalog.
+The current catalog is kept as a snapshot of row hashes by key and the new rows are read one by one,
+so neither the current nor the new catalog has to be held in memory.
+usage:
+
+    >>> from pyrus.catalog_diff import CatalogSnapshot, diff_catalog
+    >>> snapshot = CatalogSnapshot.from_response(pyrus_client.get_catalog(catalog_id))
+    >>> diff = diff_catalog(snapshot, read_erp_rows())
+    >>> if diff:
+           pyrus_client.update_catalog_items(catalog_id, diff.to_request())
+           snapshot.update(diff)
+           snapshot.save('catalog.json')
+'''
+
+import json
+import os
+import tempfile
+from hashlib import blake2b
+from .models import entities, requests as req, responses as resp
+
+
+class CatalogSnapshot:
+    """
+        Hashes of catalog rows by key. Takes a few dozen bytes per row whatever the row size
+
+        Args:
+            hashes (:obj:`dict` of :obj:`str` as key and :obj:`int` as value, optional): Row hashes by key
+    """
+
+    def __init__(self, hashes=None):
+        self.hashes = hashes if hashes is not None else {}
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __contains__(self, key):
+        return key in self.hashes
+
+    @classmethod
+    def from_response(cls, catalog_response):
+        """
+        Args:
+            catalog_response (:obj:`models.responses.CatalogResponse`): Catalog
+        """
+        if not isinstance(catalog_response, resp.CatalogResponse):
+            raise TypeError('catalog_response must be an instance of models.responses.CatalogResponse')
+        return cls.from_rows(catalog_response.items or [])
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Args:
+            rows (iterable of :obj:`list` of :obj:`str` or :obj:`models.entities.CatalogItem`): Catalog rows
+        """
+        hashes = {}
+        for row in rows:
+            values = _get_values(row)
+            hashes[values[0]] = hash_row(values)
+        return cls(hashes)
+
+    def update(self, diff):
+        """
+        Apply a diff that was sent to the server
+
+        Args:
+            diff (:class:`CatalogDiff`): Applied changes
+        """
+        for values in diff.upsert:
+            self.hashes[values[0]] = hash_row(values)
+        for key in diff.delete:
+            self.hashes.pop(key, None)
+
+    def save(self, path):
+        """
+        Save the snapshot to a json file. The file is replaced atomically
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.catalog')
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump(self.hashes, file)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load the snapshot saved by :meth:`save`
+        """
+        with open(path) as file:
+            return cls(json.load(file))
+
+
+class CatalogDiff:
+    """
+        Changes of a catalog
+
+        Attributes:
+            upsert (:obj:`list` of :obj:`list` of :obj:`str`): New and changed rows
+            delete (:obj:`list` of :obj:`str`): Keys of the deleted rows
+            added_count (:obj:`int`): Number of new rows in upsert
+            updated_count (:obj:`int`): Number of changed rows in upsert
+    """
+
+    def __init__(self):
+        self.upsert = []
+        self.delete = []
+        self.added_count = 0
+        self.updated_count = 0
+
+    def __bool__(self):
+        return bool(self.upsert or self.delete)
+
+    def to_request(self):
+        """
+        Returns:
+            :obj:`models.requests.UpdateCatalogItemsRequest` object
+        """
+        return req.UpdateCatalogItemsRequest(upsert=self.upsert, delete=self.delete)
+
+
+def diff_catalog(current, rows):
+    """
+    Compare a catalog with its new rows
+
+    Args:
+        current (:class:`CatalogSnapshot` or :obj:`models.responses.CatalogResponse`): Current catalog
+        rows (iterable of :obj:`list` of :obj:`str` or :obj:`models.entities.CatalogItem`): All rows
+            the catalog should have. Rows are read one by one, a generator keeps memory bounded
+
+    Returns:
+        :class:`CatalogDiff` object
+
+    Raises:
+        ValueError: a row has no key or two rows have the same key
+    """
+    if not isinstance(current, CatalogSnapshot):
+        current = CatalogSnapshot.from_response(current)
+    hashes = current.hashes
+    # the set shares the keys of the snapshot, only the keys of new rows are kept in addition
+    remaining = set(hashes)
+    added = set()
+    diff = CatalogDiff()
+    for row in rows:
+        values = _get_values(row)
+        key = values[0]
+        old_hash = hashes.get(key)
+        if old_hash is None:
+            if key in added:
+                raise ValueError('rows have duplicate key {!r}'.format(key))
+            added.add(key)
+            diff.upsert.append(values)
+            diff.added_count += 1
+            continue
+        if key not in remaining:
+            raise ValueError('rows have duplicate key {!r}'.format(key))
+        remaining.remove(key)
+        if old_hash != hash_row(values):
+            diff.upsert.append(values)
+            diff.updated_count += 1
+    diff.delete = [key for key in hashes if key in remaining]
+    return diff
+
+
+def hash_row(values):
+    """
+    Get the hash of a catalog row that is stable between processes
+
+    Args:
+        values (:obj:`list` of :obj:`str`): Row values
+    """
+    # repr of a list separates values unambiguously
+    return int.from_bytes(blake2b(repr(values).encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'big')
+
+
+def _get_values(row):
+    if isinstance(row, entities.CatalogItem):
+        values = row.values
+    elif isinstance(row, (list, tuple)):
+        values = row
+    else:
+        raise TypeError('rows must be lists of str or models.entities.CatalogItem')
+    if not values:
+        raise ValueError('catalog row must have a key')
+    return list(values)
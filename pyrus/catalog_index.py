@@ -0,0 +1,341 @@
+'''
+Indexed in-memory catalog
+
+Keeps the items of a catalog by columns: one list of values per header and one array of item ids,
+with every distinct value stored once. Lookups by any header use hash indexes built on the first lookup
+of the column, wildcard search runs over the distinct values of the column only.
+Values are compared as is, wildcard patterns ('*' matches any characters, as in
+:class:`models.catalog_item_filters.CatalogItemFilters` with use_wildcard) are compared case-insensitively.
+usage:
+
+    >>> from pyrus.catalog_index import CatalogIndex
+    >>> index = CatalogIndex.from_response(pyrus_client.get_catalog(catalog_id))
+    >>> value = index.catalog_value({'Code': 'A-15'})
+    >>> request = TaskCommentRequest(field_updates=[FormField(id=field_id, value=value)])
+    >>> item_ids = index.find({'Name': 'Mos*', 'Country': 'Russia'}, use_wildcard=True)
+    >>> response = index.filter(CatalogItemFilters([CatalogItemFilter('Name', 'Mos*')], use_wildcard=True))
+'''
+
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from .models import entities, responses as resp
+from .models.catalog_item_filters import CatalogItemFilters
+
+
+class CatalogIndex:
+    """
+        Catalog stored by columns
+
+        Args:
+            catalog_id (:obj:`int`): Catalog id
+            headers (:obj:`list` of :obj:`str`): Column names
+            item_ids (:obj:`list` of :obj:`int`): Item ids
+            columns (:obj:`list` of :obj:`list` of :obj:`str`): Values of every column in the order of item_ids
+            header_types (:obj:`list` of :obj:`str`, optional): Column types (text/workflow)
+            source_type (:obj:`str`, optional): Catalog source type
+
+        Attributes:
+            catalog_id (:obj:`int`): Catalog id
+            headers (:obj:`list` of :obj:`str`): Column names
+            header_types (:obj:`list` of :obj:`str`): Column types
+            source_type (:obj:`str`): Catalog source type
+    """
+
+    def __init__(self, catalog_id, headers, item_ids, columns, header_types=None, source_type=None):
+        if len(columns) != len(headers):
+            raise ValueError('columns must have a list of values for every header')
+        if any(len(column) != len(item_ids) for column in columns):
+            raise ValueError('columns must have a value for every item')
+        self.catalog_id = catalog_id
+        self.headers = [_intern(header) for header in headers]
+        self.header_types = list(header_types) if header_types is not None else [None] * len(headers)
+        self.source_type = source_type
+        self._item_ids = array('q', item_ids)
+        self._columns = [_share_values(column) for column in columns]
+        self._column_numbers = {}
+        for number, header in enumerate(self.headers):
+            self._column_numbers.setdefault(header, number)
+        self._positions = None
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_response(cls, catalog_response):
+        """
+        Args:
+            catalog_response (:obj:`models.responses.CatalogResponse`): Catalog
+        """
+        if not isinstance(catalog_response, resp.CatalogResponse):
+            raise TypeError('catalog_response must be an instance of models.responses.CatalogResponse')
+        catalog_headers = catalog_response.catalog_headers or []
+        headers = [header.name for header in catalog_headers]
+        items = catalog_response.items or []
+        columns = [[] for _ in headers]
+        for item in items:
+            values = item.values or []
+            for number, column in enumerate(columns):
+                column.append(values[number] if number < len(values) else None)
+        return cls(catalog_response.catalog_id, headers, [item.item_id for item in items], columns,
+                   [header.type for header in catalog_headers], catalog_response.source_type)
+
+    def __len__(self):
+        return len(self._item_ids)
+
+    def __contains__(self, item_id):
+        return item_id in self._get_positions()
+
+    def get_values(self, item_id):
+        """
+        Returns:
+            :obj:`list` of :obj:`str` values of the item or None if there is no such item
+        """
+        position = self._get_positions().get(item_id)
+        if position is None:
+            return None
+        return [column[position] for column in self._columns]
+
+    def get_item(self, item_id):
+        """
+        Returns:
+            :obj:`models.entities.CatalogItem` object or None if there is no such item
+        """
+        values = self.get_values(item_id)
+        if values is None:
+            return None
+        return entities.CatalogItem(item_id=item_id, values=values, headers=self.headers)
+
+    def find(self, criteria, use_wildcard=False):
+        """
+        Find items whose columns have the given values
+
+        Args:
+            criteria (:obj:`dict` of :obj:`str` as key and :obj:`str` as value): Values by column name
+            use_wildcard (:obj:`bool`, optional): Values are patterns where '*' matches any characters,
+                compared case-insensitively
+
+        Returns:
+            :obj:`list` of :obj:`int` item ids in the order of the catalog
+        """
+        positions = self._find_positions(_get_criteria(criteria), use_wildcard)
+        item_ids = self._item_ids
+        return [item_ids[position] for position in positions]
+
+    def find_one(self, criteria, use_wildcard=False):
+        """
+        Returns:
+            :obj:`int` id of the first item that matches criteria, see :meth:`find`, or None
+        """
+        positions = self._find_positions(_get_criteria(criteria), use_wildcard)
+        return self._item_ids[positions[0]] if positions else None
+
+    def catalog_value(self, criteria, use_wildcard=False):
+        """
+        Get the value of a catalog field that selects the items matching criteria, see :meth:`find`
+
+        Returns:
+            :obj:`models.entities.CatalogValue` object or None if no item matches
+        """
+        item_ids = self.find(criteria, use_wildcard)
+        if not item_ids:
+            return None
+        return entities.CatalogValue(item_ids=item_ids)
+
+    def filter(self, filters):
+        """
+        Evaluate catalog item filters locally: all filters must match, see :meth:`find`
+
+        Args:
+            filters (:class:`models.catalog_item_filters.CatalogItemFilters`): Catalog item filters
+
+        Returns:
+            :obj:`models.responses.CatalogResponse` object with the matching items
+        """
+        return resp.CatalogResponse(**self.get_response_data(filters))
+
+    def get_response_data(self, filters=None):
+        """
+        Get the decoded JSON of the get_catalog response with the items matching filters
+
+        Args:
+            filters (:class:`models.catalog_item_filters.CatalogItemFilters`, optional): Catalog item filters
+
+        Returns:
+            :obj:`dict` with catalog_id, catalog_headers, source_type and items
+        """
+        if filters is not None and not isinstance(filters, CatalogItemFilters):
+            raise TypeError('filters must be an instance of models.catalog_item_filters.CatalogItemFilters')
+        if filters is None or not filters.filters:
+            positions = range(len(self._item_ids))
+        else:
+            criteria = [(item_filter.column_name, item_filter.value) for item_filter in filters.filters]
+            positions = self._find_positions(criteria, filters.use_wildcard)
+        columns = self._columns
+        item_ids = self._item_ids
+        data = {
+            'catalog_id': self.catalog_id,
+            'catalog_headers': [{'name': name, 'type': header_type}
+                                for name, header_type in zip(self.headers, self.header_types)],
+            'items': [{'item_id': item_ids[position], 'values': [column[position] for column in columns]}
+                      for position in positions]
+        }
+        if self.source_type is not None:
+            data['source_type'] = self.source_type
+        return data
+
+    def _find_positions(self, criteria, use_wildcard):
+        lookups = [(self._get_column_index(header), self._columns[self._column_numbers[header]], value)
+                   for header, value in criteria]
+        # the most selective criterion finds candidates, the rest are checked on the values of the candidates
+        lookups.sort(key=lambda lookup: lookup[0].get_cost(lookup[2], use_wildcard))
+        index, _, value = lookups[0]
+        positions = index.search(value) if use_wildcard else index.get(value)
+        for index, column, value in lookups[1:]:
+            if not positions:
+                break
+            match = index.get_matcher(value, use_wildcard)
+            positions = [position for position in positions if match(column[position])]
+        return positions
+
+    def _get_column_index(self, header):
+        number = self._column_numbers.get(header)
+        if number is None:
+            raise ValueError('catalog has no column {!r}'.format(header))
+        index = self._indexes.get(number)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(number)
+                if index is None:
+                    index = _ColumnIndex(self._columns[number])
+                    self._indexes[number] = index
+        return index
+
+    def _get_positions(self):
+        positions = self._positions
+        if positions is None:
+            positions = {}
+            for position, item_id in enumerate(self._item_ids):
+                positions.setdefault(item_id, position)
+            self._positions = positions
+        return positions
+
+
+class _ColumnIndex:
+    # positions of the values of a column, a position is stored as int while a value is unique
+
+    def __init__(self, column):
+        positions = {}
+        for position, value in enumerate(column):
+            if value is None:
+                continue
+            current = positions.get(value)
+            if current is None:
+                positions[value] = position
+            elif isinstance(current, int):
+                positions[value] = [current, position]
+            else:
+                current.append(position)
+        self._positions = positions
+        self._count = len(column) - column.count(None)
+        self._folded = None
+        self._folded_values = None
+        self._lock = threading.Lock()
+
+    def get(self, value):
+        current = self._positions.get(value)
+        if current is None:
+            return []
+        if isinstance(current, int):
+            return [current]
+        return current
+
+    def search(self, pattern):
+        if not isinstance(pattern, str):
+            return self.get(pattern)
+        folded, folded_values = self._get_folded()
+        pattern = pattern.casefold()
+        prefix = pattern.split('*', 1)[0]
+        start = bisect_left(folded, prefix)
+        if '*' not in pattern:
+            candidates = folded[start:start + 1] if start < len(folded) and folded[start] == pattern else []
+        elif pattern == prefix + '*':
+            candidates = self._iter_prefixed(folded, start, prefix)
+        else:
+            regex = _compile(pattern)
+            candidates = [value for value in self._iter_prefixed(folded, start, prefix) if regex.fullmatch(value)]
+        result = []
+        for value in candidates:
+            for original in folded_values[value]:
+                result.extend(self.get(original))
+        if len(result) > 1:
+            result.sort()
+        return result
+
+    def get_cost(self, value, use_wildcard):
+        # estimated number of distinct values to scan and positions to find
+        if not use_wildcard or not isinstance(value, str):
+            return len(self.get(value))
+        folded, _ = self._get_folded()
+        if not folded:
+            return 0
+        pattern = value.casefold()
+        prefix = pattern.split('*', 1)[0]
+        scanned = bisect_left(folded, prefix + _MAX_CHAR) - bisect_left(folded, prefix)
+        positions = scanned * self._count / len(folded)
+        if pattern != prefix and pattern != prefix + '*':
+            # the part after the prefix filters the scanned values further
+            positions /= 10
+        return scanned + positions
+
+    def get_matcher(self, pattern, use_wildcard):
+        if not use_wildcard or not isinstance(pattern, str):
+            # not pattern.__eq__: it returns truthy NotImplemented for empty cells
+            return lambda value: value == pattern
+        regex = _compile(pattern.casefold())
+        return lambda value: value is not None and regex.fullmatch(value.casefold()) is not None
+
+    def _iter_prefixed(self, folded, start, prefix):
+        for position in range(start, len(folded)):
+            value = folded[position]
+            if not value.startswith(prefix):
+                break
+            yield value
+
+    def _get_folded(self):
+        if self._folded is None:
+            with self._lock:
+                if self._folded is None:
+                    folded_values = {}
+                    for value in self._positions:
+                        if isinstance(value, str):
+                            folded_values.setdefault(value.casefold(), []).append(value)
+                    self._folded_values = folded_values
+                    self._folded = sorted(folded_values)
+        return self._folded, self._folded_values
+
+
+_MAX_CHAR = chr(sys.maxunicode)
+
+
+def _compile(pattern):
+    return re.compile('.*'.join(re.escape(part) for part in pattern.split('*')), re.DOTALL)
+
+
+def _get_criteria(criteria):
+    if not isinstance(criteria, dict) or not criteria:
+        raise TypeError('criteria must be a non-empty dict of column names and values')
+    return list(criteria.items())
+
+
+def _intern(value):
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+def _share_values(column):
+    # values repeat a lot in catalog columns (cities, statuses, ...): keep one copy of each
+    shared = {}
+    return [shared.setdefault(value, value) if type(value) is str else value for value in column]
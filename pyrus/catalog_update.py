@@ -0,0 +1,247 @@
+'''
+Chunked catalog updates
+
+Splits an UpdateCatalogItemsRequest into chunks bounded by the number of items and the body size,
+so big changes neither time out nor exceed the request size limit, and merges the responses of the chunks.
+Completed chunks are recorded in a checkpoint: a rerun with the same changes sends only the rest.
+usage:
+
+    >>> from pyrus.catalog_update import UpdateCheckpoint
+    >>> checkpoint = UpdateCheckpoint('catalog_update.json')
+    >>> response = pyrus_client.update_catalog_items_in_chunks(catalog_id, request, checkpoint=checkpoint)
+    >>> if response.error_code:
+           # some chunks failed, the next run with the same request sends only them
+    >>> checkpoint.clear()
+'''
+
+import json
+import os
+import tempfile
+import threading
+from hashlib import blake2b
+from .models import requests as req, responses as resp
+from .serialization import RequestEncoder
+
+
+class UpdateCheckpoint:
+    """
+        Ids of the completed chunks of catalog updates
+
+        Args:
+            path (:obj:`str`, optional): Json file to keep the ids in. The file is replaced atomically
+                after every completed chunk. By default ids are kept in memory
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done = set(self._read())
+
+    def is_done(self, chunk_id):
+        with self._lock:
+            return chunk_id in self._done
+
+    def mark_done(self, chunk_id):
+        with self._lock:
+            self._done.add(chunk_id)
+            self._write()
+
+    def clear(self):
+        """
+        Forget all completed chunks
+        """
+        with self._lock:
+            self._done.clear()
+            if self.path is not None and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _read(self):
+        if self.path is None:
+            return []
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return []
+
+    def _write(self):
+        if self.path is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.checkpoint')
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump(sorted(self._done), file)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+class UpdateChunk:
+    """
+        Part of a catalog update
+
+        Attributes:
+            chunk_id (:obj:`str`): Hash of the chunk content, the same for the same items
+            request (:obj:`models.requests.UpdateCatalogItemsRequest`): Request with the items of the chunk
+            items_count (:obj:`int`): Number of upserted and deleted items
+            body_size (:obj:`int`): Estimated size of the request body in bytes
+    """
+
+    def __init__(self, chunk_id, request, items_count, body_size):
+        self.chunk_id = chunk_id
+        self.request = request
+        self.items_count = items_count
+        self.body_size = body_size
+
+
+class CatalogUpdate:
+    """
+        State of a chunked catalog update: the chunks left to send and their responses.
+        Used by :meth:`pyrus.client.PyrusAPI.update_catalog_items_in_chunks`
+
+        Args:
+            chunks (:obj:`list` of :class:`UpdateChunk`): All chunks of the update
+            checkpoint (:class:`UpdateCheckpoint`, optional): Completed chunks, they are not sent again
+            progress (:obj:`callable`, optional): Called with the number of completed chunks and the number of chunks
+                after every chunk
+
+        Attributes:
+            pending (:obj:`list` of :class:`UpdateChunk`): Chunks to send
+    """
+
+    def __init__(self, chunks, checkpoint=None, progress=None):
+        if checkpoint is not None and not isinstance(checkpoint, UpdateCheckpoint):
+            raise TypeError('checkpoint must be an instance of pyrus.catalog_update.UpdateCheckpoint')
+        if progress is not None and not callable(progress):
+            raise TypeError('progress must be callable')
+        self.chunks = chunks
+        self.checkpoint = checkpoint
+        self.progress = progress
+        self.pending = [chunk for chunk in chunks if checkpoint is None or not checkpoint.is_done(chunk.chunk_id)]
+        self._completed = len(chunks) - len(self.pending)
+        self._responses = {}
+
+    def complete(self, chunk, response):
+        """
+        Record the response of a sent chunk
+        """
+        self._responses[chunk.chunk_id] = response
+        if not response.error_code:
+            if self.checkpoint is not None:
+                self.checkpoint.mark_done(chunk.chunk_id)
+            self._completed += 1
+        if self.progress is not None:
+            self.progress(self._completed, len(self.chunks))
+
+    def result(self):
+        """
+        Merge the responses of the sent chunks in the order of chunks
+
+        Returns:
+            class:`models.responses.SyncCatalogResponse` object. error_code and error are set if a chunk failed
+        """
+        return merge_responses([self._responses[chunk.chunk_id] for chunk in self.pending
+                                if chunk.chunk_id in self._responses])
+
+
+def split_request(update_catalog_items_request, max_items=1000, max_bytes=1024 * 1024, encoder=None):
+    """
+    Split a catalog update into chunks. Upserted items go first, then deleted keys.
+    An item larger than max_bytes is sent in a chunk of its own
+
+    Args:
+        update_catalog_items_request (:obj:`models.requests.UpdateCatalogItemsRequest`): Catalog changes
+        max_items (:obj:`int`, optional): Maximum number of upserted and deleted items in a chunk
+        max_bytes (:obj:`int`, optional): Maximum size of a chunk request body
+        encoder (:obj:`pyrus.serialization.RequestEncoder`, optional): Encoder the requests are sent with
+
+    Returns:
+        :obj:`list` of :class:`UpdateChunk` objects
+    """
+    if not isinstance(update_catalog_items_request, req.UpdateCatalogItemsRequest):
+        raise TypeError('update_catalog_items_request must be an instance '
+                        'of models.requests.UpdateCatalogItemsRequest')
+    if not isinstance(max_items, int) or max_items < 1:
+        raise ValueError('max_items should be a positive int')
+    if not isinstance(max_bytes, int) or max_bytes < 1:
+        raise ValueError('max_bytes should be a positive int')
+    if encoder is None:
+        encoder = RequestEncoder()
+    chunks = []
+    builder = _ChunkBuilder()
+    for kind, items in ((b'upsert', getattr(update_catalog_items_request, 'upsert', None) or []),
+                        (b'delete', getattr(update_catalog_items_request, 'delete', None) or [])):
+        for item in items:
+            data = encoder.encode(item)
+            if builder.items_count and (builder.items_count >= max_items or
+                                        builder.body_size + len(data) + _SEPARATOR_SIZE > max_bytes):
+                chunks.append(builder.build())
+                builder = _ChunkBuilder()
+            builder.add(kind, item, data)
+    if builder.items_count:
+        chunks.append(builder.build())
+    return chunks
+
+
+def merge_responses(responses):
+    """
+    Merge responses of catalog update chunks
+
+    Args:
+        responses (:obj:`list` of class:`models.responses.SyncCatalogResponse`): Responses of chunks
+
+    Returns:
+        class:`models.responses.SyncCatalogResponse` object with added, updated and deleted items of all chunks.
+        error_code and error of the first failed chunk are set if a chunk failed
+    """
+    merged = resp.SyncCatalogResponse()
+    merged.added = []
+    merged.updated = []
+    merged.deleted = []
+    failed = [response for response in responses if response.error_code]
+    for response in responses:
+        if response.error_code:
+            continue
+        merged.added.extend(response.added or [])
+        merged.updated.extend(response.updated or [])
+        merged.deleted.extend(response.deleted or [])
+        if response.catalog_headers is not None:
+            merged.catalog_headers = response.catalog_headers
+        if response.source_type is not None:
+            merged.source_type = response.source_type
+        if response.apply is not None:
+            merged.apply = response.apply if merged.apply is None else merged.apply and response.apply
+    if failed:
+        merged.error_code = failed[0].error_code
+        merged.error = '{} of {} chunks failed: {}'.format(len(failed), len(responses), failed[0].error)
+    return merged
+
+
+# ", " between the items of a list
+_SEPARATOR_SIZE = 2
+# {"upsert": [], "delete": []}
+_BODY_SIZE = 28
+
+
+class _ChunkBuilder:
+
+    def __init__(self):
+        self.upsert = []
+        self.delete = []
+        self.items_count = 0
+        self.body_size = _BODY_SIZE
+        self._hash = blake2b(digest_size=16)
+
+    def add(self, kind, item, data):
+        (self.upsert if kind == b'upsert' else self.delete).append(item)
+        self.items_count += 1
+        self.body_size += len(data) + _SEPARATOR_SIZE
+        self._hash.update(kind)
+        self._hash.update(len(data).to_bytes(8, 'big'))
+        self._hash.update(data)
+
+    def build(self):
+        request = req.UpdateCatalogItemsRequest(upsert=self.upsert, delete=self.delete)
+        return UpdateChunk(self._hash.hexdigest(), request, self.items_count, self.body_size)
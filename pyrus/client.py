@@ -15,20 +15,37 @@ usage:
 Full documentation for PyrusAPI is at https://pyrus.com/en/help/api
 '''
 
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from enum import Enum
 from urllib.parse import urlparse
-import jsonpickle
+import copy
+import functools
+import hashlib
+import io
 import os
 import re
+import threading
+import time
+import uuid
 import requests
-from .models import responses as resp, requests as req
+from requests.adapters import HTTPAdapter
+from .models import responses as resp, requests as req, entities, lazy as lazy_models
+from .models.catalog_item_filters import CatalogItemFilters
+from .models.projection import Projection
 from email.message import Message
-from . import version
+from . import catalog_update, version
+from .cache import ResponseCache
+from .catalog_index import CatalogIndex
+from .retry import RetryPolicy
+from .ratelimit import RateLimiter
+from .serialization import RequestEncoder, ResponseDecoder
 
 
-class PyrusAPI:
+class BasePyrusAPI:
     """
-    PyrusApi client
+    Base Pyrus API client. Holds credentials, builds requests and responses.
+    Should never be created explicitly, use :class:`PyrusAPI` or :class:`pyrus.async_client.AsyncPyrusAPI`
 
     Args:
         login (:obj:`str`): User's login (email)
@@ -36,6 +53,13 @@ class PyrusAPI:
         access_token (:obj:`str`, optional): User's access token. You can specify it if you already have one. (optional)
         proxy (:obj:`str`, optional): Proxy server url
         person_id (:obj:`int`,optional): User's person id
+        retry_policy (:obj:`pyrus.retry.RetryPolicy`, optional): Retry policy for throttled and failed requests
+        rate_limiter (:obj:`pyrus.ratelimit.RateLimiter`, optional): Limits the request rate before requests are sent
+        request_encoder (:obj:`pyrus.serialization.RequestEncoder`, optional): Serializes request bodies
+        response_decoder (:obj:`pyrus.serialization.ResponseDecoder`, optional): Decodes response bodies
+        lazy (:obj:`bool`, optional): Build tasks of responses on first attribute access, see :mod:`pyrus.models.lazy`
+        keep_original_response (:obj:`bool`, optional): Keep the decoded JSON in ``original_response`` of responses
+        response_cache (:obj:`pyrus.cache.ResponseCache`, optional): Caches responses of forms and catalogs
     """
     MAX_FILE_SIZE_IN_BYTES = 2 * 1024 * 1024 * 1024 - 1 # 2GB - 1B
     MAX_ANNOUNCEMENT_COUNT  = 10000
@@ -61,7 +85,9 @@ class PyrusAPI:
     _user_agent = 'Pyrus API python client v {}'.format(version.VERSION)
     proxy = None
 
-    def __init__(self, login=None, security_key=None, access_token=None, proxy=None, person_id=None):
+    def __init__(self, login=None, security_key=None, access_token=None, proxy=None, person_id=None,
+                 retry_policy=None, rate_limiter=None, request_encoder=None, response_decoder=None, lazy=False,
+                 keep_original_response=True, response_cache=None):
         self.security_key = security_key
         self.access_token = access_token
         self.login = login
@@ -71,6 +97,98 @@ class PyrusAPI:
                 'https': proxy,
             }
         self.person_id = person_id
+        if retry_policy is not None and not isinstance(retry_policy, RetryPolicy):
+            raise TypeError('retry_policy must be an instance of pyrus.retry.RetryPolicy')
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        if rate_limiter is not None and not isinstance(rate_limiter, RateLimiter):
+            raise TypeError('rate_limiter must be an instance of pyrus.ratelimit.RateLimiter')
+        self.rate_limiter = rate_limiter
+        if request_encoder is not None and not isinstance(request_encoder, RequestEncoder):
+            raise TypeError('request_encoder must be an instance of pyrus.serialization.RequestEncoder')
+        self.request_encoder = request_encoder if request_encoder is not None else RequestEncoder()
+        if response_decoder is not None and not isinstance(response_decoder, ResponseDecoder):
+            raise TypeError('response_decoder must be an instance of pyrus.serialization.ResponseDecoder')
+        self.response_decoder = response_decoder if response_decoder is not None else ResponseDecoder()
+        self.lazy = lazy
+        self.keep_original_response = keep_original_response
+        self.projection = None
+        if response_cache is not None and not isinstance(response_cache, ResponseCache):
+            raise TypeError('response_cache must be an instance of pyrus.cache.ResponseCache')
+        self.response_cache = response_cache
+
+    def with_retry_policy(self, retry_policy):
+        """
+        Get a client that shares connections and credentials with this one, but uses another retry policy.
+        Use it to override the policy for particular calls:
+
+            >>> pyrus_client.with_retry_policy(RetryPolicy(max_attempts=1)).comment_task(task_id, request)
+
+        Args:
+            retry_policy (:obj:`pyrus.retry.RetryPolicy`): Retry policy
+
+        Returns:
+            A client of the same class
+        """
+        if not isinstance(retry_policy, RetryPolicy):
+            raise TypeError('retry_policy must be an instance of pyrus.retry.RetryPolicy')
+        client = copy.copy(self)
+        client.retry_policy = retry_policy
+        return client
+
+    def with_original_response(self, keep_original_response):
+        """
+        Get a client that shares connections and credentials with this one, but keeps or drops
+        the decoded JSON of responses. Use it to read big responses without holding the raw data:
+
+            >>> pyrus_client.with_original_response(False).get_registry(form_id)
+
+        Args:
+            keep_original_response (:obj:`bool`): Keep the decoded JSON in ``original_response`` of responses
+
+        Returns:
+            A client of the same class
+        """
+        client = copy.copy(self)
+        client.keep_original_response = keep_original_response
+        return client
+
+    def with_projection(self, projection):
+        """
+        Get a client that shares connections and credentials with this one, but builds only the parts
+        of received tasks selected by projection. Use it to read a few fields of big tasks:
+
+            >>> pyrus_client.with_projection(Projection(fields=['status'], comments=False)).get_task(task_id)
+
+        Args:
+            projection (:obj:`pyrus.models.projection.Projection`): Parts of tasks to build, None builds everything
+
+        Returns:
+            A client of the same class
+        """
+        if projection is not None and not isinstance(projection, Projection):
+            raise TypeError('projection must be an instance of pyrus.models.projection.Projection')
+        client = copy.copy(self)
+        client.projection = projection
+        return client
+
+    def with_response_cache(self, response_cache):
+        """
+        Get a client that shares connections and credentials with this one, but uses another response cache.
+        Use it to get the current version of a form or a catalog:
+
+            >>> pyrus_client.with_response_cache(None).get_catalog(catalog_id)
+
+        Args:
+            response_cache (:obj:`pyrus.cache.ResponseCache`): Response cache, None disables caching
+
+        Returns:
+            A client of the same class
+        """
+        if response_cache is not None and not isinstance(response_cache, ResponseCache):
+            raise TypeError('response_cache must be an instance of pyrus.cache.ResponseCache')
+        client = copy.copy(self)
+        client.response_cache = response_cache
+        return client
 
     def auth(self, login=None, security_key=None, person_id=None):
         """
@@ -90,8 +208,7 @@ class PyrusAPI:
             self.security_key = security_key
         if person_id:
             self.person_id = person_id
-        response = self._auth()
-        return resp.AuthResponse(**response)
+        return self._perform_auth_request(resp.AuthResponse)
 
     def get_forms(self):
         """
@@ -100,8 +217,7 @@ class PyrusAPI:
         Returns: 
             class:`models.responses.FormsResponse` object
         """
-        response = self._perform_get_request('/forms')
-        return resp.FormsResponse(**response)
+        return self._perform_get_request('/forms', resp.FormsResponse, cached=True)
 
     def get_registry(self, form_id, form_register_request=None):
         """
@@ -119,14 +235,9 @@ class PyrusAPI:
             if not isinstance(form_register_request, req.FormRegisterRequest):
                 raise TypeError('form_register_request must be an instance '
                                 'of models.requests.FormRegisterRequest')
-            response = self._perform_post_request(path, form_register_request)
-        else:
-            response = self._perform_get_request(path)
-
-        if form_register_request and getattr(form_register_request, 'format', 'json') == "csv":
-            return response
-
-        return resp.FormRegisterResponse(**response)
+            return self._perform_post_request(path, form_register_request, resp.FormRegisterResponse,
+                                              idempotent=True)
+        return self._perform_get_request(path, resp.FormRegisterResponse)
 
     def get_contacts(self, include_inactive = False):
         """
@@ -138,12 +249,12 @@ class PyrusAPI:
         Returns: 
             class:`models.responses.ContactsResponse` object
         """
-        response = self._perform_get_request('/contacts?include_inactive={}'.format(include_inactive))
-        return resp.ContactsResponse(**response)
+        return self._perform_get_request('/contacts?include_inactive={}'.format(include_inactive), resp.ContactsResponse)
 
     def get_catalog(self, catalog_id, filters = None):
         """
-        Get a catalog
+        Get a catalog. With a response cache that holds the whole catalog within its time to live,
+        filters are evaluated locally over an index of the cached catalog instead of requesting the server
 
         Args:
             catalog_id (:obj:`int`): Catalog id
@@ -157,9 +268,11 @@ class PyrusAPI:
 
         url = '/catalogs/{}'.format(catalog_id)
         if filters:
+            data = self._filter_cached_catalog(url, filters)
+            if data is not None:
+                return self._create_local_response(data, resp.CatalogResponse)
             url += '?{}'.format(str(filters))
-        response = self._perform_get_request(url)
-        return resp.CatalogResponse(**response)
+        return self._perform_get_request(url, resp.CatalogResponse, cached=True)
 
     def get_form(self, form_id):
         """
@@ -174,8 +287,7 @@ class PyrusAPI:
         if not isinstance(form_id, int):
             raise Exception("form_id should be valid int")
 
-        response = self._perform_get_request('/forms/{}'.format(form_id))
-        return resp.FormResponse(**response)
+        return self._perform_get_request('/forms/{}'.format(form_id), resp.FormResponse, cached=True)
 
     def get_task(self, task_id):
         """
@@ -189,8 +301,7 @@ class PyrusAPI:
         """
         if not isinstance(task_id, int):
             raise Exception("task_id should be valid int")
-        response = self._perform_get_request('/tasks/{}'.format(task_id))
-        return resp.TaskResponse(**response)
+        return self._perform_get_request('/tasks/{}'.format(task_id), resp.TaskResponse)
     
     def get_announcement(self, announcement_id):
         """
@@ -204,8 +315,7 @@ class PyrusAPI:
         """
         if not isinstance(announcement_id, int):
             raise Exception("announcement_id should be valid int")
-        response = self._perform_get_request('/announcements/{}'.format(announcement_id))
-        return resp.AnnouncementResponse(**response)
+        return self._perform_get_request('/announcements/{}'.format(announcement_id), resp.AnnouncementResponse)
 
     def comment_task(self, task_id, task_comment_request):
         """
@@ -222,8 +332,7 @@ class PyrusAPI:
         if not isinstance(task_comment_request, req.TaskCommentRequest):
             raise TypeError('task_comment_request must be an instance '
                             'of models.requests.TaskCommentRequest')
-        response = self._perform_post_request('/tasks/{}/comments'.format(task_id), task_comment_request)
-        return resp.TaskResponse(**response)
+        return self._perform_post_request('/tasks/{}/comments'.format(task_id), task_comment_request, resp.TaskResponse)
     
     def comment_announcement(self, announcement_id, announcement_comment_request):
         """
@@ -240,8 +349,7 @@ class PyrusAPI:
         if not isinstance(announcement_comment_request, req.AnnouncementCommentRequest):
             raise TypeError('announcement_comment_request must be an instance '
                             'of models.requests.AnnouncementCommentRequest')
-        response = self._perform_post_request('/announcements/{}/comments'.format(announcement_id), announcement_comment_request)
-        return resp.AnnouncementResponse(**response)
+        return self._perform_post_request('/announcements/{}/comments'.format(announcement_id), announcement_comment_request, resp.AnnouncementResponse)
 
     def create_task(self, create_task_request):
         """
@@ -256,8 +364,7 @@ class PyrusAPI:
         if not isinstance(create_task_request, req.CreateTaskRequest):
             raise TypeError('create_task_request must be an instance '
                             'of models.requests.CreateTaskRequest')
-        response = self._perform_post_request('/tasks', create_task_request)
-        return resp.TaskResponse(**response)
+        return self._perform_post_request('/tasks', create_task_request, resp.TaskResponse)
 
     def get_announcements(self, item_count=100):
         """
@@ -275,9 +382,7 @@ class PyrusAPI:
         if item_count < 1 or item_count > self.MAX_ANNOUNCEMENT_COUNT:
             raise ValueError('item_count should be between 0 and {}'.format(self.MAX_ANNOUNCEMENT_COUNT))
         
-        response = self._perform_get_request('/announcements?item_count={}'.format(item_count))
-
-        return resp.AnnouncementsResponse(**response)
+        return self._perform_get_request('/announcements?item_count={}'.format(item_count), resp.AnnouncementsResponse)
     
     def create_announcement(self, create_announcement_request):
         """
@@ -292,21 +397,37 @@ class PyrusAPI:
         if not isinstance(create_announcement_request, req.CreateAnnouncementRequest):
             raise TypeError('create_announcement_request must be an instance '
                             'of models.requests.CreateAnnouncementRequest')
-        response = self._perform_post_request('/announcements', create_announcement_request)
-        return resp.AnnouncementResponse(**response)
+        return self._perform_post_request('/announcements', create_announcement_request, resp.AnnouncementResponse)
 
-    def upload_file(self, file_path):
+    def upload_file(self, file_path, filename=None, progress=None, chunk_size=1024 * 1024):
         """
         Upload files for subsequent attachment to tasks.
+        The file is streamed by chunks, it is never read to memory as a whole.
 
         Args:
-            file_path (:obj:`str`): Path to the file
+            file_path (:obj:`str`, binary file object or :obj:`bytes`): Path to the file, file object or file content.
+                A file object is read from its current position
+            filename (:obj:`str`, optional): File name. By default the name of the file
+            progress (:obj:`callable`, optional): Called with the number of sent bytes and the file size
+                after every chunk
+            chunk_size (:obj:`int`, optional): Size of chunks read from the file
+
+        A failed upload is retried from the beginning of the file: the server does not support resuming.
+        Not seekable file objects are never retried, if the access token expires while such a file is sent
+        the response has 'authorization_error' error_code and the file is not sent again.
 
         Returns: 
             class:`models.responses.UploadResponse` object
         """
-        response = self._perform_request_with_retry('/files/upload', self.HTTPMethod.POST, file_path=file_path)
-        return resp.UploadResponse(**response)
+        upload = _MultipartUpload(file_path, filename, chunk_size, progress)
+        if upload.size is not None:
+            self._check_file_size(upload.size)
+        client = self
+        if not upload.can_restart:
+            client = self.with_retry_policy(RetryPolicy(max_attempts=1))
+        # a repeated upload only creates one more unreferenced file, so it is safe to retry
+        return client._perform_request_with_retry('/files/upload', self.HTTPMethod.POST, upload=upload,
+                                                  response_type=resp.UploadResponse, idempotent=True)
 
     def get_lists(self):
         """
@@ -315,8 +436,7 @@ class PyrusAPI:
         Returns: 
             class:`models.responses.ListsResponse` object
         """
-        response = self._perform_get_request('/lists')
-        return resp.ListsResponse(**response)
+        return self._perform_get_request('/lists', resp.ListsResponse)
     
     def get_task_list(self, list_id, task_list_request=None):
         """
@@ -334,18 +454,21 @@ class PyrusAPI:
             if not isinstance(task_list_request, req.TaskListRequest):
                 raise TypeError('task_list_request must be an instance '
                                 'of models.requests.TaskListRequest')
-            response = self._perform_post_request(path, task_list_request)
-        else:
-            response = self._perform_get_request(path)
-
-        return resp.TaskListResponse(**response)
+            return self._perform_post_request(path, task_list_request, resp.TaskListResponse, idempotent=True)
+        return self._perform_get_request(path, resp.TaskListResponse)
 
-    def download_file(self, file_id):
+    def download_file(self, file_id, destination=None, chunk_size=1024 * 1024, expected_md5=None):
         """
         Download the file.
 
         Args:
             file_id (:obj:`int`): File id
+            destination (:obj:`str` or file object, optional): Path or binary file object the file is written to
+                by chunks. If not specified the whole file is returned in raw_file
+            chunk_size (:obj:`int`, optional): Size of chunks written to destination
+            expected_md5 (:obj:`str`, optional): Expected MD5 hash of the file (e.g. :obj:`models.entities.File` md5).
+                If the hash of the written file does not match, the response has 'checksum_mismatch' error_code
+                and the file written to the path is removed
 
         Returns: 
             class:`models.responses.DownloadResponse` object
@@ -353,22 +476,10 @@ class PyrusAPI:
         if not isinstance(file_id, int):
             raise TypeError('file_id must be an instance of int')
         path = '/services/attachment?Id=' + str(file_id)
-        response = self._perform_get_file_request(path)
-        if response.status_code == 200:
-            try:
-                m = Message()
-                m['Content-Disposition'] = response.headers['Content-Disposition']
-                filename = m.get_filename()
-            except:
-                filename = re.findall('filename=(.+)', response.headers['Content-Disposition'])
-            return resp.DownloadResponse(filename, response.content)
-        else:
-            if response.status_code == 401:
-                return resp.BaseResponse(**{'error_code': 'authorization_error'})
-            if response.status_code == 403 or response.status_code == 404:
-                return resp.BaseResponse(**{'error_code': 'access_denied_file'})
-            else:
-                return resp.BaseResponse(**{'error_code': 'ServerError'})
+        download = True
+        if destination is not None or expected_md5 is not None:
+            download = _FileDownload(destination, chunk_size, expected_md5)
+        return self._perform_get_file_request(path, resp.BaseResponse, download)
 
     def create_catalog(self, create_catalog_request):
         """
@@ -383,8 +494,7 @@ class PyrusAPI:
         if not isinstance(create_catalog_request, req.CreateCatalogRequest):
             raise TypeError('create_catalog_request must be an instance '
                             'of models.requests.CreateCatalogRequest')
-        response = self._perform_put_request('/catalogs', create_catalog_request)
-        return resp.CatalogResponse(**response)
+        return self._perform_put_request('/catalogs', create_catalog_request, resp.CatalogResponse)
 
     def sync_catalog(self, catalog_id, sync_catalog_request):
         """
@@ -404,8 +514,7 @@ class PyrusAPI:
         if not isinstance(sync_catalog_request, req.SyncCatalogRequest):
             raise TypeError('sync_catalog_request must be an instance '
                             'of models.requests.SyncCatalogRequest')
-        response = self._perform_post_request('/catalogs/{}'.format(catalog_id), sync_catalog_request)
-        return resp.SyncCatalogResponse(**response)
+        return self._perform_post_request('/catalogs/{}'.format(catalog_id), sync_catalog_request, resp.SyncCatalogResponse)
         
     def update_catalog_items(self, catalog_id, update_catalog_items_request):
         """
@@ -420,8 +529,7 @@ class PyrusAPI:
         if not isinstance(update_catalog_items_request, req.UpdateCatalogItemsRequest):
             raise TypeError('update_catalog_items_request must be an instance '
                             'of models.requests.UpdateCatalogItemsRequest')
-        response = self._perform_post_request('/catalogs/{}/diff'.format(catalog_id), update_catalog_items_request)
-        return resp.SyncCatalogResponse(**response)
+        return self._perform_post_request('/catalogs/{}/diff'.format(catalog_id), update_catalog_items_request, resp.SyncCatalogResponse)
 
     def get_roles(self):
         """
@@ -430,8 +538,7 @@ class PyrusAPI:
             class:`models.responses.RolesResponse` object
         """
 
-        response = self._perform_get_request('/roles')
-        return resp.RolesResponse(**response)
+        return self._perform_get_request('/roles', resp.RolesResponse)
 
     def get_role(self, role_id):
         """
@@ -442,8 +549,7 @@ class PyrusAPI:
             class:`models.responses.RoleResponse` object
         """
 
-        response = self._perform_get_request('/roles/{}'.format(role_id))
-        return resp.RoleResponse(**response)
+        return self._perform_get_request('/roles/{}'.format(role_id), resp.RoleResponse)
 
     def create_role(self, create_role_request):
         """
@@ -458,8 +564,7 @@ class PyrusAPI:
             raise TypeError('create_role_request must be an instance '
                             'of models.requests.CreateRoleRequest')
 
-        response = self._perform_post_request('/roles', create_role_request)
-        return resp.RoleResponse(**response)
+        return self._perform_post_request('/roles', create_role_request, resp.RoleResponse)
 
     def update_role(self, role_id, update_role_request):
         """
@@ -475,8 +580,7 @@ class PyrusAPI:
             raise TypeError('update_role_request must be an instance '
                             'of models.requests.UpdateRoleRequest')
 
-        response = self._perform_put_request('/roles/{}'.format(role_id), update_role_request)
-        return resp.RoleResponse(**response)
+        return self._perform_put_request('/roles/{}'.format(role_id), update_role_request, resp.RoleResponse)
     
     def delete_role(self, role_id, delete_role_request):
         """
@@ -488,8 +592,7 @@ class PyrusAPI:
             class:`models.responses.RoleResponse` object
         """
 
-        response = self._perform_delete_request('/roles/{}'.format(role_id), delete_role_request)
-        return resp.RoleResponse(**response)
+        return self._perform_delete_request('/roles/{}'.format(role_id), delete_role_request, resp.RoleResponse)
 
     def get_members(self):
         """
@@ -498,8 +601,7 @@ class PyrusAPI:
             class:`models.responses.MembersResponse` object
         """
 
-        response = self._perform_get_request('/members')
-        return resp.MembersResponse(**response)
+        return self._perform_get_request('/members', resp.MembersResponse)
 
     def get_member(self, member_id):
         """
@@ -510,8 +612,7 @@ class PyrusAPI:
             class:`models.responses.MemberResponse` object
         """
 
-        response = self._perform_get_request('/members/{}'.format(member_id))
-        return resp.MemberResponse(**response)
+        return self._perform_get_request('/members/{}'.format(member_id), resp.MemberResponse)
 
     def create_member(self, create_member_request):
         """
@@ -526,8 +627,7 @@ class PyrusAPI:
             raise TypeError('create_member_request must be an instance '
                             'of models.requests.CreateMemberRequest')
 
-        response = self._perform_post_request('/members', create_member_request)
-        return resp.MemberResponse(**response)
+        return self._perform_post_request('/members', create_member_request, resp.MemberResponse)
 
     def update_member(self, member_id, update_member_request):
         """
@@ -543,8 +643,7 @@ class PyrusAPI:
             raise TypeError('update_member_request must be an instance '
                             'of models.requests.UpdateMemberRequest')
 
-        response = self._perform_put_request('/members/{}'.format(member_id), update_member_request)
-        return resp.MemberResponse(**response)
+        return self._perform_put_request('/members/{}'.format(member_id), update_member_request, resp.MemberResponse)
 
     def set_avatar(self, member_id, file_guid, external_avatar_id=None):
         """
@@ -558,8 +657,7 @@ class PyrusAPI:
         """
 
         set_avatar_request = req.SetAvatarRequest(file_guid, external_avatar_id)
-        response = self._perform_put_request('/members/{}/avatar'.format(member_id), set_avatar_request)
-        return resp.MemberResponse(**response)
+        return self._perform_put_request('/members/{}/avatar'.format(member_id), set_avatar_request, resp.MemberResponse)
 
     def get_profile(self, include_inactive = False):
         """
@@ -572,8 +670,7 @@ class PyrusAPI:
             class:`models.responses.ProfileResponse` object
         """
 
-        response = self._perform_get_request('/profile?withinactive={}'.format(include_inactive))
-        return resp.ProfileResponse(**response)
+        return self._perform_get_request('/profile?withinactive={}'.format(include_inactive), resp.ProfileResponse)
 
     def get_inbox(self, tasks_count = 50, group_tasks_count = 50):
         """
@@ -586,8 +683,7 @@ class PyrusAPI:
             class:`models.responses.TaskListResponse` object
         """
 
-        response = self._perform_get_request('/inbox?item_count={}&group_item_count={}'.format(tasks_count, group_tasks_count))
-        return resp.InboxResponse(**response)
+        return self._perform_get_request('/inbox?item_count={}&group_item_count={}'.format(tasks_count, group_tasks_count), resp.InboxResponse)
 
     def get_calendar_tasks(self, calendar_request):
         """
@@ -618,11 +714,19 @@ class PyrusAPI:
             calendar_request.include_meetings
         )
 
-        response = self._perform_get_request(query)
-        return resp.CalendarResponse(**response)
+        return self._perform_get_request(query, resp.CalendarResponse)
 
     def serialize_request(self, body):
-        return jsonpickle.encode(body, unpicklable=False).encode('utf-8')
+        """
+        Serialize a request body with the request encoder of the client
+
+        Args:
+            body (:obj:`object`): Request model, e.g. :obj:`models.requests.CreateTaskRequest`
+
+        Returns:
+            :obj:`bytes`: UTF-8 encoded JSON, as in previous versions
+        """
+        return self.request_encoder.encode(body)
 
     def get_form_permissions(self, form_id):
         """
@@ -635,8 +739,7 @@ class PyrusAPI:
             class:`models.responses.PermissionsResponse` object
         """
 
-        response = self._perform_get_request('/forms/{}/permissions'.format(form_id))
-        return resp.PermissionsResponse(**response)
+        return self._perform_get_request('/forms/{}/permissions'.format(form_id), resp.PermissionsResponse)
 
     def change_form_permissions(self, form_id, request):
         """
@@ -652,22 +755,19 @@ class PyrusAPI:
         if not isinstance(request, req.ChangePermissionsRequest):
             raise TypeError('request must be an instance of models.requests.ChangePermissionsRequest')
 
-        response = self._perform_post_request('/forms/{}/permissions'.format(form_id), request)
-        return resp.PermissionsResponse(**response)
+        return self._perform_post_request('/forms/{}/permissions'.format(form_id), request, resp.PermissionsResponse)
 
     def get_knowledge_base_entity(self, entity_id):
         if not isinstance(entity_id, str):
             raise TypeError('entity_id must be an instance of str')
 
-        response = self._perform_get_request('/knowledgebase/{}'.format(entity_id))
-        return resp.KnowledgeBaseEntityResponse(**response)
+        return self._perform_get_request('/knowledgebase/{}'.format(entity_id), resp.KnowledgeBaseEntityResponse)
 
     def create_knowledge_base_entity(self, request):
         if not isinstance(request, req.CreateKnowledgeBaseEntityRequest):
             raise TypeError('request must be an instance of models.requests.CreateKnowledgeBaseEntityRequest')
 
-        response = self._perform_post_request('/knowledgebase', request)
-        return resp.KnowledgeBaseEntityResponse(**response)
+        return self._perform_post_request('/knowledgebase', request, resp.KnowledgeBaseEntityResponse)
 
     def update_knowledge_base_entity(self, entity_id, request):
         if not isinstance(entity_id, str):
@@ -676,16 +776,14 @@ class PyrusAPI:
         if not isinstance(request, req.UpdateKnowledgeBaseEntityRequest):
             raise TypeError('request must be an instance of models.requests.UpdateKnowledgeBaseEntityRequest')
 
-        response = self._perform_put_request('/knowledgebase/{}'.format(entity_id), request)
-        return resp.KnowledgeBaseEntityResponse(**response)
+        return self._perform_put_request('/knowledgebase/{}'.format(entity_id), request, resp.KnowledgeBaseEntityResponse)
 
     def delete_knowledge_base_entity(self, entity_id, delete_with_children=False):
         if not isinstance(entity_id, str):
             raise TypeError('entity_id must be an instance of str')
 
-        response = self._perform_delete_request(
-            '/knowledgebase/{}?delete_with_children={}'.format(entity_id, str(delete_with_children).lower()))
-        return resp.KnowledgeBaseDeleteResponse(**response)
+        return self._perform_delete_request(
+            '/knowledgebase/{}?delete_with_children={}'.format(entity_id, str(delete_with_children).lower()), resp.KnowledgeBaseDeleteResponse)
 
     def get_knowledge_base_structure(self, parent_topic_id=None, depth=None):
         url = '/knowledgebase/structure'
@@ -698,15 +796,13 @@ class PyrusAPI:
         if params:
             url += '?' + '&'.join(params)
 
-        response = self._perform_get_request(url)
-        return resp.KnowledgeBaseStructureResponse(**response)
+        return self._perform_get_request(url, resp.KnowledgeBaseStructureResponse)
 
     def get_knowledge_base_permissions(self, entity_id):
         if not isinstance(entity_id, str):
             raise TypeError('entity_id must be an instance of str')
 
-        response = self._perform_get_request('/knowledgebase/{}/permissions'.format(entity_id))
-        return resp.KnowledgeBasePermissionsResponse(**response)
+        return self._perform_get_request('/knowledgebase/{}/permissions'.format(entity_id), resp.KnowledgeBasePermissionsResponse)
 
     def update_knowledge_base_permissions(self, entity_id, request):
         if not isinstance(entity_id, str):
@@ -715,30 +811,7 @@ class PyrusAPI:
         if not isinstance(request, req.UpdateKnowledgeBasePermissionsRequest):
             raise TypeError('request must be an instance of models.requests.UpdateKnowledgeBasePermissionsRequest')
 
-        response = self._perform_put_request('/knowledgebase/{}/permissions'.format(entity_id), request)
-        return resp.KnowledgeBasePermissionsResponse(**response)
-
-    def _auth(self):
-        url = self._create_auth_url('/auth')
-        headers = {
-            'User-Agent': '{}'.format(self._user_agent),
-            'Content-Type': 'application/json'
-        }
-        auth_request = req.AuthRequest(login=self.login, security_key=self.security_key, person_id=self.person_id)
-
-        data = self.serialize_request(auth_request)
-
-        auth_response = requests.post(url, headers=headers, data=data, proxies=self.proxy)
-        # pylint: disable=no-member
-        if auth_response.status_code == requests.codes.ok:
-            response = auth_response.json()
-            self._set_origins(response.get('api_url'), response.get('files_url'))
-            self.access_token = response['access_token']
-        else:
-            response = auth_response.json()
-            self.access_token = None
-
-        return response
+        return self._perform_put_request('/knowledgebase/{}/permissions'.format(entity_id), request, resp.KnowledgeBasePermissionsResponse)
 
     def _set_origins(self, api_url, files_url):
         if api_url:
@@ -756,55 +829,644 @@ class PyrusAPI:
         return '{}://{}{}'.format(self._protocol, self._files_host, url)
 
     def _create_auth_url(self, url):
-        if self._host == PyrusAPI.PYRUS_API_URL() or self._auth_host != PyrusAPI.PYRUS_AUTH_URL():
+        if self._host == BasePyrusAPI.PYRUS_API_URL() or self._auth_host != BasePyrusAPI.PYRUS_AUTH_URL():
             return '{}://{}{}{}'.format(self._protocol, self._auth_host, self._base_path, url)
 
         return '{}://{}{}{}'.format(self._protocol, self._host, self._base_path, url)
 
-    def _perform_get_request(self, path):
-        return self._perform_request_with_retry(path, self.HTTPMethod.GET)
+    def _perform_get_request(self, path, response_type=None, cached=False):
+        return self._perform_request_with_retry(path, self.HTTPMethod.GET, response_type=response_type,
+                                                cached=cached)
 
-    def _perform_get_file_request(self, path):
-        return self._perform_request_with_retry(path, self.HTTPMethod.GET, get_file=True)
+    def _perform_get_file_request(self, path, response_type=None, download=True):
+        return self._perform_request_with_retry(path, self.HTTPMethod.GET, get_file=download,
+                                                response_type=response_type)
 
-    def _perform_post_request(self, path, body=None):
-        return self._perform_request_with_retry(path, self.HTTPMethod.POST, body)
+    def _perform_post_request(self, path, body=None, response_type=None, idempotent=None):
+        return self._perform_request_with_retry(path, self.HTTPMethod.POST, body, response_type=response_type,
+                                                idempotent=idempotent)
 
-    def _perform_put_request(self, path, body=None):
-        return self._perform_request_with_retry(path, self.HTTPMethod.PUT, body)
+    def _perform_put_request(self, path, body=None, response_type=None):
+        return self._perform_request_with_retry(path, self.HTTPMethod.PUT, body, response_type=response_type)
     
-    def _perform_delete_request(self, path, body=None):
-        return self._perform_request_with_retry(path, self.HTTPMethod.DELETE, body)
+    def _perform_delete_request(self, path, body=None, response_type=None):
+        return self._perform_request_with_retry(path, self.HTTPMethod.DELETE, body, response_type=response_type)
+
+    def _perform_auth_request(self, response_type):
+        raise NotImplementedError()
+
+    def _perform_request_with_retry(self, path, method, body=None, upload=None, get_file=False, response_type=None,
+                                    idempotent=None, cached=False):
+        raise NotImplementedError()
+
+    def _get_rate_limit_delay(self, url):
+        if self.rate_limiter is None:
+            return 0
+        return self.rate_limiter.reserve(self.access_token, url)
+
+    def _create_registry_pagination(self, form_register_request, page_size):
+        if form_register_request is None:
+            form_register_request = req.FormRegisterRequest()
+        if not isinstance(form_register_request, req.FormRegisterRequest):
+            raise TypeError('form_register_request must be an instance '
+                            'of models.requests.FormRegisterRequest')
+        if getattr(form_register_request, 'format', 'json') != 'json':
+            raise ValueError('only json format can be paginated')
+        if not isinstance(page_size, int) or page_size < 1 or page_size > 20000:
+            raise ValueError('page_size must be int between 1 and 20000')
+        lower, upper = _get_task_id_bounds(form_register_request)
+        page_request = copy.copy(form_register_request)
+        page_request.item_count = page_size
+        page_request.sort = 'id'
+        return _RegistryPagination(page_request, lower, upper)
+
+    def _create_registry_export(self, form_register_request, partitions, page_size):
+        if not isinstance(partitions, int) or partitions < 1:
+            raise ValueError('partitions should be a positive int')
+        pagination = self._create_registry_pagination(form_register_request, page_size)
+        return _RegistryExport(pagination.request, pagination.lower, pagination.upper, partitions)
+
+    def _create_catalog_update(self, catalog_id, update_catalog_items_request, max_items, max_bytes, checkpoint,
+                               progress):
+        if not isinstance(catalog_id, int):
+            raise TypeError('catalog_id must be an instance of int')
+        chunks = catalog_update.split_request(update_catalog_items_request, max_items, max_bytes,
+                                              self.request_encoder)
+        return catalog_update.CatalogUpdate(chunks, checkpoint, progress)
+
+    def _lookup_cache(self, path):
+        if self.response_cache is None:
+            return None
+        if self.login:
+            identity = 'login {} {}'.format(self.login, self.person_id or '')
+        else:
+            identity = 'token {}'.format(self.access_token or '')
+        return self.response_cache.lookup(identity, path)
+
+    def _get_cached_response(self, cache_lookup):
+        return self.response_decoder.decode(cache_lookup.entry.content)
+
+    @staticmethod
+    def _get_cache_headers(cache_lookup):
+        if cache_lookup is None or cache_lookup.entry is None:
+            return None
+        return cache_lookup.entry.get_validators() or None
+
+    def _filter_cached_catalog(self, path, filters):
+        if not isinstance(filters, CatalogItemFilters):
+            return None
+        cache_lookup = self._lookup_cache(path)
+        if cache_lookup is None or not cache_lookup.fresh:
+            return None
+        index = cache_lookup.entry.get_derived(self._create_catalog_index)
+        try:
+            return index.get_response_data(filters)
+        except ValueError:
+            # unknown column, the server reports the error
+            return None
+
+    def _create_catalog_index(self, content):
+        return CatalogIndex.from_response(resp.CatalogResponse(**self.response_decoder.decode(content)))
+
+    def _create_local_response(self, response, response_type):
+        return self._create_response(response, response_type)
+
+    def _invalidate_cache(self, path, method):
+        # the client's own changes of a catalog make its cached responses stale
+        if self.response_cache is not None and method != self.HTTPMethod.GET:
+            self.response_cache.invalidate_path(path)
+
+    def _create_request_url(self, path, get_file):
+        return self._create_files_url(path) if get_file else self._create_url(path)
+
+    def _get_response(self, response, get_file, request, cache_lookup=None):
+        if cache_lookup is not None:
+            if response.status_code == 304 and cache_lookup.entry is not None:
+                self.response_cache.refresh(cache_lookup)
+                return self._get_cached_response(cache_lookup)
+            if response.status_code == 200:
+                decoded = self.response_decoder.decode(response.content)
+                self.response_cache.store(cache_lookup, response.content, response.headers)
+                return decoded
+        if self._is_csv_request(request):
+            return self._create_csv_response(response.text)
+        if get_file:
+            if isinstance(get_file, _FileDownload) and response.status_code == 200:
+                return self._create_file_download_response(response, get_file)
+            return self._create_download_response(response.status_code, response.headers, response.content)
+        try:
+            # decode the received bytes without building the text first
+            return self.response_decoder.decode(response.content)
+        except ValueError:
+            # e.g. html error page of a proxy
+            return {'error_code': 'ServerError', 'error': 'Unexpected response with status {}'.format(response.status_code)}
+
+    def _create_response(self, response, response_type):
+        # already built responses (csv registry, downloaded file) are passed as is
+        if response_type is None or isinstance(response, resp.BaseResponse):
+            return response
+        if self.lazy:
+            response_type = lazy_models.LAZY_RESPONSES.get(response_type, response_type)
+        if self.projection is not None and isinstance(response, dict):
+            res = response_type(**self.projection.project_response(response))
+            res.original_response = response
+        else:
+            res = response_type(**response)
+        if not self.keep_original_response:
+            # the decoded JSON of a big response takes more memory than the built models
+            res.original_response = None
+        return res
+
+    def _create_csv_response(self, text):
+        res = resp.FormRegisterResponse()
+        res.csv = text
+        return res
+
+    @staticmethod
+    def _get_upload_restart_error():
+        # the failed request has read the file object, sending it again would upload a truncated file
+        return {'error_code': 'authorization_error',
+                'error': 'Access token expired while the file was sent, a not seekable file cannot be sent again'}
+
+    def _create_download_response(self, status_code, headers, content):
+        if status_code == 200:
+            return resp.DownloadResponse(self._get_filename(headers), content)
+        if status_code == 401:
+            return resp.BaseResponse(**{'error_code': 'authorization_error'})
+        if status_code == 403 or status_code == 404:
+            return resp.BaseResponse(**{'error_code': 'access_denied_file'})
+        return resp.BaseResponse(**{'error_code': 'ServerError'})
+
+    def _create_file_download_response(self, response, download):
+        filename = self._get_filename(response.headers)
+        if download.stream:
+            return resp.DownloadStreamResponse(filename, response.iter_content(download.chunk_size), response.close)
+        self._write_download(response, download, filename)
+        if not download.is_valid():
+            download.discard()
+            return resp.BaseResponse(**{'error_code': 'checksum_mismatch',
+                                        'error': 'MD5 hash of the file is {}, expected {}'.format(
+                                            download.md5_hash, download.expected_md5)})
+        return resp.DownloadResponse(filename, download.content, download.path, download.size, download.md5_hash)
+
+    def _write_download(self, response, download, filename):
+        download.write_all([response.content], filename)
+
+    @staticmethod
+    def _get_filename(headers):
+        try:
+            m = Message()
+            m['Content-Disposition'] = headers['Content-Disposition']
+            return m.get_filename()
+        except:
+            return re.findall('filename=(.+)', headers['Content-Disposition'])
+
+    def _check_file_size(self, size):
+        if size > self.MAX_FILE_SIZE_IN_BYTES:
+            raise Exception("File size should not exceed {} MB".format(self.MAX_FILE_SIZE_IN_BYTES / 1024 / 1024))
+
+    @staticmethod
+    def _is_csv_request(request):
+        return isinstance(request, req.FormRegisterRequest) and getattr(request, 'format', 'json') == "csv"
+
+    def _create_default_headers(self):
+        headers = {
+            'User-Agent': '{}'.format(self._user_agent),
+            'Authorization': 'Bearer {}'.format(self.access_token),
+            'Content-Type': 'application/json'
+        }
+        return headers
+
+
+class PyrusAPI(BasePyrusAPI):
+    """
+    PyrusApi client
+
+    Args:
+        login (:obj:`str`): User's login (email)
+        security_key (:obj:`str`): User's secret key
+        access_token (:obj:`str`, optional): User's access token. You can specify it if you already have one. (optional)
+        proxy (:obj:`str`, optional): Proxy server url
+        person_id (:obj:`int`,optional): User's person id
+        pool_connections (:obj:`int`, optional): Number of per-host connection pools to keep (api, files and auth hosts)
+        pool_maxsize (:obj:`int`, optional): Maximum number of keep-alive connections saved in each pool
+        pool_block (:obj:`bool`, optional): Wait for a free connection instead of opening an extra one when the pool is exhausted
+        retry_policy (:obj:`pyrus.retry.RetryPolicy`, optional): Retry policy for throttled and failed requests.
+            By default requests are retried up to 3 times with exponential backoff
+        rate_limiter (:obj:`pyrus.ratelimit.RateLimiter`, optional): Limits the request rate before requests are sent.
+            Share one limiter between clients and threads that use the same access token
+        request_encoder (:obj:`pyrus.serialization.RequestEncoder`, optional): Serializes request bodies.
+            By default produces the same JSON as jsonpickle
+        response_decoder (:obj:`pyrus.serialization.ResponseDecoder`, optional): Decodes response bodies.
+            By default uses the standard json module
+        lazy (:obj:`bool`, optional): Build tasks of responses on first attribute access.
+            Makes big form registers cheap to receive when only a few fields of every task are read
+        keep_original_response (:obj:`bool`, optional): Keep the decoded JSON in ``original_response`` of responses.
+            Set to False to release the raw data of big responses once the models are built
+        response_cache (:obj:`pyrus.cache.ResponseCache`, optional): Caches responses of get_forms, get_form
+            and get_catalog. Share one cache between clients, with a directory it is shared between processes
+
+    The client keeps HTTP connections alive between calls. Call :meth:`close` (or use the client
+    as a context manager) to release them.
+    """
+
+    def __init__(self, login=None, security_key=None, access_token=None, proxy=None, person_id=None,
+                 pool_connections=10, pool_maxsize=10, pool_block=False, retry_policy=None, rate_limiter=None,
+                 request_encoder=None, response_decoder=None, lazy=False, keep_original_response=True,
+                 response_cache=None):
+        super(PyrusAPI, self).__init__(login, security_key, access_token, proxy, person_id, retry_policy,
+                                       rate_limiter, request_encoder, response_decoder, lazy, keep_original_response,
+                                       response_cache)
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        # copies made by with_* methods share the holder, so they share the connections
+        self._sessions = _SessionHolder(self._create_session)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Close all pooled connections. The client can still be used afterwards,
+        a new pool is created on the next request.
+        """
+        self._sessions.close()
+
+    def get_tasks(self, task_ids, max_workers=None, as_completed=False):
+        """
+        Get several tasks concurrently. Requests share the connection pool and the rate limiter of the client.
+        A failed request does not stop the others: its response has error_code and error set.
+
+        Args:
+            task_ids (:obj:`list` of :obj:`int`): Task ids
+            max_workers (:obj:`int`, optional): Maximum number of requests performed at the same time.
+                Equals to pool_maxsize by default
+            as_completed (:obj:`bool`, optional): Yield responses as soon as they are received instead of
+                returning them in the order of task_ids
+
+        Returns:
+            :obj:`list` of class:`models.responses.TaskResponse` objects in the order of task_ids,
+            or a generator of (task_id, class:`models.responses.TaskResponse`) tuples if as_completed is set
+        """
+        if max_workers is None:
+            max_workers = self.pool_maxsize
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError('max_workers should be a positive int')
+        results = self._map_concurrently(self._get_task_safe, task_ids, max_workers, not as_completed)
+        if as_completed:
+            return results
+        return [response for _, response in results]
+
+    def iter_registry(self, form_id, form_register_request=None, page_size=20000, prefetch=False):
+        """
+        Iterate over all tasks based on the form template. Tasks are requested by pages of page_size tasks
+        sorted by id, every next page starts after the last task id of the previous one,
+        so only one page is kept in memory.
+
+        Args:
+            form_id (:obj:`int`): Form id
+            form_register_request (:obj:`models.requests.FormRegisterRequest`, optional): Request filters.
+                item_count and sort are ignored, task id filters other than greater than, less than and range are not supported
+            page_size (:obj:`int`, optional): Number of tasks in a page (page_size > 0 & page_size <= 20000)
+            prefetch (:obj:`bool`, optional): Request the next page in background while the current one is processed
+
+        Returns:
+            generator of :obj:`models.entities.Task` objects
+        """
+        pagination = self._create_registry_pagination(form_register_request, page_size)
+        return self._iter_registry(form_id, pagination, prefetch)
 
-    def _perform_request_with_retry(self, path, method, body=None, file_path=None, get_file=False):
+    def export_registry(self, form_id, form_register_request=None, partitions=8, max_workers=None, page_size=20000):
+        """
+        Get all tasks based on the form template requesting disjoint task id ranges concurrently.
+        The id space of the form is probed first and split into partitions, ranges that have more
+        than page_size tasks are split again while they are requested. Tasks are yielded in no particular order.
+
+        Args:
+            form_id (:obj:`int`): Form id
+            form_register_request (:obj:`models.requests.FormRegisterRequest`, optional): Request filters.
+                item_count and sort are ignored, task id filters other than greater than, less than and range are not supported
+            partitions (:obj:`int`, optional): Number of task id ranges to start with
+            max_workers (:obj:`int`, optional): Maximum number of requests performed at the same time.
+                Equals to pool_maxsize by default
+            page_size (:obj:`int`, optional): Maximum number of tasks in a response (page_size > 0 & page_size <= 20000)
+
+        Returns:
+            generator of :obj:`models.entities.Task` objects
+        """
+        if max_workers is None:
+            max_workers = self.pool_maxsize
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError('max_workers should be a positive int')
+        export = self._create_registry_export(form_register_request, partitions, page_size)
+        return self._export_registry(form_id, export, max_workers)
+
+    def _export_registry(self, form_id, export, max_workers):
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            probe = export.probe()
+            try:
+                probe_requests = next(probe)
+                while True:
+                    probe_requests = probe.send(list(executor.map(lambda r: self.get_registry(form_id, r), probe_requests)))
+            except StopIteration as e:
+                ranges = e.value
+            running = {}
+
+            def submit(lower, upper):
+                future = executor.submit(self.get_registry, form_id, export.create_request(lower, upper))
+                running[future] = (lower, upper)
+
+            try:
+                for lower, upper in ranges:
+                    submit(lower, upper)
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        lower, upper = running.pop(future)
+                        tasks, rest = export.process_partition(future.result(), lower, upper)
+                        for rest_lower, rest_upper in rest:
+                            submit(rest_lower, rest_upper)
+                        yield from tasks
+            finally:
+                for future in running:
+                    future.cancel()
+
+    def _iter_registry(self, form_id, pagination, prefetch):
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        next_page = None
+        try:
+            while not pagination.done:
+                if next_page is None:
+                    response = self.get_registry(form_id, pagination.next_request())
+                else:
+                    response = next_page.result()
+                    next_page = None
+                tasks = pagination.process_response(response)
+                if executor is not None and not pagination.done:
+                    next_page = executor.submit(self.get_registry, form_id, pagination.next_request())
+                yield from tasks
+        finally:
+            if executor is not None:
+                if next_page is not None:
+                    next_page.cancel()
+                executor.shutdown(wait=False)
+
+    def open_file(self, file_id, chunk_size=1024 * 1024):
+        """
+        Download the file by chunks without keeping it in memory
+
+            >>> with pyrus_client.open_file(file_id) as stream:
+                   for chunk in stream:
+                       output.write(chunk)
+
+        Args:
+            file_id (:obj:`int`): File id
+            chunk_size (:obj:`int`, optional): Size of chunks
+
+        Returns:
+            class:`models.responses.DownloadStreamResponse` object
+        """
+        if not isinstance(file_id, int):
+            raise TypeError('file_id must be an instance of int')
+        path = '/services/attachment?Id=' + str(file_id)
+        return self._perform_get_file_request(path, resp.BaseResponse, _FileDownload(chunk_size=chunk_size, stream=True))
+
+    def download_files(self, files, directory, max_workers=4, chunk_size=1024 * 1024):
+        """
+        Download several files concurrently to the directory. Files are written by chunks,
+        so at most max_workers * chunk_size bytes are kept in memory.
+        Every file is saved as <file id>_<file name>
+
+        Args:
+            files (:obj:`list` of :obj:`int` or :obj:`models.entities.File`): File ids or files.
+                MD5 hash of :obj:`models.entities.File` is verified
+            directory (:obj:`str`): Directory to save files to
+            max_workers (:obj:`int`, optional): Maximum number of files downloaded at the same time
+            chunk_size (:obj:`int`, optional): Size of chunks written to files
+
+        Returns:
+            :obj:`list` of class:`models.responses.DownloadResponse` objects in the order of files.
+            A failed download has error_code set. A file listed several times is downloaded once
+            and gets the same response object
+        """
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError('max_workers should be a positive int')
+        download = functools.partial(self._download_file_safe, directory=directory, chunk_size=chunk_size)
+        unique_files = _get_unique_files(files)
+        results = self._map_concurrently(download, unique_files.values(), max_workers, True)
+        responses = dict(zip(unique_files, (response for _, response in results)))
+        return [responses[_get_file_id(file)] for file in files]
+
+    def _download_file_safe(self, file, directory, chunk_size):
+        try:
+            file_id, expected_md5, destination = _get_file_destination(file, directory)
+            return self.download_file(file_id, destination, chunk_size, expected_md5)
+        except Exception as e:  # pylint: disable=broad-except
+            return resp.BaseResponse(error_code=type(e).__name__, error=str(e))
+
+    def upload_files(self, files, max_workers=4, chunk_size=1024 * 1024, known_guids=None):
+        """
+        Upload several files concurrently. Files with the same content are uploaded once.
+
+            >>> attachments = pyrus_client.upload_files(['/path/to/report.pdf', ('/path/to/photo', 'photo.jpg')])
+            >>> pyrus_client.create_task(CreateTaskRequest(text='Report', attachments=attachments))
+
+        Args:
+            files (:obj:`list`): Paths, binary file objects or bytes, or tuples of one of them and a file name
+            max_workers (:obj:`int`, optional): Maximum number of files uploaded at the same time
+            chunk_size (:obj:`int`, optional): Size of chunks read from files
+            known_guids (:obj:`dict`, optional): MD5 hashes as keys and guids of uploaded files as values.
+                Files with known hashes are not uploaded, guids of uploaded files are added to the dict.
+                Pass the same dict to several calls to upload every content once
+
+        Returns:
+            :obj:`list` of :obj:`models.entities.NewFile` objects in the order of files
+        """
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError('max_workers should be a positive int')
+        batch = _UploadBatch(known_guids)
+        upload = functools.partial(self._upload_batch_file, batch=batch, chunk_size=chunk_size)
+        return [_get_new_file(response) for _, response in self._map_concurrently(upload, files, max_workers, True)]
+
+    def _upload_batch_file(self, file, batch, chunk_size):
+        source, filename = _get_upload_source(file)
+        md5_hash = _get_md5_hash(source, chunk_size)
+        if md5_hash is None:
+            return self.upload_file(source, filename, chunk_size=chunk_size)
+        future, owner = batch.claim(md5_hash, Future)
+        if not owner:
+            return future.result()
+        try:
+            response = self.upload_file(source, filename, chunk_size=chunk_size)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        batch.complete(md5_hash, response)
+        future.set_result(response)
+        return response
+
+    def update_catalog_items_in_chunks(self, catalog_id, update_catalog_items_request, max_items=1000,
+                                       max_bytes=1024 * 1024, max_workers=4, checkpoint=None, progress=None):
+        """
+        Update catalog items by chunks sent concurrently. Chunks are bounded by the number of items
+        and the body size, so big changes do not time out or exceed the request size limit.
+        A failed chunk does not stop the others. Chunks are retried like idempotent requests:
+        upserting or deleting the same items again does not change the catalog.
+
+            >>> checkpoint = UpdateCheckpoint('catalog_update.json')
+            >>> response = pyrus_client.update_catalog_items_in_chunks(catalog_id, request, checkpoint=checkpoint)
+
+        Args:
+            catalog_id (:obj:`int`): Catalog id
+            update_catalog_items_request (:obj:`models.requests.UpdateCatalogItemsRequest`): Catalog data
+            max_items (:obj:`int`, optional): Maximum number of upserted and deleted items in a chunk
+            max_bytes (:obj:`int`, optional): Maximum size of a chunk request body
+            max_workers (:obj:`int`, optional): Maximum number of chunks sent at the same time
+            checkpoint (:obj:`pyrus.catalog_update.UpdateCheckpoint`, optional): Records completed chunks.
+                A rerun with the same request and checkpoint sends only the chunks that were not completed
+            progress (:obj:`callable`, optional): Called with the number of completed chunks and the number
+                of chunks after every chunk
+
+        Returns:
+            class:`models.responses.SyncCatalogResponse` object with added, updated and deleted items
+            of the chunks sent by this call. error_code and error are set if a chunk failed
+        """
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError('max_workers should be a positive int')
+        update = self._create_catalog_update(catalog_id, update_catalog_items_request, max_items, max_bytes,
+                                             checkpoint, progress)
+        send = functools.partial(self._update_catalog_chunk_safe, catalog_id)
+        for chunk, response in self._map_concurrently(send, update.pending, max_workers, False):
+            update.complete(chunk, response)
+        return update.result()
+
+    def _update_catalog_chunk_safe(self, catalog_id, chunk):
+        try:
+            return self._perform_post_request('/catalogs/{}/diff'.format(catalog_id), chunk.request,
+                                              resp.SyncCatalogResponse, idempotent=True)
+        except Exception as e:  # pylint: disable=broad-except
+            return resp.SyncCatalogResponse(error_code=type(e).__name__, error=str(e))
+
+    def _get_task_safe(self, task_id):
+        try:
+            return self.get_task(task_id)
+        except Exception as e:  # pylint: disable=broad-except
+            return resp.TaskResponse(error_code=type(e).__name__, error=str(e))
+
+    def _map_concurrently(self, func, items, max_workers, ordered):
+        # authenticate once instead of in every worker
+        if not self.access_token:
+            self._auth()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # keep a bounded window of submitted calls so large inputs do not pile up in memory
+            window = max_workers * 2
+            pending = deque()
+            try:
+                for item in items:
+                    pending.append((item, executor.submit(func, item)))
+                    if len(pending) >= window:
+                        yield from _pop_finished(pending, ordered)
+                while pending:
+                    yield from _pop_finished(pending, ordered)
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def _auth(self):
+        url = self._create_auth_url('/auth')
+        headers = {
+            'User-Agent': '{}'.format(self._user_agent),
+            'Content-Type': 'application/json'
+        }
+        auth_request = req.AuthRequest(login=self.login, security_key=self.security_key, person_id=self.person_id)
+
+        data = self.serialize_request(auth_request)
+
+        auth_response = self._get_session().post(url, headers=headers, data=data, proxies=self.proxy)
+        # pylint: disable=no-member
+        response = self.response_decoder.decode(auth_response.content)
+        if auth_response.status_code == requests.codes.ok:
+            self._set_origins(response.get('api_url'), response.get('files_url'))
+            self.access_token = response['access_token']
+        else:
+            self.access_token = None
+
+        return response
+
+    def _perform_auth_request(self, response_type):
+        return self._create_response(self._auth(), response_type)
+
+    def _perform_request_with_retry(self, path, method, body=None, upload=None, get_file=False, response_type=None,
+                                    idempotent=None, cached=False):
         if not isinstance(method, self.HTTPMethod):
             raise TypeError('method must be an instance of HTTPMethod Enum.')
+        if idempotent is None:
+            idempotent = self.retry_policy.is_idempotent(method.value)
+
+        cache_lookup = self._lookup_cache(path) if cached else None
+        if cache_lookup is not None and cache_lookup.fresh:
+            return self._create_response(self._get_cached_response(cache_lookup), response_type)
+        headers = self._get_cache_headers(cache_lookup)
 
         # try auth if no access token
         if not self.access_token:
             response = self._auth()
             if not self.access_token:
-                return response
+                return self._create_response(response, response_type)
 
-        url =  self._create_files_url(path) if get_file else self._create_url(path)
+        url = self._create_request_url(path, get_file)
         # try to call api method
-        response = self._perform_request(url, method, body, file_path, get_file)
+        response = self._perform_request(url, method, body, upload, get_file, idempotent, headers)
         # if 401 try auth and call method again
         if response.status_code == 401:
+            response.close()
             response = self._auth()
             # if failed return auth response
             if not self.access_token:
-                return response
-
-            url =  self._create_files_url(path) if get_file else self._create_url(path)
-            response = self._perform_request(url, method, body, file_path, get_file)
-
-        return self._get_response(response, get_file, body)
-
-    def _perform_request(self, url, method, body, file_path, get_file):
+                return self._create_response(response, response_type)
+            if upload is not None and not upload.can_restart:
+                return self._create_response(self._get_upload_restart_error(), response_type)
+
+            url = self._create_request_url(path, get_file)
+            response = self._perform_request(url, method, body, upload, get_file, idempotent, headers)
+
+        self._invalidate_cache(path, method)
+        return self._create_response(self._get_response(response, get_file, body, cache_lookup), response_type)
+
+    def _perform_request(self, url, method, body, upload, get_file, idempotent, headers=None):
+        policy = self.retry_policy
+        attempt = 1
+        while True:
+            rate_limit_delay = self._get_rate_limit_delay(url)
+            if rate_limit_delay > 0:
+                time.sleep(rate_limit_delay)
+            try:
+                response = self._send_request(url, method, body, upload, get_file, headers)
+            except requests.ConnectionError:
+                if not policy.should_retry_error(attempt, idempotent):
+                    policy.statistics.record_exhausted()
+                    raise
+                delay = policy.get_delay(attempt)
+                policy.statistics.record_retry(delay)
+            else:
+                if not policy.should_retry(attempt, response.status_code, idempotent):
+                    if response.status_code in policy.status_codes:
+                        policy.statistics.record_exhausted()
+                    return response
+                delay = policy.get_delay(attempt, response.headers.get('Retry-After'))
+                policy.statistics.record_retry(delay, response.status_code)
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _send_request(self, url, method, body, upload, get_file, headers=None):
         if method == self.HTTPMethod.POST:
-            if file_path:
-                return self._post_file_request(url, file_path)
+            if upload:
+                return self._post_file_request(url, upload)
             return self._post_request(url, body)
         if method == self.HTTPMethod.PUT:
             return self._put_request(url, body)
@@ -812,54 +1474,526 @@ class PyrusAPI:
             return self._delete_request(url, body)
         if get_file:
             return self._get_file_request(url)
-        return self._get_request(url)
+        return self._get_request(url, headers)
 
-    def _get_request(self, url):
-        headers = self._create_default_headers()
-        return requests.get(url, headers=headers, proxies=self.proxy)
+    def _write_download(self, response, download, filename):
+        try:
+            download.write_all(response.iter_content(download.chunk_size), filename)
+        finally:
+            response.close()
+
+    def _get_request(self, url, headers=None):
+        request_headers = self._create_default_headers()
+        if headers:
+            request_headers.update(headers)
+        return self._get_session().get(url, headers=request_headers, proxies=self.proxy)
 
     def _get_file_request(self, url):
         headers = self._create_default_headers()
-        return requests.get(url, headers=headers, proxies=self.proxy, stream=True)
+        return self._get_session().get(url, headers=headers, proxies=self.proxy, stream=True)
 
     def _post_request(self, url, body):
         headers = self._create_default_headers()
         data = self.serialize_request(body) if body else None
-        return requests.post(url, headers=headers, data=data, proxies=self.proxy)
+        return self._get_session().post(url, headers=headers, data=data, proxies=self.proxy)
 
     def _put_request(self, url, body):
         headers = self._create_default_headers()
         data = self.serialize_request(body) if body else None
-        return requests.put(url, headers=headers, data=data, proxies=self.proxy)
+        return self._get_session().put(url, headers=headers, data=data, proxies=self.proxy)
     
     def _delete_request(self, url, body):
         headers = self._create_default_headers()
         data = self.serialize_request(body) if body else None
-        return requests.delete(url, headers=headers, data=data, proxies=self.proxy)
+        return self._get_session().delete(url, headers=headers, data=data, proxies=self.proxy)
 
-    def _post_file_request(self, url, file_path):
+    def _post_file_request(self, url, upload):
         headers = self._create_default_headers()
-        del headers['Content-Type']
-        if file_path:
-            size = os.path.getsize(file_path)
-            if size > self.MAX_FILE_SIZE_IN_BYTES:
-                raise Exception("File size should not exceed {} MB".format(self.MAX_FILE_SIZE_IN_BYTES / 1024 / 1024))
-            files = {'file': open(file_path, 'rb')}
-        return requests.post(url, headers=headers, files=files, proxies=self.proxy)
+        headers['Content-Type'] = upload.content_type
+        # requests sends an iterable with a length by chunks with Content-Length header,
+        # the length of a not seekable file is unknown, so it is sent with chunked encoding
+        with upload.open() as body:
+            data = body if upload.size is not None else iter(body)
+            return self._get_session().post(url, headers=headers, data=data, proxies=self.proxy)
+
+    def _get_session(self):
+        return self._sessions.get()
+
+    def _create_session(self):
+        session = requests.Session()
+        # one adapter serves api, files and auth hosts, each host gets its own pool
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+
+class _SessionHolder:
+    """
+        requests session of a client and its copies, created on first use
+    """
 
-    def _create_default_headers(self):
-        headers = {
-            'User-Agent': '{}'.format(self._user_agent),
-            'Authorization': 'Bearer {}'.format(self.access_token),
-            'Content-Type': 'application/json'
-        }
-        return headers
+    def __init__(self, create):
+        self._create = create
+        self._session = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        session = self._session
+        if session is not None:
+            return session
+        with self._lock:
+            if self._session is None:
+                self._session = self._create()
+            return self._session
+
+    def close(self):
+        with self._lock:
+            session = self._session
+            self._session = None
+        if session is not None:
+            session.close()
+
+
+def _pop_finished(pending, ordered):
+    if ordered:
+        item, future = pending.popleft()
+        return [(item, future.result())]
+    done, _ = wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+    finished = [(item, future) for item, future in pending if future in done]
+    for entry in finished:
+        pending.remove(entry)
+    return [(item, future.result()) for item, future in finished]
+
+
+class _RegistryPagination:
+    """
+        Keyset pagination state of a form register: every page requests tasks with id greater than
+        the last id of the previous page
+    """
 
-    def _get_response(self, response, get_file, request):
-        if isinstance(request, req.FormRegisterRequest) and getattr(request, 'format', 'json') == "csv":
-            res = resp.FormRegisterResponse()
-            res.csv = response.text
-            return res
-        if get_file:
-            return response
-        return response.json()
+    def __init__(self, request, lower, upper):
+        self.request = request
+        self.lower = lower
+        self.upper = upper
+        self.done = False
+
+    def next_request(self):
+        request = copy.copy(self.request)
+        bounds = []
+        if self.lower is not None:
+            bounds.append('gt{}'.format(self.lower))
+        if self.upper is not None:
+            bounds.append('lt{}'.format(self.upper))
+        if bounds:
+            request.id = ','.join(bounds)
+        return request
+
+    def process_response(self, response):
+        tasks = _get_registry_tasks(response)
+        if len(tasks) < self.request.item_count:
+            self.done = True
+        else:
+            self.lower = max(task.id for task in tasks)
+        return tasks
+
+
+class _RegistryExport:
+    """
+        Splits the task id space of a form register into disjoint ranges that are requested concurrently.
+        A range (lower, upper) includes ids between the bounds, not the bounds themselves
+    """
+
+    # the largest task id is searched among first id + 2 ** k
+    PROBE_MIN_POWER = 10
+    PROBE_MAX_POWER = 40
+    # rounds of narrowing the largest task id, every round divides the interval by the number of probes
+    PROBE_ROUNDS = 2
+    PROBE_MIN_POINTS = 8
+
+    def __init__(self, request, lower, upper, partitions):
+        self.request = request
+        self.lower = lower
+        self.upper = upper
+        self.partitions = partitions
+
+    def create_request(self, lower, upper):
+        request = copy.copy(self.request)
+        request.id = 'gt{},lt{}'.format(lower, upper)
+        return request
+
+    def probe(self):
+        """
+        Generator that yields lists of probe requests that can be performed concurrently
+        and receives lists of their responses. Returns the list of ranges to request
+        """
+        responses = yield [self._create_probe_request(self.lower)]
+        first_id = self._get_probe_id(responses[0])
+        if first_id is None:
+            return []
+        known_id = first_id
+        if self.upper is not None:
+            last_id = self.upper - 1
+        else:
+            # the largest task id is between the last candidate with tasks after it and the next one
+            candidates = [first_id + 2 ** power for power in range(self.PROBE_MIN_POWER, self.PROBE_MAX_POWER + 1)]
+            known_id, last_id = yield from self._probe_points(candidates, known_id, candidates[-1])
+        points = max(self.partitions, self.PROBE_MIN_POINTS)
+        for _ in range(self.PROBE_ROUNDS):
+            if last_id - known_id <= points:
+                break
+            candidates = [known_id + (last_id - known_id) * i // points for i in range(1, points)]
+            known_id, last_id = yield from self._probe_points(candidates, known_id, last_id)
+        return self.split(first_id - 1, last_id + 1, self.partitions)
+
+    def process_partition(self, response, lower, upper):
+        """
+        Get tasks of the range and the ranges that are left to request if the page was full
+        """
+        tasks = _get_registry_tasks(response)
+        if len(tasks) < self.request.item_count:
+            return tasks, []
+        last_id = max(task.id for task in tasks)
+        if upper - last_id <= 1:
+            return tasks, []
+        return tasks, self.split(last_id, upper, 2)
+
+    @staticmethod
+    def split(lower, upper, count):
+        count = max(min(count, upper - lower - 1), 1)
+        bounds = [lower + (upper - lower) * i // count for i in range(count)]
+        # neighbour ranges share the bound: (a, b + 1) and (b, c)
+        return [(bound, (bounds[i + 1] + 1) if i + 1 < count else upper) for i, bound in enumerate(bounds)]
+
+    def _probe_points(self, candidates, known_id, last_id):
+        responses = yield [self._create_probe_request(candidate) for candidate in candidates]
+        for candidate, response in zip(candidates, responses):
+            next_id = self._get_probe_id(response)
+            if next_id is None:
+                last_id = min(last_id, candidate)
+            else:
+                known_id = max(known_id, next_id)
+        return known_id, max(last_id, known_id)
+
+    def _create_probe_request(self, after_id):
+        request = copy.copy(self.request)
+        request.item_count = 1
+        bounds = []
+        if after_id is not None:
+            bounds.append('gt{}'.format(after_id))
+        if self.upper is not None:
+            bounds.append('lt{}'.format(self.upper))
+        if bounds:
+            request.id = ','.join(bounds)
+        return request
+
+    @staticmethod
+    def _get_probe_id(response):
+        tasks = _get_registry_tasks(response)
+        return tasks[0].id if tasks else None
+
+
+class _FileDownload:
+    """
+        Destination of a downloaded file: a path, a file object or a callable that gets
+        the file name and returns a path. Without destination the file is kept in memory
+    """
+
+    def __init__(self, destination=None, chunk_size=1024 * 1024, expected_md5=None, stream=False):
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError('chunk_size should be a positive int')
+        self.destination = destination
+        self.chunk_size = chunk_size
+        self.expected_md5 = expected_md5
+        self.stream = stream
+        self.path = None
+        self.size = 0
+        self.content = None
+        self._file = None
+        self._md5 = None
+        self._chunks = None
+
+    @property
+    def md5_hash(self):
+        return self._md5.hexdigest() if self._md5 is not None else None
+
+    def open(self, filename):
+        destination = self.destination
+        if callable(destination):
+            destination = destination(filename)
+        if destination is None:
+            self._chunks = []
+        elif isinstance(destination, (str, os.PathLike)):
+            self.path = os.fspath(destination)
+            self._file = open(self.path, 'wb')
+        else:
+            self._file = destination
+        self._md5 = hashlib.md5()
+        self.size = 0
+
+    def write(self, chunk):
+        if not chunk:
+            return
+        if self._chunks is not None:
+            self._chunks.append(chunk)
+        else:
+            self._file.write(chunk)
+        self._md5.update(chunk)
+        self.size += len(chunk)
+
+    def close(self):
+        if self._chunks is not None:
+            self.content = b''.join(self._chunks)
+            self._chunks = None
+        if self.path is not None and self._file is not None:
+            self._file.close()
+        self._file = None
+
+    def write_all(self, chunks, filename):
+        self.open(filename)
+        try:
+            for chunk in chunks:
+                self.write(chunk)
+        except BaseException:
+            self.close()
+            self.discard()
+            raise
+        self.close()
+
+    def is_valid(self):
+        return self.expected_md5 is None or self.expected_md5.lower() == self.md5_hash
+
+    def discard(self):
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class _MultipartUpload:
+    """
+        Multipart body of an uploaded file read from the source by chunks.
+        The source is a path, a binary file object or bytes. A file object is read from its current position,
+        every attempt starts from that position again
+    """
+
+    def __init__(self, source, filename=None, chunk_size=1024 * 1024, progress=None):
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError('chunk_size should be a positive int')
+        if progress is not None and not callable(progress):
+            raise TypeError('progress must be callable')
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        if isinstance(source, (str, os.PathLike)):
+            self.path = os.fspath(source)
+            self.size = os.path.getsize(self.path)
+            self._file = None
+            self._start = 0
+            self.can_restart = True
+            default_name = self.path
+        elif hasattr(source, 'read'):
+            self.path = None
+            self._file = source
+            self.can_restart = _is_seekable(source)
+            if self.can_restart:
+                self._start = source.tell()
+                self.size = source.seek(0, io.SEEK_END) - self._start
+                source.seek(self._start)
+            else:
+                self._start = None
+                self.size = None
+            default_name = getattr(source, 'name', None)
+        else:
+            raise TypeError('file_path must be a path, a binary file object or bytes')
+        if filename is None:
+            filename = os.path.basename(default_name) if isinstance(default_name, str) else None
+        self.filename = filename or 'file'
+        self.chunk_size = chunk_size
+        self.progress = progress
+        boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary={}'.format(boundary)
+        self._head = ('--{}\r\nContent-Disposition: form-data; name="file"; filename="{}"\r\n'
+                      'Content-Type: application/octet-stream\r\n\r\n'
+                      .format(boundary, _quote_filename(self.filename))).encode('utf-8')
+        self._tail = '\r\n--{}--\r\n'.format(boundary).encode('ascii')
+
+    def open(self):
+        """
+        Start sending the body
+
+        Returns:
+            :class:`_MultipartBody` object
+        """
+        if self.path is not None:
+            return _MultipartBody(self, open(self.path, 'rb'), True)
+        if self._start is not None:
+            self._file.seek(self._start)
+        return _MultipartBody(self, self._file, False)
+
+
+class _MultipartBody:
+
+    def __init__(self, upload, file, owns_file):
+        self.upload = upload
+        self.file = file
+        self.owns_file = owns_file
+
+    def __len__(self):
+        return len(self.upload._head) + self.upload.size + len(self.upload._tail)
+
+    def __iter__(self):
+        upload = self.upload
+        yield upload._head
+        sent = 0
+        while True:
+            chunk = self.file.read(upload.chunk_size)
+            if not chunk:
+                break
+            sent += len(chunk)
+            yield chunk
+            if upload.progress is not None:
+                upload.progress(sent, upload.size)
+        yield upload._tail
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _UploadBatch:
+    """
+        Uploads of a batch of files by MD5 hash. Every content is uploaded once,
+        known contents are not uploaded at all
+    """
+
+    def __init__(self, known_guids=None):
+        if known_guids is not None and not isinstance(known_guids, dict):
+            raise TypeError('known_guids must be a dict')
+        self.known_guids = known_guids if known_guids is not None else {}
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def claim(self, md5_hash, create_future):
+        """
+        Returns:
+            Future of the upload response and whether the caller should upload the file and set its result
+        """
+        with self._lock:
+            future = self._uploads.get(md5_hash)
+            if future is not None:
+                return future, False
+            future = self._uploads[md5_hash] = create_future()
+            guid = self.known_guids.get(md5_hash)
+            if guid is None:
+                return future, True
+        future.set_result(resp.UploadResponse(guid=guid, md5_hash=md5_hash))
+        return future, False
+
+    def complete(self, md5_hash, response):
+        # a guid is reused only when the server got the same content
+        if not response.error_code and response.guid and (response.md5_hash or '').lower() == md5_hash:
+            with self._lock:
+                self.known_guids[md5_hash] = response.guid
+
+
+def _get_upload_source(file):
+    if isinstance(file, tuple):
+        if len(file) != 2:
+            raise ValueError('file tuple should contain a file and a file name')
+        return file
+    return file, None
+
+
+def _get_md5_hash(source, chunk_size):
+    # None if the hash can not be calculated without consuming the file
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.md5(source).hexdigest()
+    md5 = hashlib.md5()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            for chunk in iter(functools.partial(file.read, chunk_size), b''):
+                md5.update(chunk)
+        return md5.hexdigest()
+    if not _is_seekable(source):
+        return None
+    position = source.tell()
+    try:
+        for chunk in iter(functools.partial(source.read, chunk_size), b''):
+            md5.update(chunk)
+    finally:
+        source.seek(position)
+    return md5.hexdigest()
+
+
+def _get_new_file(response):
+    if response.error_code:
+        raise Exception('File upload failed: {}'.format(response.error or response.error_code))
+    return entities.NewFile(guid=response.guid)
+
+
+def _is_seekable(file):
+    try:
+        return file.seekable()
+    except AttributeError:
+        return False
+
+
+def _quote_filename(filename):
+    return filename.replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+
+
+def _get_file_id(file):
+    return file.id if isinstance(file, entities.File) else file
+
+
+def _get_unique_files(files):
+    # two downloads of the same id would write the same path at the same time
+    unique_files = {}
+    for file in files:
+        file_id = _get_file_id(file)
+        current = unique_files.get(file_id)
+        # prefer a file with MD5 hash, so that the hash is verified
+        if current is None or not isinstance(current, entities.File) or not current.md5:
+            unique_files[file_id] = file
+    return unique_files
+
+
+def _get_file_destination(file, directory):
+    if isinstance(file, entities.File):
+        file_id, expected_md5 = file.id, file.md5
+    else:
+        file_id, expected_md5 = file, None
+
+    def get_path(filename):
+        # never let the file name leave the directory
+        name = os.path.basename(str(filename or '')) or 'file'
+        return os.path.join(directory, '{}_{}'.format(file_id, name))
+
+    return file_id, expected_md5, get_path
+
+
+def _get_registry_tasks(response):
+    if response.error_code or response.error:
+        raise Exception('Failed to get form register: {} {}'.format(response.error_code, response.error))
+    return response.tasks or []
+
+
+def _get_task_id_bounds(form_register_request):
+    value = getattr(form_register_request, 'id', None)
+    lower = upper = None
+    if value is None:
+        return lower, upper
+    for part in str(value).split(','):
+        if part.startswith('gt'):
+            lower = int(part[2:])
+        elif part.startswith('lt'):
+            upper = int(part[2:])
+        else:
+            raise ValueError('only greater than, less than and range task id filters can be paginated')
+    return lower, upper
@@ -0,0 +1,475 @@
+'''
+Local SQLite mirror of Pyrus data
+
+Keeps tasks, catalogs and persons in a local database, so repeated reads do not go to the server.
+The mirror is kept fresh by incremental synchronization and is queried with the form register filters.
+usage:
+
+    >>> from pyrus.mirror import SqliteMirror
+    >>> from pyrus.models.entities import EqualsFilter
+    >>> with SqliteMirror('pyrus.db') as mirror:
+           mirror.sync(pyrus_client, form_id)
+           tasks = mirror.find_tasks(form_id, filters=[EqualsFilter(field_id, 'value')], steps=[2])
+
+Tasks and catalog items are stored pickled, open only databases created by your application.
+'''
+
+import json
+import pickle
+import sqlite3
+import threading
+from datetime import datetime, date, time, timedelta
+from .models import constants, entities
+from .sync import CursorStore, RegistrySync, SyncCursor
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    form_id INTEGER,
+    current_step INTEGER,
+    create_date TEXT,
+    last_modified_date TEXT,
+    close_date TEXT,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_form ON tasks (form_id, current_step);
+CREATE INDEX IF NOT EXISTS tasks_modified ON tasks (form_id, last_modified_date);
+CREATE TABLE IF NOT EXISTS task_fields (
+    task_id INTEGER NOT NULL,
+    form_id INTEGER,
+    field_id INTEGER NOT NULL,
+    code TEXT,
+    row_id INTEGER,
+    value_text TEXT,
+    value_number REAL
+);
+CREATE INDEX IF NOT EXISTS task_fields_task ON task_fields (task_id);
+CREATE INDEX IF NOT EXISTS task_fields_text ON task_fields (field_id, value_text, task_id);
+CREATE INDEX IF NOT EXISTS task_fields_number ON task_fields (field_id, value_number, task_id);
+CREATE INDEX IF NOT EXISTS task_fields_code ON task_fields (form_id, code, value_text);
+CREATE TABLE IF NOT EXISTS catalogs (
+    id INTEGER PRIMARY KEY,
+    headers TEXT
+);
+CREATE TABLE IF NOT EXISTS catalog_items (
+    catalog_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    first_value TEXT,
+    data BLOB NOT NULL,
+    PRIMARY KEY (catalog_id, item_id)
+);
+CREATE INDEX IF NOT EXISTS catalog_items_value ON catalog_items (catalog_id, first_value);
+CREATE TABLE IF NOT EXISTS persons (
+    id INTEGER PRIMARY KEY,
+    email TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    department_id INTEGER,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS persons_email ON persons (email);
+CREATE TABLE IF NOT EXISTS sync_cursors (
+    form_id INTEGER PRIMARY KEY,
+    cursor TEXT NOT NULL
+);
+'''
+
+
+class SqliteMirror:
+    """
+        Local SQLite mirror of tasks, catalogs and persons.
+        Can be used from several threads, the access to the database is serialized.
+
+        Args:
+            path (:obj:`str`): Database file path, ':memory:' for an in-memory database
+
+        Attributes:
+            cursor_store (:obj:`pyrus.sync.CursorStore`): Synchronization cursors stored in the same database
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(_SCHEMA)
+        self.cursor_store = _MirrorCursorStore(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def sync(self, client, form_id, form_register_request=None, overlap=timedelta(minutes=5)):
+        """
+        Load the tasks of the form changed since the previous synchronization
+
+        Args:
+            client (:obj:`pyrus.client.PyrusAPI`): Pyrus API client
+            form_id (:obj:`int`): Form id
+            form_register_request (:obj:`models.requests.FormRegisterRequest`, optional): Request filters
+            overlap (:obj:`timedelta`, optional): How far before the cursor the changes are requested again
+
+        Returns:
+            :obj:`int`: Number of changed tasks
+        """
+        registry_sync = RegistrySync(client, self.upsert, self.cursor_store, overlap=overlap)
+        return registry_sync.sync(form_id, form_register_request)
+
+    def upsert(self, form_id, tasks):
+        """
+        Save tasks replacing their previous versions. Can be used as :class:`pyrus.sync.RegistrySync` sink
+
+        Args:
+            form_id (:obj:`int`): Form id, used if a task has no form_id
+            tasks (:obj:`list` of :obj:`models.entities.Task`): Tasks
+        """
+        task_rows = []
+        field_rows = []
+        persons = {}
+        for task in tasks:
+            task_form_id = task.form_id if task.form_id is not None else form_id
+            task_rows.append((task.id, task_form_id, task.current_step, _to_text(task.create_date),
+                              _to_text(task.last_modified_date), _to_text(task.close_date),
+                              pickle.dumps(task, pickle.HIGHEST_PROTOCOL)))
+            for field in task.flat_fields:
+                for value_text, value_number in _get_field_keys(field):
+                    field_rows.append((task.id, task_form_id, field.id, field.code, field.row_id,
+                                       value_text, value_number))
+            for person in (task.author, task.responsible):
+                if person is not None and person.id is not None:
+                    persons[person.id] = person
+        with self._lock, self._connection:
+            self._connection.executemany('DELETE FROM task_fields WHERE task_id = ?',
+                                         [(row[0],) for row in task_rows])
+            self._connection.executemany('INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)', task_rows)
+            self._connection.executemany('INSERT INTO task_fields VALUES (?, ?, ?, ?, ?, ?, ?)', field_rows)
+            self._upsert_persons(persons.values(), replace=False)
+
+    def delete_tasks(self, task_ids):
+        with self._lock, self._connection:
+            self._connection.executemany('DELETE FROM task_fields WHERE task_id = ?', [(i,) for i in task_ids])
+            self._connection.executemany('DELETE FROM tasks WHERE id = ?', [(i,) for i in task_ids])
+
+    def get_task(self, task_id):
+        """
+        Returns:
+            :obj:`models.entities.Task` object or None
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT data FROM tasks WHERE id = ?', (task_id,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def find_tasks(self, form_id, filters=None, steps=None, include_closed=True, modified_after=None,
+                   modified_before=None, limit=None):
+        """
+        Find tasks of the form
+
+        Args:
+            form_id (:obj:`int`): Form id
+            filters (:obj:`list` of :obj:`models.entities.BaseFilter`, optional): Form field and task id filters
+            steps (:obj:`list` of :obj:`int`, optional): Only tasks on the specified steps
+            include_closed (:obj:`bool`, optional): Include closed tasks
+            modified_after (:obj:`datetime`, optional): Only tasks modified after the date
+            modified_before (:obj:`datetime`, optional): Only tasks modified before the date
+            limit (:obj:`int`, optional): Maximum number of tasks
+
+        Returns:
+            :obj:`list` of :obj:`models.entities.Task` objects sorted by id
+        """
+        return [pickle.loads(row[0]) for row in self._find('t.data', form_id, filters, steps, include_closed,
+                                                           modified_after, modified_before, limit)]
+
+    def find_task_ids(self, form_id, filters=None, steps=None, include_closed=True, modified_after=None,
+                      modified_before=None, limit=None):
+        """
+        Same as :meth:`find_tasks`, but returns :obj:`list` of task ids
+        """
+        return [row[0] for row in self._find('t.id', form_id, filters, steps, include_closed,
+                                             modified_after, modified_before, limit)]
+
+    def upsert_catalog(self, catalog_response):
+        """
+        Replace all items of the catalog
+
+        Args:
+            catalog_response (:obj:`models.responses.CatalogResponse`): Catalog
+        """
+        catalog_id = catalog_response.catalog_id
+        headers = [header.name for header in catalog_response.catalog_headers or []]
+        rows = [(catalog_id, item.item_id, item.values[0] if item.values else None,
+                 pickle.dumps(item, pickle.HIGHEST_PROTOCOL)) for item in catalog_response.items or []]
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO catalogs VALUES (?, ?)', (catalog_id, json.dumps(headers)))
+            self._connection.execute('DELETE FROM catalog_items WHERE catalog_id = ?', (catalog_id,))
+            self._connection.executemany('INSERT INTO catalog_items VALUES (?, ?, ?, ?)', rows)
+
+    def get_catalog_headers(self, catalog_id):
+        """
+        Returns:
+            :obj:`list` of :obj:`str` header names or None if the catalog is not mirrored
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT headers FROM catalogs WHERE id = ?', (catalog_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_catalog_items(self, catalog_id, item_ids=None, first_value=None):
+        """
+        Get catalog items
+
+        Args:
+            catalog_id (:obj:`int`): Catalog id
+            item_ids (:obj:`list` of :obj:`int`, optional): Only items with the ids
+            first_value (:obj:`str`, optional): Only items with the value in the first column
+
+        Returns:
+            :obj:`list` of :obj:`models.entities.CatalogItem` objects sorted by item id
+        """
+        query = 'SELECT data FROM catalog_items WHERE catalog_id = ?'
+        params = [catalog_id]
+        if item_ids is not None:
+            query += ' AND item_id IN ({})'.format(','.join('?' * len(item_ids)))
+            params.extend(item_ids)
+        if first_value is not None:
+            query += ' AND first_value = ?'
+            params.append(first_value)
+        with self._lock:
+            rows = self._connection.execute(query + ' ORDER BY item_id', params).fetchall()
+        return [pickle.loads(row[0]) for row in rows]
+
+    def upsert_persons(self, persons):
+        """
+        Save persons, e.g. :obj:`models.responses.MembersResponse` members
+
+        Args:
+            persons (:obj:`list` of :obj:`models.entities.Person`): Persons
+        """
+        with self._lock, self._connection:
+            self._upsert_persons(persons, replace=True)
+
+    def get_person(self, person_id=None, email=None):
+        """
+        Get a person by id or email
+
+        Returns:
+            :obj:`models.entities.Person` object or None
+        """
+        if person_id is not None:
+            query, params = 'SELECT data FROM persons WHERE id = ?', (person_id,)
+        elif email is not None:
+            query, params = 'SELECT data FROM persons WHERE email = ?', (email,)
+        else:
+            raise ValueError('person_id or email must be specified')
+        with self._lock:
+            row = self._connection.execute(query, params).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def _upsert_persons(self, persons, replace):
+        if not replace:
+            persons = self._merge_persons(list(persons))
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO persons VALUES (?, ?, ?, ?, ?, ?)',
+            [(person.id, person.email, person.first_name, person.last_name, person.department_id,
+              pickle.dumps(person, pickle.HIGHEST_PROTOCOL)) for person in persons])
+
+    def _merge_persons(self, persons):
+        # persons from tasks have only a part of the attributes: the received ones update the stored record,
+        # the others (e.g. phone of a member) are kept
+        stored = {}
+        person_ids = [person.id for person in persons]
+        for start in range(0, len(person_ids), _MAX_VARIABLES):
+            chunk = person_ids[start:start + _MAX_VARIABLES]
+            rows = self._connection.execute(
+                'SELECT id, data FROM persons WHERE id IN ({})'.format(','.join('?' * len(chunk))), chunk)
+            stored.update((row[0], pickle.loads(row[1])) for row in rows)
+        merged = []
+        for person in persons:
+            current = stored.get(person.id)
+            if current is not None:
+                current.__dict__.update(vars(person))
+                person = current
+            merged.append(person)
+        return merged
+
+    def _find(self, columns, form_id, filters, steps, include_closed, modified_after, modified_before, limit):
+        conditions = ['t.form_id = ?']
+        params = [form_id]
+        if steps:
+            conditions.append('t.current_step IN ({})'.format(','.join('?' * len(steps))))
+            params.extend(steps)
+        if not include_closed:
+            conditions.append('t.close_date IS NULL')
+        if modified_after is not None:
+            conditions.append('t.last_modified_date > ?')
+            params.append(_to_text(modified_after))
+        if modified_before is not None:
+            conditions.append('t.last_modified_date < ?')
+            params.append(_to_text(modified_before))
+        selective = False
+        for fltr in filters or []:
+            condition, condition_params, condition_selective = _get_filter_condition(fltr)
+            conditions.append(condition)
+            params.extend(condition_params)
+            selective = selective or condition_selective
+        if selective:
+            # unary plus keeps sqlite from scanning the whole form by index instead of using field filters
+            conditions[0] = '+t.form_id = ?'
+        query = 'SELECT {} FROM tasks t WHERE {} ORDER BY t.id'.format(columns, ' AND '.join(conditions))
+        if limit is not None:
+            query += ' LIMIT {:d}'.format(limit)
+        with self._lock:
+            return self._connection.execute(query, params).fetchall()
+
+
+class _MirrorCursorStore(CursorStore):
+    """
+        Keeps synchronization cursors in the mirror database
+    """
+
+    def __init__(self, mirror):
+        self._mirror = mirror
+
+    def load(self, form_id):
+        with self._mirror._lock:
+            row = self._mirror._connection.execute('SELECT cursor FROM sync_cursors WHERE form_id = ?',
+                                                   (form_id,)).fetchone()
+        return SyncCursor.from_dict(json.loads(row[0])) if row else None
+
+    def save(self, form_id, cursor):
+        with self._mirror._lock, self._mirror._connection:
+            self._mirror._connection.execute('INSERT OR REPLACE INTO sync_cursors VALUES (?, ?)',
+                                             (form_id, json.dumps(cursor.to_dict())))
+
+
+_FIELD_SELECT = 'SELECT f.task_id FROM task_fields f WHERE f.field_id = ?'
+# below the default limit of variables in a statement of old sqlite versions
+_MAX_VARIABLES = 900
+
+
+def _get_filter_condition(fltr):
+    # returns the condition, its parameters and whether it is selective enough to drive the query
+    if isinstance(fltr, entities.FormRegisterTaskIdFilter):
+        condition, params = _get_task_id_condition(fltr)
+        return condition, params, False
+    if not isinstance(fltr, entities.FormRegisterFilter):
+        raise TypeError('filters must be a list of entities.BaseFilter')
+    field_id = fltr.field_id
+    if fltr.operator == 'is_empty':
+        return 't.id NOT IN ({})'.format(_FIELD_SELECT), [field_id], False
+    if fltr.operator == 'exists':
+        return 't.id IN ({})'.format(_FIELD_SELECT), [field_id], True
+    if fltr.operator == 'equals':
+        selects = _get_equals_selects([fltr.values])
+    elif fltr.operator == 'is_in':
+        selects = _get_equals_selects(fltr.values)
+    elif fltr.operator == 'greater_than':
+        selects = [_get_compare_condition('>', fltr.values)]
+    elif fltr.operator == 'less_than':
+        selects = [_get_compare_condition('<', fltr.values)]
+    elif fltr.operator == 'range':
+        # range bounds are not included, same as the server filter
+        lower_condition, lower_params = _get_compare_condition('>', fltr.values[0])
+        upper_condition, upper_params = _get_compare_condition('<', fltr.values[1])
+        selects = [('{} AND {}'.format(lower_condition, upper_condition), lower_params + upper_params)]
+    else:
+        raise ValueError('unsupported filter operator {}'.format(fltr.operator))
+    params = []
+    for _, select_params in selects:
+        params.append(field_id)
+        params.extend(select_params)
+    # separate selects for text and number values, so each of them uses its index
+    union = ' UNION '.join('{} AND {}'.format(_FIELD_SELECT, condition) for condition, _ in selects)
+    return 't.id IN ({})'.format(union), params, True
+
+
+def _get_task_id_condition(fltr):
+    if fltr.operator == 'equals':
+        return 't.id = ?', [int(fltr.values)]
+    if fltr.operator == 'is_in':
+        return 't.id IN ({})'.format(','.join('?' * len(fltr.values))), [int(value) for value in fltr.values]
+    if fltr.operator == 'greater_than':
+        return 't.id > ?', [int(fltr.values)]
+    if fltr.operator == 'less_than':
+        return 't.id < ?', [int(fltr.values)]
+    if fltr.operator == 'range':
+        return 't.id > ? AND t.id < ?', [int(value) for value in fltr.values]
+    raise ValueError('unsupported filter operator {}'.format(fltr.operator))
+
+
+def _get_equals_selects(values):
+    texts = [_to_text(value) for value in values]
+    numbers = [number for number in (_to_number(value) for value in values) if number is not None]
+    selects = [('f.value_text IN ({})'.format(','.join('?' * len(texts))), texts)]
+    if numbers:
+        selects.append(('f.value_number IN ({})'.format(','.join('?' * len(numbers))), numbers))
+    return selects
+
+
+def _get_compare_condition(operator, value):
+    number = _to_number(value)
+    if number is None:
+        return 'f.value_number IS NULL AND f.value_text {} ?'.format(operator), [_to_text(value)]
+    return 'f.value_number {} ?'.format(operator), [number]
+
+
+def _get_field_keys(field):
+    # (value_text, value_number) pairs the field is matched by filters with
+    value = field.value
+    if value is None:
+        return []
+    if field.type in ('number', 'money'):
+        return [(_to_text(value), _to_number(value))]
+    if isinstance(value, entities.CatalogItem):
+        return [(str(item_id), item_id) for item_id in value.item_ids or []]
+    if isinstance(value, entities.MultipleChoice):
+        choice_ids = value.choice_ids or ([value.choice_id] if value.choice_id is not None else [])
+        return [(str(choice_id), choice_id) for choice_id in choice_ids]
+    if isinstance(value, entities.Person):
+        return [(str(value.id), value.id)] if value.id is not None else []
+    if isinstance(value, entities.FormLink):
+        task_ids = value.task_ids or ([value.task_id] if value.task_id is not None else [])
+        return [(str(task_id), task_id) for task_id in task_ids]
+    if isinstance(value, entities.Projects):
+        return [(str(project.id), project.id) for project in value.projects or []]
+    if isinstance(value, entities.Title):
+        return [(value.checkmark, None)] if value.checkmark is not None else []
+    if isinstance(value, entities.Table):
+        return []
+    if isinstance(value, list):
+        # files
+        return [(str(file.id), file.id) for file in value if getattr(file, 'id', None) is not None]
+    if field.type in ('date', 'creation_date', 'due_date'):
+        return [(value.strftime(constants.DATE_FORMAT), None)]
+    return [(_to_text(value), None)]
+
+
+def _to_text(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.strftime(constants.DATE_TIME_FORMAT)
+    if isinstance(value, date):
+        return value.strftime(constants.DATE_FORMAT)
+    if isinstance(value, time):
+        return value.strftime(constants.TIME_FORMAT)
+    return str(value)
+
+
+def _to_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
@@ -4,53 +4,76 @@ from datetime import time
 from . import constants
 
 class FormFieldHandler(jsonpickle.handlers.BaseHandler):
-    
+
     def flatten(self, obj, data):
-        if obj.id:
-            data['id'] = obj.id
-        if obj.name:
-            data['name'] = obj.name
-        if obj.code:
-            data['code'] = obj.code
-
-        #ignore readonly fields
-        if obj.type in ['step', 'status', 'note', 'author', 'project', 'creation_date']:
-            return data
-
-        if obj.value is not None:
-            data['value'] = self._get_flatten_value(obj.type, obj.value)
-        return data
-    
+        return flatten_form_field(obj, data, _flatten)
+
     def _get_flatten_value(self, type, value):
-        if isinstance(value, str):
-            return value
-
-        if type == 'due_date_time':
-            return value.strftime(constants.DATE_TIME_FORMAT)
-        if type in ['date', 'due_date']:
-            return value.strftime(constants.DATE_FORMAT)
-        if type == 'time':
-            if isinstance(value, time):
-                return time.strftime(value, constants.TIME_FORMAT)
-            return datetime.strftime(value, constants.TIME_FORMAT)
-        if type == 'file':
-            if not isinstance(value, list):
-                return
-                
-        p = jsonpickle.Pickler(unpicklable=False)
-        return p.flatten(value)
+        return flatten_form_field_value(type, value, _flatten)
 
 
 class ChannelHandler(jsonpickle.handlers.BaseHandler):
-   
+
    def flatten(self, obj, data):
-        p = jsonpickle.Pickler(unpicklable=False)
-        if obj.type:
-            data['type'] = obj.type
-        if obj.phone:
-            data['phone'] = obj.phone
-        if obj.to:
-            data['to'] = obj.to
-        if obj.sender:
-            data['from'] = p.flatten(obj.sender)
-        return data
\ No newline at end of file
+        return flatten_channel(obj, data, _flatten)
+
+
+def flatten_form_field(obj, data, flatten):
+    """
+    Flatten a form field to data, nested values are flattened with the flatten callable.
+    Shared by the jsonpickle handler and :mod:`pyrus.serialization`
+    """
+    if obj.id:
+        data['id'] = obj.id
+    if obj.name:
+        data['name'] = obj.name
+    if obj.code:
+        data['code'] = obj.code
+
+    #ignore readonly fields
+    if obj.type in ['step', 'status', 'note', 'author', 'project', 'creation_date']:
+        return data
+
+    if obj.value is not None:
+        data['value'] = flatten_form_field_value(obj.type, obj.value, flatten)
+    return data
+
+
+def flatten_form_field_value(type, value, flatten):
+    if isinstance(value, str):
+        return value
+
+    if type == 'due_date_time':
+        return value.strftime(constants.DATE_TIME_FORMAT)
+    if type in ['date', 'due_date']:
+        return value.strftime(constants.DATE_FORMAT)
+    if type == 'time':
+        if isinstance(value, time):
+            return time.strftime(value, constants.TIME_FORMAT)
+        return datetime.strftime(value, constants.TIME_FORMAT)
+    if type == 'file':
+        if not isinstance(value, list):
+            return
+
+    return flatten(value)
+
+
+def flatten_channel(obj, data, flatten):
+    """
+    Flatten a channel to data, the sender is flattened with the flatten callable.
+    Shared by the jsonpickle handler and :mod:`pyrus.serialization`
+    """
+    if obj.type:
+        data['type'] = obj.type
+    if obj.phone:
+        data['phone'] = obj.phone
+    if obj.to:
+        data['to'] = obj.to
+    if obj.sender:
+        data['from'] = flatten(obj.sender)
+    return data
+
+
+def _flatten(value):
+    p = jsonpickle.Pickler(unpicklable=False)
+    return p.flatten(value)
@@ -2,10 +2,12 @@
 # pylint: disable=R0903
 # pylint: disable=too-many-instance-attributes
 
+import sys
 from datetime import datetime
-from datetime import timezone
 from . import customhandlers
 from . import constants
+from . import timestamps
+from . import field_index
 
 
 @customhandlers.FormFieldHandler.handles
@@ -39,9 +41,9 @@ class FormField:
         if 'id' in kwargs:
             self.id = kwargs['id']
         if 'type' in kwargs:
-            self.type = kwargs['type']
+            self.type = _intern(kwargs['type'])
         if 'name' in kwargs:
-            self.name = kwargs['name']
+            self.name = _intern(kwargs['name'])
         if 'info' in kwargs:
             self.info = FormFieldInfo(**kwargs['info'])
         if 'value' in kwargs:
@@ -56,7 +58,7 @@ class FormField:
         if 'row_id' in kwargs:
             self.row_id = kwargs['row_id']
         if 'code' in kwargs:
-            self.code = kwargs['code']
+            self.code = _intern(kwargs['code'])
 
 
 class FormFieldInfo:
@@ -163,18 +165,17 @@ class TaskHeader:
         if 'text' in kwargs:
             self.text = kwargs['text']
         if 'create_date' in kwargs:
-            self.create_date = _set_utc_timezone(datetime.strptime(kwargs['create_date'], constants.DATE_TIME_FORMAT))
+            self.create_date = timestamps.parse_date_time(kwargs['create_date'])
         if 'last_modified_date' in kwargs:
-            self.last_modified_date = _set_utc_timezone(
-                datetime.strptime(kwargs['last_modified_date'], constants.DATE_TIME_FORMAT))
+            self.last_modified_date = timestamps.parse_date_time(kwargs['last_modified_date'])
         if 'author' in kwargs:
             self.author = Person(**kwargs['author'])
         if 'close_date' in kwargs:
-            self.close_date = _set_utc_timezone(datetime.strptime(kwargs['close_date'], constants.DATE_TIME_FORMAT))
+            self.close_date = timestamps.parse_date_time(kwargs['close_date'])
         if 'responsible' in kwargs:
             self.responsible = Person(**kwargs['responsible'])
         if 'due_date' in kwargs:
-            self.due_date = datetime.strptime(kwargs['due_date'], constants.DATE_FORMAT)
+            self.due_date = timestamps.parse_date(kwargs['due_date'])
 
 
 class Task(TaskHeader):
@@ -232,20 +233,57 @@ class Task(TaskHeader):
     def flat_fields(self):
         return _get_flat_fields(self.fields)
 
+    def field(self, id_or_code):
+        """
+        Find a field by id or code, nested fields included. Lookups use a cached index,
+        see :mod:`pyrus.models.field_index`
+
+        Args:
+            id_or_code (:obj:`int` or :obj:`str`): Field id or code
+
+        Returns:
+            :obj:`models.entities.FormField` or None
+        """
+        return self._get_field_index().get(id_or_code)
+
+    def field_by_name(self, name):
+        """
+        Find a field by name, nested fields included
+
+        Returns:
+            :obj:`models.entities.FormField` or None
+        """
+        return self._get_field_index().by_name.get(name)
+
+    def table_cell(self, row_id, column_id):
+        """
+        Find a table cell
+
+        Args:
+            row_id (:obj:`int`): Table row id
+            column_id (:obj:`int`): Column field id
+
+        Returns:
+            :obj:`models.entities.FormField` or None
+        """
+        return self._get_field_index().by_cell.get((row_id, column_id))
+
+    def _get_field_index(self):
+        return field_index.get_index(self, self.fields, _create_field_index)
+
     def __init__(self, **kwargs):
         if 'subject' in kwargs:
             self.subject = kwargs['subject']
         if 'due_date' in kwargs:
-            self.due_date = datetime.strptime(kwargs['due_date'], constants.DATE_FORMAT)
+            self.due_date = timestamps.parse_date(kwargs['due_date'])
         if 'due' in kwargs:
-            self.due = _set_utc_timezone(datetime.strptime(kwargs['due'], constants.DATE_TIME_FORMAT))
+            self.due = timestamps.parse_date_time(kwargs['due'])
         if 'duration' in kwargs:
             self.duration = kwargs['duration']
         if 'scheduled_date' in kwargs:
-            self.scheduled_date = datetime.strptime(kwargs['scheduled_date'], constants.DATE_FORMAT)
+            self.scheduled_date = timestamps.parse_date(kwargs['scheduled_date'])
         if 'scheduled_datetime_utc' in kwargs:
-            self.scheduled_datetime_utc = datetime.strptime(kwargs['scheduled_datetime_utc'],
-                                                            constants.DATE_TIME_FORMAT)
+            self.scheduled_datetime_utc = timestamps.parse_naive_date_time(kwargs['scheduled_datetime_utc'])
         if 'form_id' in kwargs:
             self.form_id = kwargs['form_id']
         if 'attachments' in kwargs:
@@ -345,7 +383,7 @@ class AnnouncementWithComments:
         if 'text' in kwargs:
             self.text = kwargs['text']
         if 'create_date' in kwargs:
-            self.create_date = _set_utc_timezone(datetime.strptime(kwargs['create_date'], constants.DATE_TIME_FORMAT))
+            self.create_date = timestamps.parse_date_time(kwargs['create_date'])
         if 'attachments' in kwargs:
             self.attachments = [File(**attachment) for attachment in kwargs['attachments']]
         if 'author' in kwargs:
@@ -393,19 +431,19 @@ class Person:
         if 'id' in kwargs:
             self.id = kwargs['id']
         if 'first_name' in kwargs:
-            self.first_name = kwargs['first_name']
+            self.first_name = _intern(kwargs['first_name'])
         if 'last_name' in kwargs:
-            self.last_name = kwargs['last_name']
+            self.last_name = _intern(kwargs['last_name'])
         if 'email' in kwargs:
-            self.email = kwargs['email']
+            self.email = _intern(kwargs['email'])
         if 'status' in kwargs:
-            self.status = kwargs['status']
+            self.status = _intern(kwargs['status'])
         if 'avatar_id' in kwargs:
             self.avatar_id = kwargs['avatar_id']
         if 'external_avatar_id' in kwargs:
             self.external_avatar_id = kwargs['external_avatar_id']
         if 'type' in kwargs:
-            self.type = kwargs['type']
+            self.type = _intern(kwargs['type'])
         if 'department_id' in kwargs:
             self.department_id = kwargs['department_id']
         if 'department_name' in kwargs:
@@ -587,17 +625,32 @@ class TaskComment:
     def flat_field_updates(self):
         return _get_flat_fields(self.field_updates)
 
+    def field_update(self, id_or_code):
+        """
+        Find a field update by id or code, nested fields included
+
+        Args:
+            id_or_code (:obj:`int` or :obj:`str`): Field id or code
+
+        Returns:
+            :obj:`models.entities.FormField` or None
+        """
+        return self._get_field_index().get(id_or_code)
+
+    def _get_field_index(self):
+        return field_index.get_index(self, self.field_updates, _create_field_index)
+
     def __init__(self, **kwargs):
         if 'id' in kwargs:
             self.id = kwargs['id']
         if 'text' in kwargs:
             self.text = kwargs['text']
         if 'mentions' in kwargs:
-            self.mentions = kwargs['mentions']
+            self.mentions = [mention for mention in kwargs['mentions']]
         if 'subject' in kwargs:
             self.subject = kwargs['subject']
         if 'create_date' in kwargs:
-            self.create_date = _set_utc_timezone(datetime.strptime(kwargs['create_date'], constants.DATE_TIME_FORMAT))
+            self.create_date = timestamps.parse_date_time(kwargs['create_date'])
         if 'author' in kwargs:
             self.author = Person(**kwargs['author'])
         if 'reassigned_to' in kwargs:
@@ -637,9 +690,9 @@ class TaskComment:
         if 'participants_removed' in kwargs:
             self.participants_removed = [Person(**participant) for participant in kwargs['participants_removed']]
         if 'due_date' in kwargs:
-            self.due_date = datetime.strptime(kwargs['due_date'], constants.DATE_FORMAT)
+            self.due_date = timestamps.parse_date(kwargs['due_date'])
         if 'due' in kwargs:
-            self.due = _set_utc_timezone(datetime.strptime(kwargs['due'], constants.DATE_TIME_FORMAT))
+            self.due = timestamps.parse_date_time(kwargs['due'])
         if 'duration' in kwargs:
             self.duration = kwargs['duration']
         if 'attachments' in kwargs:
@@ -647,10 +700,9 @@ class TaskComment:
         if 'action' in kwargs:
             self.action = kwargs['action']
         if 'scheduled_date' in kwargs:
-            self.scheduled_date = datetime.strptime(kwargs['scheduled_date'], constants.DATE_FORMAT)
+            self.scheduled_date = timestamps.parse_date(kwargs['scheduled_date'])
         if 'scheduled_datetime_utc' in kwargs:
-            self.scheduled_datetime_utc = datetime.strptime(kwargs['scheduled_datetime_utc'],
-                                                            constants.DATE_TIME_FORMAT)
+            self.scheduled_datetime_utc = timestamps.parse_naive_date_time(kwargs['scheduled_datetime_utc'])
         if 'cancel_schedule' in kwargs:
             self.cancel_schedule = kwargs['cancel_schedule']
         if 'added_list_ids' in kwargs:
@@ -722,7 +774,7 @@ class AnnouncementComment:
         if 'text' in kwargs:
             self.text = kwargs['text']
         if 'create_date' in kwargs:
-            self.create_date = _set_utc_timezone(datetime.strptime(kwargs['create_date'], constants.DATE_TIME_FORMAT))
+            self.create_date = timestamps.parse_date_time(kwargs['create_date'])
         if 'author' in kwargs:
             self.author = Person(**kwargs['author'])
         if 'attachments' in kwargs:
@@ -815,7 +867,7 @@ class CatalogItem:
 
     def __init__(self, **kwargs):
         if 'headers' in kwargs:
-            self.headers = [header for header in kwargs['headers']]
+            self.headers = [_intern(header) for header in kwargs['headers']]
 
         if 'item_ids' in kwargs:
             self.item_ids = [_id for _id in kwargs['item_ids']]
@@ -1287,15 +1339,15 @@ def _create_field_value(field_type, value):
     if field_type == 'time':
         if isinstance(value, datetime):
             return value
-        return _set_utc_timezone(datetime.strptime(value, constants.TIME_FORMAT).time())
+        return timestamps.parse_time(value)
     if field_type in ['date', 'creation_date', 'due_date']:
         if isinstance(value, datetime):
             return value
-        return _set_utc_timezone(datetime.strptime(value, constants.DATE_FORMAT))
+        return timestamps.parse_utc_date(value)
     if field_type == 'due_date_time':
         if isinstance(value, datetime):
             return value
-        return _set_utc_timezone(datetime.strptime(value, constants.DATE_TIME_FORMAT))
+        return timestamps.parse_date_time(value)
     if field_type == 'catalog':
         return CatalogItem(**value)
     if field_type == 'file':
@@ -1329,10 +1381,25 @@ def _get_flat_fields(fields):
     return res
 
 
-def _set_utc_timezone(time):
-    if time.tzinfo is None:
-        time = time.replace(tzinfo=timezone.utc)
-    return time
+def _create_field_index(fields):
+    flat_fields = _get_flat_fields(fields)
+    cells = [(row.row_id, cell) for field in flat_fields if isinstance(field.value, Table)
+             for row in field.value if row.cells for cell in row.cells]
+    return field_index.FieldIndex(fields, flat_fields, cells)
+
+
+def _intern(value):
+    # names, types and codes repeat in every task of a register: keep one copy of each string
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+def _copy_dict(value):
+    # do not keep references to the decoded response
+    if isinstance(value, dict):
+        return dict(value)
+    return value
 
 
 class NewFile:
@@ -1389,11 +1456,11 @@ class Channel:
         if 'type' in kwargs:
             self.type = kwargs['type']
         if 'to' in kwargs:
-            self.to = kwargs['to']
+            self.to = _copy_dict(kwargs['to'])
         if 'from' in kwargs:
-            self.sender = kwargs['from']
+            self.sender = _copy_dict(kwargs['from'])
         if 'sender' in kwargs:
-            self.sender = kwargs['sender']
+            self.sender = _copy_dict(kwargs['sender'])
         if 'phone' in kwargs:
             self.phone = kwargs['phone']
 
@@ -1491,7 +1558,7 @@ class Meeting:
         if 'type' in kwargs:
             self.type = kwargs['type']
         if 'start_time' in kwargs:
-            self.start_time = _set_utc_timezone(datetime.strptime(kwargs['start_time'], constants.DATE_TIME_FORMAT))
+            self.start_time = timestamps.parse_date_time(kwargs['start_time'])
         if 'duration' in kwargs:
             self.duration = kwargs['duration']
         if 'join_parameters' in kwargs:
@@ -0,0 +1,82 @@
+'''
+Cached index of the fields of tasks, comments and forms
+
+The index is built on the first lookup and kept outside of the indexed object, so it is never serialized.
+It is rebuilt when the list of fields is replaced or a top level field is added, removed or replaced.
+Changes below the top level (e.g. a new table row or a changed field id) are not tracked:
+call :func:`invalidate` after them. flat_fields and similar properties always walk the current tree.
+'''
+
+import weakref
+
+_indexes = weakref.WeakKeyDictionary()
+
+
+class FieldIndex:
+    """
+        Fields of a field tree by id, code, name and table cells by row id and column id.
+        The first field wins when several fields have the same key, as a scan of flat fields would find
+
+        Attributes:
+            flat_fields (:obj:`list` of :obj:`models.entities.FormField`): Fields with the nested ones
+            by_id (:obj:`dict` of :obj:`int` as key and :obj:`models.entities.FormField` as value): Fields by id
+            by_code (:obj:`dict` of :obj:`str` as key and :obj:`models.entities.FormField` as value): Fields by code
+            by_name (:obj:`dict` of :obj:`str` as key and :obj:`models.entities.FormField` as value): Fields by name
+            by_cell (:obj:`dict` of :obj:`tuple` as key and :obj:`models.entities.FormField` as value):
+                Table cells by (row id, column id)
+    """
+
+    def __init__(self, fields, flat_fields, cells=()):
+        self.fields = fields
+        self.items = _get_items(fields)
+        self.flat_fields = flat_fields
+        self.by_id = {}
+        self.by_code = {}
+        self.by_name = {}
+        self.by_cell = {}
+        for field in flat_fields:
+            if field.id is not None:
+                self.by_id.setdefault(field.id, field)
+            code = field.code if field.code is not None else getattr(field.info, 'code', None)
+            if code is not None:
+                self.by_code.setdefault(code, field)
+            if field.name is not None:
+                self.by_name.setdefault(field.name, field)
+        for row_id, cell in cells:
+            self.by_cell.setdefault((row_id, cell.id), cell)
+
+    def get(self, id_or_code):
+        """
+        Find a field by id (:obj:`int`) or code (:obj:`str`)
+        """
+        if isinstance(id_or_code, str):
+            return self.by_code.get(id_or_code)
+        return self.by_id.get(id_or_code)
+
+
+def get_index(owner, fields, create):
+    """
+    Get the cached index of owner's fields
+
+    Args:
+        owner (:obj:`object`): Object that holds the fields
+        fields (:obj:`list` of :obj:`models.entities.FormField`): Top level fields of owner
+        create (:obj:`callable`): Builds a :class:`FieldIndex` from fields
+    """
+    index = _indexes.get(owner)
+    # comparing the tuples compares the fields by identity, replacing one field rebuilds the index
+    if index is None or index.fields is not fields or index.items != _get_items(fields):
+        index = create(fields)
+        _indexes[owner] = index
+    return index
+
+
+def invalidate(owner):
+    """
+    Drop the cached index of owner's fields, it is built again on the next lookup
+    """
+    _indexes.pop(owner, None)
+
+
+def _get_items(fields):
+    return tuple(fields) if fields else ()
@@ -0,0 +1,237 @@
+'''
+Lazy response models
+
+Lazy entities keep the dictionary received from the server and build an attribute on its first access:
+nested entities, field values and dates are created only when they are read and are cached afterwards.
+Lazy classes are subclasses of the regular models and their attributes have the same values.
+usage:
+
+    >>> pyrus_client = PyrusAPI(login, security_key, lazy=True)
+    >>> tasks = pyrus_client.get_registry(form_id).tasks  # tasks are not built yet
+    >>> tasks[0].fields[0].value  # builds only the fields of the first task and the value of its first field
+'''
+
+# pylint: disable=C0103
+# pylint: disable=R0903
+
+from . import customhandlers, entities, responses as resp
+
+
+class LazyEntity:
+    """
+        Base class of lazy entities. Should never be created explicitly
+
+        Subclasses set _eager_class to the regular model. Attributes in _nested are built by their function
+        from the raw value, other attributes are built by the constructor of the regular model
+        called with the attribute key and the keys listed in _dependencies.
+    """
+
+    __slots__ = ()
+
+    _eager_class = None
+    _nested = {}
+    _dependencies = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super(LazyEntity, cls).__init_subclass__(**kwargs)
+        # shadow the class level defaults of the regular model, they would hide __getattr__
+        for name, default in _get_declared_attributes(cls._eager_class).items():
+            if name not in vars(cls):
+                setattr(cls, name, _LazyAttribute(name, default))
+
+    def __init__(self, **kwargs):
+        self._data = kwargs
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create the entity from the raw dictionary without copying it
+        """
+        entity = cls.__new__(cls)
+        entity._data = data
+        return entity
+
+    def __getattr__(self, name):
+        # attributes the regular model sets without a class level default
+        if name.startswith('_') or name not in self._data:
+            raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+        return self._materialize(name)
+
+    def __getstate__(self):
+        # the state of the regular model updated with the values that were read or changed
+        state = self._eager_class(**self._data).__dict__
+        state.update(self.__dict__)
+        return state
+
+    def __reduce__(self):
+        return _restore, (type(self), self._data, self.__dict__)
+
+    def _materialize(self, name):
+        data = self._data
+        nested = self._nested.get(name)
+        if nested is not None and name in data:
+            value = nested(data[name])
+        else:
+            eager_class = self._eager_class
+            kwargs = {key: data[key] for key in self._dependencies.get(name, ()) + (name,) if key in data}
+            if name not in kwargs:
+                return getattr(eager_class, name)
+            eager = eager_class.__new__(eager_class)
+            eager_class.__init__(eager, **kwargs)
+            if name not in eager.__dict__:
+                return getattr(eager_class, name)
+            value = eager.__dict__[name]
+        self.__dict__[name] = value
+        return value
+
+
+class _LazyAttribute:
+    # non data descriptor: once the value is cached in the instance dictionary it is returned directly
+
+    def __init__(self, name, default):
+        self.name = name
+        self.default = default
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self.default
+        return instance._materialize(self.name)  # pylint: disable=protected-access
+
+
+def _get_declared_attributes(eager_class):
+    attributes = {}
+    for klass in reversed(eager_class.__mro__):
+        for name, value in vars(klass).items():
+            if name.startswith('_') or callable(value) or isinstance(value, (property, staticmethod, classmethod)):
+                continue
+            attributes[name] = value
+    return attributes
+
+
+def _restore(cls, data, state):
+    entity = cls.from_dict(data)
+    entity.__dict__.update(state)
+    return entity
+
+
+@customhandlers.FormFieldHandler.handles
+class LazyFormField(LazyEntity, entities.FormField):
+    """
+        Lazy :class:`models.entities.FormField`
+    """
+
+    __slots__ = ('_data',)
+
+    _eager_class = entities.FormField
+    _dependencies = {
+        'value': ('type',),
+        'duration': ('type',),
+    }
+
+
+class LazyTaskHeader(LazyEntity, entities.TaskHeader):
+    """
+        Lazy :class:`models.entities.TaskHeader`
+    """
+
+    __slots__ = ('_data',)
+
+    _eager_class = entities.TaskHeader
+
+
+class LazyTask(LazyEntity, entities.Task):
+    """
+        Lazy :class:`models.entities.Task`, fields are :class:`LazyFormField` objects
+    """
+
+    __slots__ = ('_data',)
+
+    _eager_class = entities.Task
+    _nested = {
+        'fields': lambda fields: [LazyFormField.from_dict(field) for field in fields],
+    }
+
+
+class LazyTaskComment(LazyEntity, entities.TaskComment):
+    """
+        Lazy :class:`models.entities.TaskComment`, field_updates are :class:`LazyFormField` objects
+    """
+
+    __slots__ = ('_data',)
+
+    _eager_class = entities.TaskComment
+    _nested = {
+        'field_updates': lambda fields: [LazyFormField.from_dict(field) for field in fields],
+    }
+
+
+class LazyTaskWithComments(LazyEntity, entities.TaskWithComments):
+    """
+        Lazy :class:`models.entities.TaskWithComments`, comments are :class:`LazyTaskComment` objects
+    """
+
+    __slots__ = ('_data',)
+
+    _eager_class = entities.TaskWithComments
+    _nested = {
+        'fields': LazyTask._nested['fields'],
+        'comments': lambda comments: [LazyTaskComment.from_dict(comment) for comment in comments],
+    }
+
+
+class LazyFormRegisterResponse(resp.FormRegisterResponse):
+    """
+        FormRegisterResponse with :class:`LazyTask` tasks
+    """
+
+    def __init__(self, **kwargs):
+        if 'tasks' in kwargs:
+            self.tasks = [LazyTask.from_dict(task) for task in kwargs['tasks']]
+        super(resp.FormRegisterResponse, self).__init__(**kwargs)
+
+
+class LazyTaskResponse(resp.TaskResponse):
+    """
+        TaskResponse with :class:`LazyTaskWithComments` task
+    """
+
+    def __init__(self, **kwargs):
+        if 'task' in kwargs:
+            self.task = LazyTaskWithComments.from_dict(kwargs['task'])
+        super(resp.TaskResponse, self).__init__(**kwargs)
+
+
+class LazyTaskListResponse(resp.TaskListResponse):
+    """
+        TaskListResponse with :class:`LazyTaskHeader` tasks
+    """
+
+    def __init__(self, **kwargs):
+        if 'has_more' in kwargs:
+            self.has_more = kwargs['has_more']
+        if 'tasks' in kwargs:
+            self.tasks = [LazyTaskHeader.from_dict(task) for task in kwargs['tasks']]
+        super(resp.TaskListResponse, self).__init__(**kwargs)
+
+
+class LazyCalendarResponse(resp.CalendarResponse):
+    """
+        CalendarResponse with :class:`LazyTaskWithComments` tasks
+    """
+
+    def __init__(self, **kwargs):
+        if 'has_more' in kwargs:
+            self.has_more = kwargs['has_more']
+        if 'tasks' in kwargs:
+            self.tasks = [LazyTaskWithComments.from_dict(task) for task in kwargs['tasks']]
+        if 'meetings' in kwargs:
+            self.meetings = [entities.Meeting(**meeting) for meeting in kwargs['meetings']]
+        super(resp.CalendarResponse, self).__init__(**kwargs)
+
+
+LAZY_RESPONSES = {
+    resp.FormRegisterResponse: LazyFormRegisterResponse,
+    resp.TaskResponse: LazyTaskResponse,
+    resp.TaskListResponse: LazyTaskListResponse,
+    resp.CalendarResponse: LazyCalendarResponse,
+}
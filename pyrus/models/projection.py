@@ -0,0 +1,128 @@
+'''
+Client side projection of tasks
+
+A projection removes unrequested fields, comments, attachments, approvals and subscribers from the received
+tasks before the models are built, so they are never constructed. Pyrus sends the whole task anyway:
+use ``field_ids`` of :class:`models.requests.FormRegisterRequest` to limit what a form register sends.
+usage:
+
+    >>> from pyrus.models.projection import Projection
+    >>> projection = Projection(fields=[1, 'status'], comments=False, attachments=False)
+    >>> task = pyrus_client.with_projection(projection).get_task(task_id).task
+'''
+
+
+class Projection:
+    """
+        Parts of tasks to build
+
+        Args:
+            fields (:obj:`list` of :obj:`int` or :obj:`str`, optional): Ids or codes of the fields to build.
+                Fields nested in titles, multiple choices and table rows are found too: their containers are
+                built with the requested fields only. Field updates of comments are projected the same way.
+                None builds all fields
+            comments (:obj:`bool`, optional): Build comments
+            attachments (:obj:`bool`, optional): Build attachments
+            approvals (:obj:`bool`, optional): Build approvals
+            subscribers (:obj:`bool`, optional): Build subscribers
+    """
+
+    def __init__(self, fields=None, comments=True, attachments=True, approvals=True, subscribers=True):
+        if fields is not None:
+            if isinstance(fields, (str, int)):
+                raise TypeError('fields must be a list of field ids or codes')
+            fields = list(fields)
+            for field in fields:
+                if isinstance(field, bool) or not isinstance(field, (int, str)):
+                    raise TypeError('fields must be a list of field ids or codes')
+        self.fields = fields
+        self.comments = comments
+        self.attachments = attachments
+        self.approvals = approvals
+        self.subscribers = subscribers
+        self._ids = frozenset(field for field in fields or () if isinstance(field, int))
+        self._codes = frozenset(field for field in fields or () if isinstance(field, str))
+        self._dropped_keys = frozenset(key for key, keep in (('comments', comments), ('attachments', attachments),
+                                                            ('approvals', approvals), ('subscribers', subscribers))
+                                       if not keep)
+
+    def project_response(self, response):
+        """
+        Project the tasks of a decoded response. The response is not changed
+
+        Args:
+            response (:obj:`dict`): Decoded response with 'task' or 'tasks'
+
+        Returns:
+            :obj:`dict`: A copy of the response with projected tasks, or the response itself if it has no tasks
+        """
+        task = response.get('task')
+        tasks = response.get('tasks')
+        if not isinstance(task, dict) and not isinstance(tasks, list):
+            return response
+        response = dict(response)
+        if isinstance(task, dict):
+            response['task'] = self.project_task(task)
+        if isinstance(tasks, list):
+            response['tasks'] = [self.project_task(task) if isinstance(task, dict) else task for task in tasks]
+        return response
+
+    def project_task(self, task):
+        """
+        Project a decoded task. The task is not changed
+
+        Args:
+            task (:obj:`dict`): Decoded task
+
+        Returns:
+            :obj:`dict`: A copy of the task without the unrequested parts
+        """
+        dropped_keys = self._dropped_keys
+        task = {key: value for key, value in task.items() if key not in dropped_keys}
+        if self.fields is None:
+            return task
+        if isinstance(task.get('fields'), list):
+            task['fields'] = self._project_fields(task['fields'])
+        if isinstance(task.get('comments'), list):
+            task['comments'] = [self._project_comment(comment) for comment in task['comments']]
+        return task
+
+    def _project_comment(self, comment):
+        if not isinstance(comment, dict) or not isinstance(comment.get('field_updates'), list):
+            return comment
+        comment = dict(comment)
+        comment['field_updates'] = self._project_fields(comment['field_updates'])
+        return comment
+
+    def _project_fields(self, fields):
+        result = []
+        for field in fields:
+            if not isinstance(field, dict):
+                continue
+            if field.get('id') in self._ids or field.get('code') in self._codes:
+                result.append(field)
+                continue
+            field = self._project_nested_fields(field)
+            if field is not None:
+                result.append(field)
+        return result
+
+    def _project_nested_fields(self, field):
+        # a container without requested fields is dropped
+        field_type = field.get('type')
+        value = field.get('value')
+        if field_type in ('title', 'multiple_choice') and isinstance(value, dict) \
+                and isinstance(value.get('fields'), list):
+            fields = self._project_fields(value['fields'])
+            if fields:
+                return dict(field, value=dict(value, fields=fields))
+        elif field_type == 'table' and isinstance(value, list):
+            rows = []
+            for row in value:
+                if isinstance(row, dict) and isinstance(row.get('cells'), list):
+                    cells = self._project_fields(row['cells'])
+                    if cells:
+                        rows.append(dict(row, cells=cells))
+            if rows:
+                return dict(field, value=rows)
+        return None
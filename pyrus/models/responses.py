@@ -2,7 +2,9 @@
 # pylint: disable=R0903
 # pylint: disable=too-many-instance-attributes
 
+import hashlib
 from . import entities
+from . import field_index
 
 
 class BaseResponse:
@@ -83,7 +85,28 @@ class FormResponse(BaseResponse):
     @property
     def named_fields(self):
         return self._get_named_fields(self.flat_fields)
-        
+
+    def field(self, id_or_code):
+        """
+        Find a field by id or code, nested fields, choice fields and table columns included.
+        Lookups use a cached index, see :mod:`pyrus.models.field_index`
+
+        Args:
+            id_or_code (:obj:`int` or :obj:`str`): Field id or code
+
+        Returns:
+            :obj:`models.entities.FormField` or None
+        """
+        return self._get_field_index().get(id_or_code)
+
+    def field_by_name(self, name):
+        """
+        Find a field by name, nested fields, choice fields and table columns included
+
+        Returns:
+            :obj:`models.entities.FormField` or None
+        """
+        return self._get_field_index().by_name.get(name)
 
     def __init__(self, **kwargs):
         if 'id' in kwargs:
@@ -91,17 +114,21 @@ class FormResponse(BaseResponse):
         if 'name' in kwargs:
             self.name = kwargs['name']
         if 'steps' in kwargs:
-            self.steps = kwargs['steps']
+            self.steps = dict(kwargs['steps'])
         if 'fields' in kwargs:
             self.fields = [entities.FormField(**field) for field in kwargs['fields']]
         if 'deleted_or_closed' in kwargs:
             self.deleted_or_closed = kwargs['deleted_or_closed']
         if 'business_owners' in kwargs:
-            self.business_owners = kwargs['business_owners']
+            self.business_owners = [owner for owner in kwargs['business_owners']]
         if 'folder' in kwargs:
             self.folder = [fld for fld in kwargs['folder']]
         super(FormResponse, self).__init__(**kwargs)
 
+    def _get_field_index(self):
+        return field_index.get_index(
+            self, self.fields, lambda fields: field_index.FieldIndex(fields, self._get_flat_fields(fields)))
+
     def _get_named_fields(self, flat_fields):
         res = {}
         if not flat_fields:
@@ -344,19 +371,104 @@ class DownloadResponse(BaseResponse):
         
         Attributes:
             filename (:obj:`str`): Filename
-            raw_file (:obj:`bytes`): Raw file
+            raw_file (:obj:`bytes`): Raw file (None if the file was written to a destination)
+            path (:obj:`str`): Path the file was written to
+            size (:obj:`int`): Number of written bytes
+            md5_hash (:obj:`str`): MD5 hash of the written file
     """
     __doc__ += BaseResponse.__doc__
 
     filename = None
     raw_file = None
+    path = None
+    size = None
+    md5_hash = None
 
-    def __init__(self, filename, raw_file):
+    def __init__(self, filename, raw_file, path=None, size=None, md5_hash=None):
         self.filename = filename
         self.raw_file = raw_file
+        self.path = path
+        self.size = size
+        self.md5_hash = md5_hash
         super(DownloadResponse, self).__init__(**{})
 
 
+class DownloadStreamResponse(BaseResponse):
+    """
+        DownloadStreamResponse. Iterate over it to get the file by chunks,
+        close it (or use it as a context manager) if the file is not read to the end
+
+        Attributes:
+            filename (:obj:`str`): Filename
+            size (:obj:`int`): Number of bytes read so far
+            md5_hash (:obj:`str`): MD5 hash of the file, available when the file is read to the end
+    """
+    __doc__ += BaseResponse.__doc__
+
+    filename = None
+    size = 0
+    md5_hash = None
+
+    def __init__(self, filename, chunks, close):
+        self.filename = filename
+        self._chunks = chunks
+        self._close = close
+        super(DownloadStreamResponse, self).__init__(**{})
+
+    def __iter__(self):
+        md5 = hashlib.md5()
+        try:
+            for chunk in self._chunks:
+                md5.update(chunk)
+                self.size += len(chunk)
+                yield chunk
+        finally:
+            self.close()
+        self.md5_hash = md5.hexdigest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._close()
+
+
+class AsyncDownloadStreamResponse(DownloadStreamResponse):
+    """
+        AsyncDownloadStreamResponse. Iterate over it with async for to get the file by chunks,
+        close it (or use it as an async context manager) if the file is not read to the end
+
+        Attributes:
+            filename (:obj:`str`): Filename
+            size (:obj:`int`): Number of bytes read so far
+            md5_hash (:obj:`str`): MD5 hash of the file, available when the file is read to the end
+    """
+    __doc__ += BaseResponse.__doc__
+
+    def __iter__(self):
+        raise TypeError('use async for to read the file by chunks')
+
+    async def __aiter__(self):
+        md5 = hashlib.md5()
+        try:
+            async for chunk in self._chunks:
+                md5.update(chunk)
+                self.size += len(chunk)
+                yield chunk
+        finally:
+            self.close()
+        self.md5_hash = md5.hexdigest()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 class SyncCatalogResponse(BaseResponse):
     """
         SyncCatalogResponse
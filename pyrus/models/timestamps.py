@@ -0,0 +1,117 @@
+'''
+Parsing of the timestamps Pyrus sends
+
+Values in the formats of :mod:`pyrus.models.constants` are checked against the exact layout and parsed
+with ``fromisoformat``, several times faster than ``strptime``. Anything else is parsed by ``strptime``,
+so the results and the errors are the same as before.
+Parsed values are memoized: dates repeat a lot in form registers (due dates, date fields, modification
+dates of tasks changed by one action) and equal values share one object.
+'''
+
+import re
+from datetime import datetime, time, timezone
+from functools import lru_cache
+from . import constants
+
+CACHE_SIZE = 8192
+
+_DATE_TIME = re.compile(r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\dZ\Z', re.ASCII)
+_DATE = re.compile(r'\d{4}-\d\d-\d\d\Z', re.ASCII)
+_TIME = re.compile(r'\d\d:\d\d\Z', re.ASCII)
+
+# datetime.fromisoformat appeared in Python 3.7, older versions use strptime only
+_FAST = hasattr(datetime, 'fromisoformat')
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_date_time(value):
+    """
+    Parse a date and time in :data:`constants.DATE_TIME_FORMAT`
+
+    Returns:
+        :obj:`datetime.datetime`: Date and time in UTC
+    """
+    if _FAST and type(value) is str and _DATE_TIME.match(value):
+        try:
+            return datetime.fromisoformat(value[:19] + '+00:00')
+        except ValueError:
+            pass
+    return _set_utc_timezone(datetime.strptime(value, constants.DATE_TIME_FORMAT))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_naive_date_time(value):
+    """
+    Parse a date and time in :data:`constants.DATE_TIME_FORMAT`
+
+    Returns:
+        :obj:`datetime.datetime`: Date and time without time zone
+    """
+    if _FAST and type(value) is str and _DATE_TIME.match(value):
+        try:
+            return datetime.fromisoformat(value[:19])
+        except ValueError:
+            pass
+    return datetime.strptime(value, constants.DATE_TIME_FORMAT)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_date(value):
+    """
+    Parse a date in :data:`constants.DATE_FORMAT`
+
+    Returns:
+        :obj:`datetime.datetime`: Midnight of the date without time zone
+    """
+    if _FAST and type(value) is str and _DATE.match(value):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, constants.DATE_FORMAT)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_utc_date(value):
+    """
+    Parse a date in :data:`constants.DATE_FORMAT`
+
+    Returns:
+        :obj:`datetime.datetime`: Midnight of the date in UTC
+    """
+    if _FAST and type(value) is str and _DATE.match(value):
+        try:
+            return datetime.fromisoformat(value + 'T00:00:00+00:00')
+        except ValueError:
+            pass
+    return _set_utc_timezone(datetime.strptime(value, constants.DATE_FORMAT))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_time(value):
+    """
+    Parse a time in :data:`constants.TIME_FORMAT`
+
+    Returns:
+        :obj:`datetime.time`: Time in UTC
+    """
+    if _FAST and type(value) is str and _TIME.match(value):
+        try:
+            return time.fromisoformat(value + ':00+00:00')
+        except ValueError:
+            pass
+    return _set_utc_timezone(datetime.strptime(value, constants.TIME_FORMAT).time())
+
+
+def clear_cache():
+    """
+    Drop the memoized values
+    """
+    for parse in (parse_date_time, parse_naive_date_time, parse_date, parse_utc_date, parse_time):
+        parse.cache_clear()
+
+
+def _set_utc_timezone(value):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
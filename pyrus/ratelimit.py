@@ -0,0 +1,223 @@
+'''
+Client side rate limiting for Pyrus API requests
+'''
+
+import hashlib
+import os
+import re
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class TokenBucket:
+    """
+        Thread safe token bucket
+
+        Args:
+            rate (:obj:`float`): Number of requests allowed per second
+            capacity (:obj:`float`, optional): Maximum burst size. Equals to rate by default
+    """
+
+    def __init__(self, rate, capacity=None):
+        _validate_rate(rate, capacity)
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        Take tokens from the bucket
+
+        Args:
+            tokens (:obj:`float`, optional): Number of tokens to take
+
+        Returns:
+            :obj:`float`: Time in seconds the caller should wait before performing the request
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens, delay = _take(self._tokens, now - self._updated, self.rate, self.capacity, tokens)
+            self._updated = now
+            return delay
+
+
+class FileTokenBucket:
+    """
+        Token bucket stored in a file, shared by all processes on the host that use the same path.
+        Not available on Windows.
+
+        Args:
+            path (:obj:`str`): Path to the bucket state file. Created if not exists
+            rate (:obj:`float`): Number of requests allowed per second
+            capacity (:obj:`float`, optional): Maximum burst size. Equals to rate by default
+    """
+
+    _STATE = struct.Struct('<dd')
+
+    def __init__(self, path, rate, capacity=None):
+        if fcntl is None:
+            raise NotImplementedError('FileTokenBucket requires fcntl module')
+        _validate_rate(rate, capacity)
+        self.path = path
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        Take tokens from the bucket
+
+        Args:
+            tokens (:obj:`float`, optional): Number of tokens to take
+
+        Returns:
+            :obj:`float`: Time in seconds the caller should wait before performing the request
+        """
+        # flock is per open file description, the thread lock serializes threads of this process
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                now = time.time()
+                data = os.pread(fd, self._STATE.size, 0)
+                if len(data) == self._STATE.size:
+                    stored_tokens, updated = self._STATE.unpack(data)
+                    elapsed = max(now - updated, 0)
+                else:
+                    stored_tokens, elapsed = self.capacity, 0
+                stored_tokens, delay = _take(stored_tokens, elapsed, self.rate, self.capacity, tokens)
+                os.pwrite(fd, self._STATE.pack(stored_tokens, now), 0)
+                return delay
+            finally:
+                os.close(fd)
+
+
+class RateLimiter:
+    """
+        Rate limiter with a token bucket per access token and, optionally, per endpoint class.
+        One instance can be shared by several clients and threads. With a directory
+        the buckets are stored in files and shared by all processes using the same directory.
+
+        Args:
+            rate (:obj:`float`): Number of requests per second allowed for an access token
+            capacity (:obj:`float`, optional): Maximum burst size for an access token. Equals to rate by default
+            endpoint_limits (:obj:`dict`, optional): Additional limits by endpoint class: ('files', 'registry', 'catalogs' or 'default')
+                as key and rate or (rate, capacity) tuple as value
+            directory (:obj:`str`, optional): Directory for bucket files to share limits between processes
+
+        Attributes:
+            waited (:obj:`float`): Total time in seconds requests were delayed by the limiter
+    """
+
+    ENDPOINT_CLASSES = ('files', 'registry', 'catalogs', 'default')
+
+    def __init__(self, rate, capacity=None, endpoint_limits=None, directory=None):
+        _validate_rate(rate, capacity)
+        self.rate = rate
+        self.capacity = capacity
+        self.endpoint_limits = {}
+        for endpoint_class, limit in (endpoint_limits or {}).items():
+            if endpoint_class not in self.ENDPOINT_CLASSES:
+                raise ValueError('endpoint class should be one of {}'.format(', '.join(self.ENDPOINT_CLASSES)))
+            if not isinstance(limit, (tuple, list)):
+                limit = (limit, None)
+            _validate_rate(*limit)
+            self.endpoint_limits[endpoint_class] = tuple(limit)
+        if directory is not None:
+            if fcntl is None:
+                raise NotImplementedError('Sharing limits between processes requires fcntl module')
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.waited = 0.0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, access_token, url):
+        """
+        Take a token for the request to url made with access_token
+
+        Returns:
+            :obj:`float`: Time in seconds the caller should wait before performing the request
+        """
+        token_key = _hash_token(access_token)
+        delay = self._get_bucket(token_key, None).reserve()
+        endpoint_class = get_endpoint_class(url)
+        if endpoint_class in self.endpoint_limits:
+            delay = max(delay, self._get_bucket(token_key, endpoint_class).reserve())
+        if delay > 0:
+            with self._lock:
+                self.waited += delay
+        return delay
+
+    def acquire(self, access_token, url):
+        """
+        Wait until the request to url made with access_token is allowed
+        """
+        delay = self.reserve(access_token, url)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _get_bucket(self, token_key, endpoint_class):
+        key = (token_key, endpoint_class)
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            return bucket
+        with self._lock:
+            if key not in self._buckets:
+                if endpoint_class is None:
+                    rate, capacity = self.rate, self.capacity
+                else:
+                    rate, capacity = self.endpoint_limits[endpoint_class]
+                if self.directory is None:
+                    self._buckets[key] = TokenBucket(rate, capacity)
+                else:
+                    name = '{}-{}.bucket'.format(token_key, endpoint_class or 'all')
+                    self._buckets[key] = FileTokenBucket(os.path.join(self.directory, name), rate, capacity)
+            return self._buckets[key]
+
+
+def get_endpoint_class(url):
+    """
+    Get the endpoint class ('files', 'registry', 'catalogs' or 'default') of the request url
+    """
+    path = urlparse(url).path
+    if path.endswith('/files/upload') or '/services/attachment' in path:
+        return 'files'
+    if _REGISTRY_PATH.search(path):
+        return 'registry'
+    if '/catalogs' in path:
+        return 'catalogs'
+    return 'default'
+
+
+_REGISTRY_PATH = re.compile(r'/forms/\d+/register$')
+
+
+def _take(tokens, elapsed, rate, capacity, count):
+    tokens = min(capacity, tokens + elapsed * rate) - count
+    # tokens may go negative: it is the debt that following requests wait for
+    if tokens >= 0:
+        return tokens, 0.0
+    return tokens, -tokens / rate
+
+
+def _hash_token(access_token):
+    if not access_token:
+        return 'anonymous'
+    return hashlib.sha1(access_token.encode('utf-8')).hexdigest()[:16]
+
+
+def _validate_rate(rate, capacity=None):
+    if not isinstance(rate, (int, float)) or rate <= 0:
+        raise ValueError('rate should be a positive number')
+    if capacity is not None and (not isinstance(capacity, (int, float)) or capacity < 1):
+        raise ValueError('capacity should be a number not less than 1')
@@ -0,0 +1,153 @@
+'''
+Retry policy for Pyrus API requests
+'''
+
+import random
+import threading
+from datetime import datetime
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+
+
+class RetryPolicy:
+    """
+        Retry policy with exponential backoff for throttled (429) and failed (5xx) requests
+
+        Args:
+            max_attempts (:obj:`int`, optional): Maximum number of attempts including the first one. 1 disables retries
+            backoff_factor (:obj:`float`, optional): Delay before the first retry in seconds, doubled for every next retry
+            max_backoff (:obj:`float`, optional): Maximum delay between attempts in seconds
+            jitter (:obj:`bool`, optional): Randomize delays to spread retries of concurrent workers
+            status_codes (:obj:`list` of :obj:`int`, optional): Response status codes that should be retried
+            respect_retry_after (:obj:`bool`, optional): Wait for the time given in Retry-After header (capped by max_backoff)
+            retry_non_idempotent (:obj:`bool`, optional): Retry non idempotent requests (e.g. task comments) on 5xx
+                and connection errors. Such requests could be applied twice, so they are retried only on 429 by default
+
+        Attributes:
+            statistics (:obj:`pyrus.retry.RetryStatistics`): Retry counters
+    """
+
+    IDEMPOTENT_METHODS = ('GET', 'PUT', 'DELETE')
+
+    def __init__(self, max_attempts=3, backoff_factor=0.5, max_backoff=30, jitter=True,
+                 status_codes=None, respect_retry_after=True, retry_non_idempotent=False):
+        if not isinstance(max_attempts, int) or max_attempts < 1:
+            raise ValueError('max_attempts should be a positive int')
+        if backoff_factor < 0 or max_backoff < 0:
+            raise ValueError('backoff_factor and max_backoff should not be negative')
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.status_codes = frozenset(status_codes if status_codes is not None else [429, 500, 502, 503, 504])
+        self.respect_retry_after = respect_retry_after
+        self.retry_non_idempotent = retry_non_idempotent
+        self.statistics = RetryStatistics()
+
+    def is_idempotent(self, method):
+        return method in self.IDEMPOTENT_METHODS
+
+    def should_retry(self, attempt, status_code, idempotent):
+        """
+        Check if the request should be repeated after a response with status_code
+
+        Args:
+            attempt (:obj:`int`): Number of the attempt that got the response, starting from 1
+            status_code (:obj:`int`): Response status code
+            idempotent (:obj:`bool`): Can the request be safely applied several times
+        """
+        if attempt >= self.max_attempts or status_code not in self.status_codes:
+            return False
+        # throttled requests are rejected before processing, so they can always be repeated
+        return status_code == 429 or idempotent or self.retry_non_idempotent
+
+    def should_retry_error(self, attempt, idempotent):
+        """
+        Check if the request should be repeated after a connection error
+
+        Args:
+            attempt (:obj:`int`): Number of the failed attempt, starting from 1
+            idempotent (:obj:`bool`): Can the request be safely applied several times
+        """
+        return attempt < self.max_attempts and (idempotent or self.retry_non_idempotent)
+
+    def get_delay(self, attempt, retry_after=None):
+        """
+        Get the delay in seconds before the next attempt
+
+        Args:
+            attempt (:obj:`int`): Number of the failed attempt, starting from 1
+            retry_after (:obj:`str`, optional): Retry-After header value
+        """
+        if self.respect_retry_after and retry_after:
+            delay = _parse_retry_after(retry_after)
+            if delay is not None:
+                return min(delay, self.max_backoff)
+        delay = min(self.backoff_factor * (2 ** (attempt - 1)), self.max_backoff)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+
+class RetryStatistics:
+    """
+        Thread safe retry counters
+
+        Attributes:
+            retries (:obj:`int`): Total number of retried attempts
+            retries_by_status (:obj:`dict` of :obj:`int` as key and :obj:`int` as value): Retries by response status code
+            connection_errors (:obj:`int`): Retries after connection errors
+            exhausted (:obj:`int`): Requests that still failed after the last attempt
+            waited (:obj:`float`): Total time spent waiting between attempts in seconds
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.retries = 0
+            self.retries_by_status = {}
+            self.connection_errors = 0
+            self.exhausted = 0
+            self.waited = 0.0
+
+    def record_retry(self, delay, status_code=None):
+        with self._lock:
+            self.retries += 1
+            self.waited += delay
+            if status_code is None:
+                self.connection_errors += 1
+            else:
+                self.retries_by_status[status_code] = self.retries_by_status.get(status_code, 0) + 1
+
+    def record_exhausted(self):
+        with self._lock:
+            self.exhausted += 1
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'retries': self.retries,
+                'retries_by_status': dict(self.retries_by_status),
+                'connection_errors': self.connection_errors,
+                'exhausted': self.exhausted,
+                'waited': self.waited,
+            }
+
+
+def _parse_retry_after(value):
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if date is None:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0)
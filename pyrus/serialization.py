@@ -0,0 +1,273 @@
+'''
+Fast request serialization and response decoding
+
+RequestEncoder produces the same JSON as ``jsonpickle.encode(body, unpicklable=False)`` without walking every object
+with the generic jsonpickle machinery: an encoder is compiled once per class, the encoders of request
+models and entities are compiled on import. Objects that jsonpickle handles in a special way
+(custom handlers, __getstate__, __slots__, ...) are still flattened by jsonpickle.
+usage:
+
+    >>> from pyrus.serialization import RequestEncoder, ResponseDecoder
+    >>> pyrus_client = PyrusAPI(login, security_key, request_encoder=RequestEncoder('orjson'),
+                                response_decoder=ResponseDecoder('auto'))
+'''
+
+import gc
+import json
+import threading
+import types
+from collections.abc import Iterator
+from enum import Enum
+import jsonpickle
+from jsonpickle import handlers, tags, util
+from .models import customhandlers, entities, lazy, requests as req
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class RequestEncoder:
+    """
+        Serializes request bodies to JSON
+
+        Args:
+            backend (:obj:`str`, optional): JSON library. 'json' produces exactly the same bytes as jsonpickle.
+                'orjson' is faster and produces compact JSON with unicode characters not escaped,
+                requires orjson package
+
+        Attributes:
+            BACKENDS (:obj:`tuple` of :obj:`str`): Supported JSON libraries
+    """
+
+    BACKENDS = ('json', 'orjson')
+
+    def __init__(self, backend='json'):
+        if backend not in self.BACKENDS:
+            raise ValueError('backend should be one of {}'.format(', '.join(self.BACKENDS)))
+        if backend == 'orjson' and orjson is None:
+            raise ImportError('orjson backend requires orjson package')
+        self.backend = backend
+
+    def encode(self, body):
+        """
+        Returns:
+            :obj:`bytes`: UTF-8 encoded JSON
+        """
+        data = flatten(body)
+        if self.backend == 'orjson':
+            return orjson.dumps(data)
+        # the backend configured in jsonpickle keeps its encoder options
+        return jsonpickle.backend.json.encode(data).encode('utf-8')
+
+
+class ResponseDecoder:
+    """
+        Decodes JSON response bodies right from the received bytes
+
+        Args:
+            backend (:obj:`str`, optional): JSON library. 'json' is the standard library,
+                'orjson' is several times faster and requires orjson package, 'auto' uses orjson when it is installed.
+                orjson rejects NaN and integers that do not fit into 64 bits, Pyrus never sends them
+            pause_gc (:obj:`bool`, optional): Pause the cyclic garbage collector while a big body is decoded.
+                Decoding creates millions of containers, the collections they trigger take longer than the decoding
+
+        Attributes:
+            BACKENDS (:obj:`tuple` of :obj:`str`): Supported JSON libraries
+            PAUSE_GC_MIN_SIZE (:obj:`int`): Minimum body size in bytes to pause the garbage collector for
+    """
+
+    BACKENDS = ('json', 'orjson', 'auto')
+    PAUSE_GC_MIN_SIZE = 1024 * 1024
+
+    def __init__(self, backend='json', pause_gc=True):
+        if backend not in self.BACKENDS:
+            raise ValueError('backend should be one of {}'.format(', '.join(self.BACKENDS)))
+        if backend == 'auto':
+            backend = 'orjson' if orjson is not None else 'json'
+        if backend == 'orjson' and orjson is None:
+            raise ImportError('orjson backend requires orjson package')
+        self.backend = backend
+        self.pause_gc = pause_gc
+        self._loads = orjson.loads if backend == 'orjson' else json.loads
+
+    def decode(self, content):
+        """
+        Args:
+            content (:obj:`bytes`): UTF-8 encoded JSON
+
+        Raises:
+            ValueError: content is not a valid JSON
+        """
+        if not self.pause_gc or len(content) < self.PAUSE_GC_MIN_SIZE:
+            return self._loads(content)
+        _pause_gc()
+        try:
+            return self._loads(content)
+        finally:
+            _resume_gc()
+
+
+def flatten(value):
+    """
+    Get the JSON compatible representation of value that
+    ``jsonpickle.Pickler(unpicklable=False).flatten`` returns
+    """
+    value_type = type(value)
+    encoder = _encoders.get(value_type)
+    if encoder is None:
+        encoder = _compile(value_type)
+    return encoder(value)
+
+
+_gc_lock = threading.Lock()
+_gc_pauses = 0
+_gc_paused = False
+
+
+def _pause_gc():
+    # the collector is process wide: it is enabled again when the last concurrent decoding ends
+    global _gc_pauses, _gc_paused
+    with _gc_lock:
+        if _gc_pauses == 0:
+            _gc_paused = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+
+
+def _resume_gc():
+    global _gc_pauses
+    with _gc_lock:
+        _gc_pauses -= 1
+        if _gc_pauses == 0 and _gc_paused:
+            gc.enable()
+
+
+_encoders = {}
+
+_PRIMITIVE_TYPES = (str, bool, int, float, type(None))
+
+
+def _compile(cls):
+    encoder = _create_encoder(cls)
+    _encoders[cls] = encoder
+    return encoder
+
+
+def _create_encoder(cls):
+    # the checks follow the order of jsonpickle.Pickler._flatten_obj_instance
+    if cls in _PRIMITIVE_TYPES:
+        return _identity
+    if cls in (list, tuple, set):
+        return _flatten_list
+    if cls is dict:
+        return _flatten_dict
+    if cls in util.FUNCTION_TYPES:
+        return _flatten_function
+    handler = handlers.get(cls, handlers.get(util.importable_name(cls)))
+    if handler is not None:
+        return _HANDLER_ENCODERS.get(handler, _flatten_with_jsonpickle)
+    if issubclass(cls, lazy.LazyEntity):
+        return _flatten_lazy
+    if issubclass(cls, (type, dict, Iterator, Enum, types.ModuleType)) \
+            or getattr(cls, '__getstate__', None) is not getattr(object, '__getstate__', None) \
+            or hasattr(cls, '_jsonpickle_exclude') \
+            or any(hasattr(cls, name) for name in ('__getnewargs__', '__getnewargs_ex__', '__getinitargs__')):
+        return _flatten_with_jsonpickle
+    if issubclass(cls, (list, tuple, set)):
+        return _flatten_list
+    if not cls.__dictoffset__:
+        return _flatten_with_jsonpickle
+    return _flatten_object
+
+
+def _identity(value):
+    return value
+
+
+def _flatten_function(value):
+    # jsonpickle flattens functions to None when unpicklable is False
+    return None
+
+
+def _flatten_with_jsonpickle(value):
+    return jsonpickle.Pickler(unpicklable=False).flatten(value)
+
+
+def _flatten_list(values):
+    get_encoder = _encoders.get
+    result = []
+    for value in values:
+        encoder = get_encoder(type(value))
+        if encoder is None:
+            encoder = _compile(type(value))
+        result.append(value if encoder is _identity else encoder(value))
+    return result
+
+
+def _flatten_dict(items):
+    get_encoder = _encoders.get
+    data = {}
+    for key, value in items.items():
+        if key in _RESERVED_KEYS:
+            continue
+        encoder = get_encoder(type(value))
+        if encoder is None:
+            encoder = _compile(type(value))
+        if encoder is _flatten_function and not util.is_picklable(key, value):
+            continue
+        if type(key) is not str:
+            key = _flatten_key(key)
+        data[key] = value if encoder is _identity else encoder(value)
+    return data
+
+
+def _flatten_object(obj):
+    return _flatten_dict(obj.__dict__)
+
+
+def _flatten_lazy(entity):
+    return _flatten_dict(entity.__getstate__())
+
+
+def _flatten_key(key):
+    if key is None:
+        return 'null'
+    try:
+        return repr(key)
+    except Exception:  # pylint: disable=broad-except
+        return str(key)
+
+
+def _flatten_isoformat(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _flatten_form_field(field):
+    return customhandlers.flatten_form_field(field, {}, flatten)
+
+
+def _flatten_channel(channel):
+    return customhandlers.flatten_channel(channel, {}, flatten)
+
+
+_RESERVED_KEYS = frozenset(tags.RESERVED)
+
+_HANDLER_ENCODERS = {
+    handlers.DatetimeHandler: _flatten_isoformat,
+    customhandlers.FormFieldHandler: _flatten_form_field,
+    customhandlers.ChannelHandler: _flatten_channel,
+}
+
+
+def _compile_models():
+    for module in (entities, req, lazy):
+        for value in vars(module).values():
+            if isinstance(value, type) and value.__module__ == module.__name__:
+                _compile(value)
+
+
+_compile_models()
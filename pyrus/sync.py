@@ -0,0 +1,238 @@
+'''
+Incremental form register synchronization
+
+Fetches only the tasks that were modified since the previous run and passes them to a sink.
+usage:
+
+    >>> from pyrus.sync import RegistrySync, FileCursorStore
+    >>> def upsert(form_id, tasks):
+           for task in tasks:
+               database.save(form_id, task.id, task.last_modified_date)
+    >>> registry_sync = RegistrySync(pyrus_client, upsert, FileCursorStore('cursors.json'))
+    >>> registry_sync.sync(form_id)
+'''
+
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from .models import requests as req, constants, timestamps
+
+
+class SyncCursor:
+    """
+        Position of the incremental synchronization of a form register
+
+        Attributes:
+            modified_after (:obj:`datetime`): The latest last_modified_date of the synchronized tasks
+            seen (:obj:`dict` of :obj:`int` as key and :obj:`datetime` as value): Ids and last_modified_date of the
+                synchronized tasks that are inside the overlap window. They are not passed to the sink again
+                unless they are modified
+            run_time (:obj:`timedelta`): Duration of the run that moved the cursor. A task changed during the run
+                after its page was read can be dated up to run_time before the cursor, the next run requests it again
+    """
+
+    def __init__(self, modified_after=None, seen=None, run_time=timedelta(0)):
+        self.modified_after = modified_after
+        self.seen = seen if seen is not None else {}
+        self.run_time = run_time
+
+    def to_dict(self):
+        return {
+            'modified_after': _date_to_str(self.modified_after),
+            'seen': {str(task_id): _date_to_str(date) for task_id, date in self.seen.items()},
+            'run_time': self.run_time.total_seconds()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(_str_to_date(data.get('modified_after')),
+                   {int(task_id): _str_to_date(date) for task_id, date in data.get('seen', {}).items()},
+                   timedelta(seconds=data.get('run_time', 0)))
+
+
+class CursorStore:
+    """
+        Base cursor store. Stores a :class:`SyncCursor` per form
+    """
+
+    def load(self, form_id):
+        """
+        Returns:
+            :class:`SyncCursor` object or None if the form was never synchronized
+        """
+        raise NotImplementedError
+
+    def save(self, form_id, cursor):
+        raise NotImplementedError
+
+
+class MemoryCursorStore(CursorStore):
+    """
+        Keeps cursors in memory
+    """
+
+    def __init__(self):
+        self._cursors = {}
+
+    def load(self, form_id):
+        cursor = self._cursors.get(form_id)
+        return copy.deepcopy(cursor)
+
+    def save(self, form_id, cursor):
+        self._cursors[form_id] = copy.deepcopy(cursor)
+
+
+class FileCursorStore(CursorStore):
+    """
+        Keeps cursors of all forms in a json file. The file is replaced atomically on every save
+
+        Args:
+            path (:obj:`str`): Path to the file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self, form_id):
+        with self._lock:
+            data = self._read().get(str(form_id))
+        if data is None:
+            return None
+        return SyncCursor.from_dict(data)
+
+    def save(self, form_id, cursor):
+        with self._lock:
+            data = self._read()
+            data[str(form_id)] = cursor.to_dict()
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.cursors')
+            try:
+                with os.fdopen(fd, 'w') as file:
+                    json.dump(data, file)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+    def _read(self):
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+
+class RegistrySync:
+    """
+        Incremental synchronization of form registers. Every run requests the tasks modified after
+        the cursor of the form minus the overlap, skips the tasks that were already passed to the sink
+        and moves the cursor forward.
+
+        The cursor follows the task modification dates set by the server, so the clock of the client
+        does not matter. The overlap covers tasks that become visible with a delay and the one second
+        precision of modification dates. Tasks are read in id order, so a task can be changed after its page
+        was read while the cursor moves past the date of the change: the next run starts earlier
+        by the duration of the previous one to get such changes. The cursor is saved after all changed tasks were passed to the sink,
+        if the run fails they are passed again on the next run, so the sink should upsert them.
+
+        Args:
+            client (:obj:`pyrus.client.PyrusAPI`): Pyrus API client
+            sink (:obj:`callable`): Called with form id and a list of changed :obj:`models.entities.Task` objects
+            cursor_store (:obj:`pyrus.sync.CursorStore`, optional): Cursor store. :class:`MemoryCursorStore` by default
+            overlap (:obj:`timedelta`, optional): How far before the cursor the changes are requested again
+            batch_size (:obj:`int`, optional): Maximum number of tasks passed to the sink at once
+            page_size (:obj:`int`, optional): Number of tasks requested at once
+    """
+
+    def __init__(self, client, sink, cursor_store=None, overlap=timedelta(minutes=5), batch_size=1000,
+                 page_size=20000):
+        if not callable(sink):
+            raise TypeError('sink must be callable')
+        if cursor_store is not None and not isinstance(cursor_store, CursorStore):
+            raise TypeError('cursor_store must be an instance of pyrus.sync.CursorStore')
+        if not isinstance(overlap, timedelta) or overlap < timedelta(0):
+            raise TypeError('overlap must be a non negative timedelta')
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError('batch_size should be a positive int')
+        self.client = client
+        self.sink = sink
+        self.cursor_store = cursor_store if cursor_store is not None else MemoryCursorStore()
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.page_size = page_size
+
+    def sync(self, form_id, form_register_request=None):
+        """
+        Pass the tasks of the form changed since the previous run to the sink
+
+        Args:
+            form_id (:obj:`int`): Form id
+            form_register_request (:obj:`models.requests.FormRegisterRequest`, optional): Request filters.
+                modified_after is used only when the form has no cursor yet, item_count and sort are ignored
+
+        Returns:
+            :obj:`int`: Number of tasks passed to the sink
+        """
+        if form_register_request is None:
+            form_register_request = req.FormRegisterRequest()
+        if not isinstance(form_register_request, req.FormRegisterRequest):
+            raise TypeError('form_register_request must be an instance '
+                            'of models.requests.FormRegisterRequest')
+        started = time.monotonic()
+        cursor = self.cursor_store.load(form_id) or SyncCursor()
+        request = copy.copy(form_register_request)
+        if cursor.modified_after is not None:
+            request.modified_after = _date_to_str(cursor.modified_after - self.overlap - cursor.run_time)
+
+        modified_after = cursor.modified_after
+        count = 0
+        batch = []
+        for task in self.client.iter_registry(form_id, request, page_size=self.page_size):
+            modified = task.last_modified_date
+            if modified is not None:
+                seen = cursor.seen.get(task.id)
+                if seen is not None and seen >= modified:
+                    continue
+                cursor.seen[task.id] = modified
+                if modified_after is None or modified > modified_after:
+                    modified_after = modified
+            batch.append(task)
+            if len(batch) >= self.batch_size:
+                self.sink(form_id, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.sink(form_id, batch)
+            count += len(batch)
+
+        cursor.modified_after = modified_after
+        # only the duration of the run is measured by the client clock, not a point in time
+        cursor.run_time = timedelta(seconds=time.monotonic() - started)
+        if modified_after is not None:
+            window_start = modified_after - self.overlap - cursor.run_time
+            cursor.seen = {task_id: date for task_id, date in cursor.seen.items() if date >= window_start}
+        self.cursor_store.save(form_id, cursor)
+        return count
+
+    def reset(self, form_id):
+        """
+        Forget the cursor of the form, the next run passes all its tasks to the sink
+        """
+        self.cursor_store.save(form_id, SyncCursor())
+
+
+def _date_to_str(date):
+    if date is None:
+        return None
+    return datetime.strftime(date, constants.DATE_TIME_FORMAT)
+
+
+def _str_to_date(value):
+    if value is None:
+        return None
+    return timestamps.parse_date_time(value)